@@ -15,6 +15,8 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 from app.config import settings
 from app.database import Base
 from app.auth.models import User  # Import all models for Alembic detection
+from app.profile.models import UserProfile
+from app.recommendation.models import Program
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
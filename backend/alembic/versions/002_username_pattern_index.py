@@ -0,0 +1,32 @@
+"""Add pattern index on users.username
+
+Revision ID: 002_username_pattern
+Revises: 001_initial
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002_username_pattern'
+down_revision: Union[str, None] = '001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # text_pattern_ops lets PostgreSQL use the index for LIKE 'prefix%' under any collation
+    op.create_index(
+        'ix_users_username_pattern',
+        'users',
+        ['username'],
+        unique=False,
+        postgresql_ops={'username': 'text_pattern_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_username_pattern', table_name='users')
@@ -0,0 +1,37 @@
+"""Create missing user profiles
+
+Profiles are now created together with their user instead of on the first
+GET /profile/me, so existing users without one get an empty profile here.
+
+Revision ID: 003_backfill_profiles
+Revises: 002_username_pattern
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003_backfill_profiles'
+down_revision: Union[str, None] = '002_username_pattern'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        INSERT INTO user_profiles (user_id)
+        SELECT users.id FROM users
+        WHERE NOT EXISTS (
+            SELECT 1 FROM user_profiles WHERE user_profiles.user_id = users.id
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    # Empty profiles are indistinguishable from ones users never edited
+    pass
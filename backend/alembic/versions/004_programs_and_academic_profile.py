@@ -0,0 +1,60 @@
+"""Add programs catalog and academic profile fields
+
+Revision ID: 004_programs
+Revises: 003_backfill_profiles
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004_programs'
+down_revision: Union[str, None] = '003_backfill_profiles'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'programs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('school_name', sa.String(), nullable=False),
+        sa.Column('program_name', sa.String(), nullable=False),
+        sa.Column('country', sa.String(length=2), nullable=False),
+        sa.Column('city', sa.String(), nullable=True),
+        sa.Column('degree', sa.String(), nullable=False),
+        sa.Column('major', sa.String(), nullable=False),
+        sa.Column('qs_rank', sa.Integer(), nullable=True),
+        sa.Column('tuition', sa.Integer(), nullable=True),
+        sa.Column('min_gpa', sa.Float(), nullable=True),
+        sa.Column('min_ielts', sa.Float(), nullable=True),
+        sa.Column('min_toefl', sa.Integer(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True, server_default='true'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_programs_id'), 'programs', ['id'], unique=False)
+    op.create_index(op.f('ix_programs_country'), 'programs', ['country'], unique=False)
+    
+    # Academic profile, read by the recommendation engine
+    op.add_column('user_profiles', sa.Column('gpa', sa.Float(), nullable=True))
+    op.add_column('user_profiles', sa.Column('ielts_score', sa.Float(), nullable=True))
+    op.add_column('user_profiles', sa.Column('toefl_score', sa.Integer(), nullable=True))
+    op.add_column('user_profiles', sa.Column('major', sa.String(), nullable=True))
+    op.add_column('user_profiles', sa.Column('target_degree', sa.String(), nullable=True))
+    op.add_column('user_profiles', sa.Column('target_countries', sa.JSON(), nullable=True))
+    op.add_column('user_profiles', sa.Column('budget', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    for column in ('budget', 'target_countries', 'target_degree', 'major', 'toefl_score', 'ielts_score', 'gpa'):
+        op.drop_column('user_profiles', column)
+    op.drop_index(op.f('ix_programs_country'), table_name='programs')
+    op.drop_index(op.f('ix_programs_id'), table_name='programs')
+    op.drop_table('programs')
@@ -0,0 +1,68 @@
+"""
+Account Administration
+Command line tool for disabling and re-enabling user accounts
+
+Disabling takes effect immediately on every worker: the cached principal is
+dropped (access tokens then fail the account check) and all refresh sessions
+are revoked. Run it with the same environment as the API so it reaches the
+same database and Redis.
+
+Usage (from backend/):
+    python -m app.auth.admin disable alice@example.com
+    python -m app.auth.admin enable 42
+"""
+import argparse
+import asyncio
+
+from app.database import AsyncSessionLocal, engine
+from app.auth.service import get_user_by_email, set_user_active
+from app.common.exceptions import UserNotFoundError
+from app.common.redis import close_redis
+
+
+async def set_active(user: str, is_active: bool) -> int:
+    """
+    Enable or disable the account given by user ID or email
+
+    Returns:
+        User ID
+
+    Raises:
+        UserNotFoundError: No such user
+    """
+    async with AsyncSessionLocal() as db:
+        if user.isdigit():
+            user_id = int(user)
+        else:
+            found = await get_user_by_email(db, user)
+            if found is None:
+                raise UserNotFoundError()
+            user_id = found.id
+        await set_user_active(db, user_id, is_active)
+        return user_id
+
+
+async def run(user: str, is_active: bool) -> int:
+    """set_active, then close the pooled connections"""
+    try:
+        return await set_active(user, is_active)
+    finally:
+        await engine.dispose()
+        await close_redis()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=("disable", "enable"))
+    parser.add_argument("user", help="user ID or email")
+    args = parser.parse_args()
+
+    try:
+        user_id = asyncio.run(run(args.user, args.action == "enable"))
+    except UserNotFoundError:
+        parser.exit(1, f"User not found: {args.user}\n")
+    print(f"User {user_id} {args.action}d")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Google Signing Certificate Cache
+Keeps Google's ID-token signing certificates in memory so verification is
+local CPU work instead of an outbound HTTP fetch per login
+"""
+import asyncio
+import logging
+import re
+import time
+from typing import TYPE_CHECKING, Optional
+from jose import jwt as jose_jwt
+from app.config import settings
+from app.common.metrics import Histogram
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+google_token_verify_seconds = Histogram(
+    "google_token_verify_seconds",
+    "Google ID token verification time, including any certificate fetch",
+    ("result",),
+)
+
+
+def parse_max_age(cache_control: Optional[str], default: int) -> int:
+    """Read max-age (seconds) from a Cache-Control header"""
+    if cache_control:
+        match = MAX_AGE_PATTERN.search(cache_control)
+        if match:
+            return int(match.group(1))
+    return default
+
+
+class GoogleCertificateCache:
+    """
+    In-memory Google certificate set, refreshed in the background
+
+    Creating the cache is free: the HTTP client and google.auth are loaded
+    on first use, so deployments without Google login never import them.
+
+    Certificates are kept until the Cache-Control max-age of the response
+    that delivered them. A background task re-fetches them shortly before
+    they expire, so request handlers only wait on the network for the very
+    first fetch or when Google starts signing with a key we have not seen.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        refresh_margin: float = 300,
+        retry_interval: float = 30,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+    ):
+        self.url = url
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self._transport = transport
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._certs: dict[str, str] = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            # Imported lazily: httpx is only needed once Google login is used
+            import httpx
+
+            self._client = httpx.AsyncClient(timeout=5.0, transport=self._transport)
+        return self._client
+
+    async def _fetch(self) -> None:
+        """Download the certificate set and record its expiry"""
+        response = await self._get_client().get(self.url)
+        response.raise_for_status()
+        max_age = parse_max_age(response.headers.get("cache-control"), default=self.refresh_margin)
+        now = time.monotonic()
+        self._certs = response.json()
+        self._expires_at = now + max_age
+        self._last_fetch = now
+        logger.info(f"Fetched {len(self._certs)} Google signing certificates, valid for {max_age}s")
+
+    async def _refresh(self, force: bool = False) -> None:
+        async with self._lock:
+            # Another caller may have refreshed while we waited for the lock
+            if not force and self._certs and time.monotonic() < self._expires_at:
+                return
+            await self._fetch()
+
+    async def _refresh_loop(self) -> None:
+        """Re-fetch certificates shortly before they expire"""
+        while True:
+            delay = self._expires_at - self.refresh_margin - time.monotonic()
+            await asyncio.sleep(max(delay, self.retry_interval))
+            try:
+                await self._refresh(force=True)
+            except Exception as e:
+                # Keep serving the current set; the inline path retries once it expires
+                logger.warning(f"Background Google certificate refresh failed: {e}")
+
+    async def get_certs(self, kid: Optional[str] = None) -> dict[str, str]:
+        """
+        Get the current certificate set
+
+        Args:
+            kid: Key ID the caller needs; an unknown kid triggers a refresh
+                 (at most once per retry interval)
+
+        Returns:
+            Mapping of key ID to PEM certificate
+        """
+        if not self._certs or time.monotonic() >= self._expires_at:
+            await self._refresh()
+        elif kid and kid not in self._certs and time.monotonic() - self._last_fetch > self.retry_interval:
+            await self._refresh(force=True)
+
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        return self._certs
+
+    async def verify(self, token: str, audience: str) -> dict:
+        """
+        Verify a Google ID token signature, expiry and audience locally
+
+        Args:
+            token: Google ID token
+            audience: Expected audience (our OAuth client ID)
+
+        Returns:
+            Decoded token claims
+
+        Raises:
+            ValueError: token is malformed, expired or not signed by Google
+        """
+        # Imported lazily: google.auth is only needed when Google login is used
+        from google.auth import jwt as google_jwt
+
+        start = time.perf_counter()
+        result = "error"
+        try:
+            try:
+                kid = jose_jwt.get_unverified_header(token).get("kid")
+            except Exception as e:
+                raise ValueError(f"Malformed token header: {e}")
+
+            certs = await self.get_certs(kid)
+            claims = google_jwt.decode(
+                token,
+                certs=certs,
+                audience=audience,
+                clock_skew_in_seconds=settings.GOOGLE_TOKEN_CLOCK_SKEW,
+            )
+            result = "valid"
+            return claims
+        except ValueError:
+            result = "invalid"
+            raise
+        finally:
+            google_token_verify_seconds.observe(time.perf_counter() - start, result)
+
+    async def close(self) -> None:
+        """Stop the background refresh and close the HTTP client"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+google_certificates = GoogleCertificateCache(settings.GOOGLE_CERTS_URL)
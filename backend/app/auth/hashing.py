@@ -0,0 +1,223 @@
+"""
+Password Hashing: bcrypt helpers and a bounded hashing executor
+
+bcrypt is deliberately slow CPU work, so async handlers must not call it
+inline. PasswordHasher runs it in a process pool sized to the CPU cores and
+rejects work with 503 once too many requests are already waiting.
+"""
+import asyncio
+import functools
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.config import settings
+from app.common.exceptions import ServiceBusyError
+from app.common.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0)
+
+password_hash_wait_seconds = Histogram(
+    "password_hash_wait_seconds", "Time bcrypt work waited for a free worker", ("operation",), HASH_BUCKETS
+)
+password_hash_duration_seconds = Histogram(
+    "password_hash_duration_seconds", "bcrypt run time in the worker", ("operation",), HASH_BUCKETS
+)
+password_hash_rejected_total = Counter(
+    "password_hash_rejected_total", "bcrypt requests rejected because the queue was full"
+)
+password_hash_queue_depth = Gauge(
+    "password_hash_queue_depth", "bcrypt requests waiting for a free worker"
+)
+password_hash_in_flight = Gauge(
+    "password_hash_in_flight", "bcrypt requests running or waiting"
+)
+password_hash_capacity = Gauge(
+    "password_hash_capacity", "bcrypt requests accepted before rejecting (workers + queue size)"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_pwd_context():
+    """
+    Password encryption context, built on first use
+
+    passlib and bcrypt are imported here rather than at module level so that
+    importing the application (and every worker spawn) does not pay for them
+    until a password is actually hashed.
+    """
+    from passlib.context import CryptContext
+
+    # Use bcrypt with appropriate rounds
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS,
+    )
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify password"""
+    try:
+        return get_pwd_context().verify(plain_password, hashed_password)
+    except Exception:
+        # If passlib fails, use direct bcrypt verification
+        import bcrypt
+
+        try:
+            return bcrypt.checkpw(
+                plain_password.encode('utf-8'),
+                hashed_password.encode('utf-8')
+            )
+        except Exception:
+            return False
+
+
+def get_password_hash(password: str) -> str:
+    """Generate password hash"""
+    # bcrypt limits password length to 72 bytes, hash first if exceeds
+    password_bytes = password.encode('utf-8')
+    password_to_hash = password
+
+    # If password exceeds 72 bytes, hash with SHA256 first
+    if len(password_bytes) > 72:
+        password_to_hash = hashlib.sha256(password_bytes).hexdigest()
+
+    try:
+        return get_pwd_context().hash(password_to_hash)
+    except Exception as e:
+        # If passlib fails, use direct bcrypt
+        import bcrypt
+
+        logger.warning(f"passlib hashing failed, using direct bcrypt: {e}")
+        password_bytes = password_to_hash.encode('utf-8')
+        salt = bcrypt.gensalt(rounds=settings.PASSWORD_HASH_ROUNDS)
+        hashed = bcrypt.hashpw(password_bytes, salt)
+        return hashed.decode('utf-8')
+
+
+def _run_timed(func, *args):
+    """Run func in the worker and report when it actually started and finished"""
+    started = time.time()
+    result = func(*args)
+    return result, started, time.time()
+
+
+class PasswordHasher:
+    """
+    Bounded executor for bcrypt work
+
+    At most `workers` hashes run at once; up to `queue_size` more may wait.
+    Anything beyond that is rejected immediately with ServiceBusyError so a
+    login burst cannot pile up unbounded latency.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: int = 32):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.queue_size = queue_size
+        self.capacity = max(self.workers, 1) + queue_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        # Statistics for sizing the pool
+        self.completed = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a free worker"""
+        return max(0, self._in_flight - max(self.workers, 1))
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Create the process pool on first use (None = default thread pool)"""
+        if self.workers == 0:
+            return None
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _submit(self, operation: str, func, *args):
+        if self._in_flight >= self.capacity:
+            self.rejected += 1
+            password_hash_rejected_total.inc()
+            logger.warning(
+                f"Password hashing queue full ({self._in_flight} in flight), rejecting request"
+            )
+            raise ServiceBusyError()
+
+        self._in_flight += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        submitted = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, finished = await loop.run_in_executor(
+                self._get_executor(), _run_timed, func, *args
+            )
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next request
+            self._executor = None
+            raise
+        finally:
+            self._in_flight -= 1
+
+        wait = max(0.0, started - submitted)
+        self.completed += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.total_run += finished - started
+        password_hash_wait_seconds.observe(wait, operation)
+        password_hash_duration_seconds.observe(finished - started, operation)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password off the event loop"""
+        return await self._submit("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password off the event loop"""
+        return await self._submit("verify", verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """Queue depth and wait time statistics"""
+        completed = self.completed or 1
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / completed * 1000, 2),
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "avg_run_ms": round(self.total_run / completed * 1000, 2),
+        }
+
+    def shutdown(self) -> None:
+        """Stop worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+)
+password_hash_queue_depth.set_function(lambda: password_hasher.queue_depth)
+password_hash_in_flight.set_function(lambda: password_hasher._in_flight)
+password_hash_capacity.set_function(lambda: password_hasher.capacity)
@@ -1,9 +1,49 @@
 """
 JWT Token Generation and Verification
+
+Tokens are signed with the rotating RS256 key set (app.auth.keys) and carry
+its key ID in the `kid` header. Setting JWT_ALGORITHM to an HS* algorithm
+keeps the legacy shared-secret mode (JWT_SECRET_KEY, no JWKS).
+
+Moving a running deployment from HS256 to RS256 invalidates the tokens
+already issued. Setting JWT_LEGACY_HS256_UNTIL keeps accepting the old HS256
+access tokens for that transition window; old refresh tokens predate refresh
+sessions and are rejected regardless, so those users sign in again.
 """
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
-from jose import jwt
+from jose import JWTError, jwt
 from app.config import settings
+from app.auth.keys import KEY_ALGORITHM, keyset
+from app.common.cache import TTLCache
+from app.common.metrics import Counter, Gauge
+
+# Verified access-token claims, keyed by token digest, kept until the token's
+# own exp. Only tokens that passed signature verification are stored, so the
+# cache can only hold tokens we issued; failures are never cached.
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAXSIZE, ttl=0)
+# Longer strings are never cached (ours are well below this)
+TOKEN_CACHE_MAX_LENGTH = 4096
+
+token_cache_requests_total = Counter(
+    "jwt_cache_requests_total", "Access token verifications by cache result", ("result",)
+)
+Gauge("jwt_cache_entries", "Verified access tokens held in the cache").set_function(
+    lambda: len(token_cache)
+)
+
+
+def uses_shared_secret() -> bool:
+    """Whether tokens are signed with JWT_SECRET_KEY instead of the key set"""
+    return settings.JWT_ALGORITHM.upper().startswith("HS")
+
+
+def _encode(claims: dict) -> str:
+    if uses_shared_secret():
+        return jwt.encode(claims, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    kid, key = keyset.signing_key()
+    return jwt.encode(claims, key, algorithm=KEY_ALGORITHM, headers={"kid": kid})
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
@@ -31,12 +71,7 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     # Ensure sub is a string (JWT standard requirement)
     if "sub" in to_encode:
         to_encode["sub"] = str(to_encode["sub"])
-    encoded_jwt = jwt.encode(
-        to_encode, 
-        settings.JWT_SECRET_KEY, 
-        algorithm=settings.JWT_ALGORITHM
-    )
-    return encoded_jwt
+    return _encode(to_encode)
 
 
 def create_refresh_token(data: dict) -> str:
@@ -57,18 +92,17 @@ def create_refresh_token(data: dict) -> str:
     # Ensure sub is a string (JWT standard requirement)
     if "sub" in to_encode:
         to_encode["sub"] = str(to_encode["sub"])
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.JWT_SECRET_KEY,
-        algorithm=settings.JWT_ALGORITHM
-    )
-    return encoded_jwt
+    return _encode(to_encode)
 
 
 def verify_token(token: str) -> dict:
     """
     Verify and decode token
     
+    Accepts a token signed by any key currently in the key set, so tokens
+    stay valid across a rotation until they expire. Verified access tokens
+    are served from an in-process cache until their exp.
+    
     Args:
         token: JWT token string
     
@@ -76,12 +110,41 @@ def verify_token(token: str) -> dict:
         Decoded payload
     
     Raises:
-        JWTError: token is invalid or expired
+        JWTError: token is invalid, expired or signed by an unknown key
     """
-    payload = jwt.decode(
-        token,
-        settings.JWT_SECRET_KEY,
-        algorithms=[settings.JWT_ALGORITHM]
-    )
-    return payload
+    cacheable = len(token) <= TOKEN_CACHE_MAX_LENGTH
+    if cacheable:
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        claims = token_cache.get(digest)
+        if claims is not None:
+            token_cache_requests_total.inc("hit")
+            return dict(claims)
+        token_cache_requests_total.inc("miss")
+    
+    claims = _decode(token)
+    
+    # Refresh tokens are single-use, so caching them would only evict access tokens
+    if cacheable and claims.get("type") == "access" and isinstance(claims.get("exp"), int):
+        token_cache.set(digest, claims, ttl=claims["exp"] - time.time())
+    return dict(claims)
+
+
+def _legacy_window_open() -> bool:
+    """Whether HS256 tokens from before the switch to RS256 are still accepted"""
+    until = settings.JWT_LEGACY_HS256_UNTIL
+    return until is not None and time.time() < until
+
+
+def _decode(token: str) -> dict:
+    if uses_shared_secret():
+        return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    
+    header = jwt.get_unverified_header(token)
+    if header.get("alg") == "HS256" and _legacy_window_open():
+        return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=["HS256"])
+    
+    key = keyset.verification_key(header.get("kid"))
+    if key is None:
+        raise JWTError("Token signed by an unknown key")
+    return jwt.decode(token, key, algorithms=[KEY_ALGORITHM])
 
@@ -0,0 +1,174 @@
+"""
+JWT Signing Keys
+RS256 key set with scheduled rotation, published as a JWKS document so other
+services can verify our tokens locally
+
+Keys live as PEM files in JWT_KEYS_DIR, named after their key ID. The key ID
+is derived from the rotation period (`k<period number>`), so every worker
+agrees on which key signs now without coordination; whichever worker needs a
+key first creates its file (atomically, via link()), and the others load it.
+
+The set always contains:
+- the key of the current period, used for signing
+- the key of the next period, published ahead of use so verifiers that cache
+  the JWKS already know it when signing switches over
+- the keys of past periods whose tokens may still be valid
+"""
+import logging
+import math
+import os
+import threading
+import time
+from typing import Optional
+from jose import jwk
+from jose.backends.base import Key
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_ALGORITHM = "RS256"
+
+
+def _generate_private_pem() -> bytes:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+class KeySet:
+    """
+    Rotating RS256 signing keys backed by a directory
+
+    Args:
+        directory: Where key files are stored (shared by all workers)
+        rotation_seconds: How long each key is used for signing
+        max_token_lifetime: Longest token lifetime; retired keys are kept
+            this long after their period ends
+    """
+
+    def __init__(self, directory: str, rotation_seconds: float, max_token_lifetime: float):
+        self.directory = directory
+        self.rotation_seconds = rotation_seconds
+        self.retention_periods = math.ceil(max_token_lifetime / rotation_seconds)
+        # kid -> (private key, public key)
+        self._keys: dict[str, tuple[Key, Key]] = {}
+        self._loaded_period: Optional[int] = None
+        self._last_reload = 0.0
+        # Serializes key creation and reloads (also safe from threadpool callers)
+        self._lock = threading.Lock()
+
+    def _period(self) -> int:
+        return int(time.time() // self.rotation_seconds)
+
+    @staticmethod
+    def _kid(period: int) -> str:
+        return f"k{period}"
+
+    def _path(self, kid: str) -> str:
+        return os.path.join(self.directory, f"{kid}.pem")
+
+    def _ensure_key_file(self, kid: str) -> None:
+        """Create the key file for `kid` unless another worker already did"""
+        path = self._path(kid)
+        if os.path.exists(path):
+            return
+        pem = _generate_private_pem()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as f:
+            f.write(pem)
+        try:
+            # link() fails if the file exists, so concurrent creators cannot overwrite each other
+            os.link(tmp_path, path)
+            logger.info(f"Created JWT signing key {kid}")
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+
+    def _load(self, period: int) -> None:
+        """Create missing current/next keys, load the valid set, delete expired keys"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._ensure_key_file(self._kid(period))
+        self._ensure_key_file(self._kid(period + 1))
+
+        oldest = period - self.retention_periods
+        keys = {}
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith("k") and filename.endswith(".pem")):
+                continue
+            kid = filename[:-4]
+            try:
+                key_period = int(kid[1:])
+            except ValueError:
+                continue
+            path = os.path.join(self.directory, filename)
+            if key_period < oldest:
+                os.unlink(path)
+                logger.info(f"Deleted retired JWT signing key {kid}")
+                continue
+            if key_period > period + 1:
+                continue  # Clock skew between hosts; picked up when its time comes
+            pair = self._keys.get(kid)
+            if pair is None:
+                with open(path, "rb") as f:
+                    private_key = jwk.construct(f.read(), KEY_ALGORITHM)
+                pair = (private_key, private_key.public_key())
+            keys[kid] = pair
+
+        self._keys = keys
+        self._loaded_period = period
+        self._last_reload = time.monotonic()
+
+    def _refresh(self) -> None:
+        period = self._period()
+        if period != self._loaded_period:
+            with self._lock:
+                if period != self._loaded_period:
+                    self._load(period)
+
+    def signing_key(self) -> tuple[str, Key]:
+        """Key ID and private key to sign new tokens with"""
+        self._refresh()
+        kid = self._kid(self._loaded_period)
+        return kid, self._keys[kid][0]
+
+    def verification_key(self, kid: Optional[str]) -> Optional[Key]:
+        """
+        Public key for verifying a token signed with `kid`
+
+        An unknown kid triggers a reload (at most once per second), in case
+        another worker created a key this one has not seen yet.
+        """
+        self._refresh()
+        if not kid:
+            return None
+        pair = self._keys.get(kid)
+        if pair is None and time.monotonic() - self._last_reload > 1:
+            with self._lock:
+                self._load(self._period())
+            pair = self._keys.get(kid)
+        return pair[1] if pair else None
+
+    def jwks(self) -> dict:
+        """Public keys as a JWKS document"""
+        self._refresh()
+        keys = []
+        for kid, (_, public_key) in sorted(self._keys.items()):
+            keys.append({**public_key.to_dict(), "kid": kid, "use": "sig"})
+        return {"keys": keys}
+
+
+keyset = KeySet(
+    directory=settings.JWT_KEYS_DIR,
+    rotation_seconds=settings.JWT_KEY_ROTATION_DAYS * 86400,
+    max_token_lifetime=max(
+        settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+    ),
+)
@@ -1,7 +1,7 @@
 """
 User Model
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -9,6 +9,14 @@ from app.database import Base
 class User(Base):
     """User model"""
     __tablename__ = "users"
+    __table_args__ = (
+        # Prefix LIKE lookups on username (e.g. allocating "name_<n>" for Google sign-ups)
+        Index(
+            "ix_users_username_pattern",
+            "username",
+            postgresql_ops={"username": "text_pattern_ops"},
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
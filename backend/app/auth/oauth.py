@@ -1,14 +1,20 @@
 """
 Google OAuth Handler
 """
-from google.auth.transport import requests
-from google.oauth2 import id_token
-from sqlalchemy.orm import Session
+import re
+from sqlalchemy import Integer, String, and_, case, cast, func, insert, literal, or_, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
+from app.database import dialect_insert
 from app.auth.models import User
+from app.profile.models import UserProfile
+from app.auth.google_certs import google_certificates
 from app.auth.service import get_user_by_email, get_user_by_google_id, create_user
 from app.common.exceptions import UserAlreadyExistsError
 
+# Retries when concurrent sign-ups race for the same username
+USERNAME_ALLOCATION_ATTEMPTS = 5
+
 
 async def verify_google_token(token: str) -> dict:
     """
@@ -30,12 +36,8 @@ async def verify_google_token(token: str) -> dict:
         raise ValueError("GOOGLE_CLIENT_ID is not configured")
     
     try:
-        # Verify token
-        idinfo = id_token.verify_oauth2_token(
-            token,
-            requests.Request(),
-            settings.GOOGLE_CLIENT_ID
-        )
+        # Verify token against the cached Google signing certificates
+        idinfo = await google_certificates.verify(token, settings.GOOGLE_CLIENT_ID)
         
         # Verify issuer
         if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
@@ -58,7 +60,7 @@ async def verify_google_token(token: str) -> dict:
 
 
 async def get_or_create_user_from_google(
-    db: Session,
+    db: AsyncSession,
     google_user_info: dict
 ) -> User:
     """
@@ -79,41 +81,90 @@ async def get_or_create_user_from_google(
         raise ValueError("Missing required Google user information")
     
     # First try to find by Google ID
-    user = get_user_by_google_id(db, google_id)
+    user = await get_user_by_google_id(db, google_id)
     if user:
         return user
     
     # Then try to find by email (might be an existing user)
-    user = get_user_by_email(db, email)
+    user = await get_user_by_email(db, email)
     if user:
         # If user exists but doesn't have Google ID, associate Google ID
         if not user.google_id:
             user.google_id = google_id
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
         return user
     
     # Create new user
     # Generate username (use email prefix if name not provided)
     username = name.replace(' ', '_').lower() if name else email.split('@')[0]
-    # Ensure username is unique
-    base_username = username
-    counter = 1
-    while db.query(User).filter(User.username == username).first():
-        username = f"{base_username}_{counter}"
-        counter += 1
     
-    new_user = User(
-        email=email,
-        username=username,
-        hashed_password=None,  # Google login users don't have passwords
-        google_id=google_id,
-        is_active=True,
-        is_verified=True  # Google has verified the email
-    )
+    for _ in range(USERNAME_ALLOCATION_ATTEMPTS):
+        new_user = (await db.scalars(_insert_google_user(db, email, username, google_id))).first()
+        if new_user:
+            await db.execute(insert(UserProfile).values(user_id=new_user.id))
+            await db.commit()
+            return new_user
+        
+        # Nothing inserted: either this Google account signed up concurrently,
+        # or another sign-up took the same username first (then try again)
+        user = await get_user_by_google_id(db, google_id) or await get_user_by_email(db, email)
+        if user:
+            return user
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    raise UserAlreadyExistsError()
 
+
+def _insert_google_user(db: AsyncSession, email: str, base_username: str, google_id: str):
+    """
+    Build a single INSERT that also picks the first free username
+    
+    The username is `base_username` if no user has it, otherwise
+    `base_username_<n>` with n one above the highest numeric suffix in use
+    (1 if none is). Both are computed by one aggregate over the username
+    index inside the INSERT ... SELECT, and ON CONFLICT DO NOTHING turns a
+    lost race into an empty result instead of an error.
+    """
+    suffix_pattern = f"^{re.escape(base_username)}_[0-9]{{1,9}}$"
+    like_prefix = (
+        base_username.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "\\_%"
+    )
+    is_bare = User.username == base_username
+    suffix = cast(func.substr(User.username, len(base_username) + 2), Integer)
+    taken = (
+        select(
+            func.max(case((is_bare, 1), else_=0)).label("bare_taken"),
+            func.max(case((is_bare, None), else_=suffix)).label("max_suffix"),
+        )
+        .where(or_(
+            is_bare,
+            and_(
+                User.username.like(like_prefix, escape="\\"),
+                User.username.regexp_match(suffix_pattern),
+            ),
+        ))
+        .subquery()
+    )
+    username = case(
+        (func.coalesce(taken.c.bare_taken, 0) == 0, literal(base_username)),
+        else_=literal(f"{base_username}_") + cast(func.coalesce(taken.c.max_suffix, 0) + 1, String),
+    )
+    
+    return (
+        dialect_insert(db, User)
+        .from_select(
+            ["email", "username", "hashed_password", "google_id", "is_active", "is_verified"],
+            select(
+                literal(email),
+                username,
+                literal(None, String),  # Google login users don't have passwords
+                literal(google_id),
+                literal(True),
+                literal(True),  # Google has verified the email
+            )
+            .select_from(taken)
+            .where(true())  # Required by SQLite before ON CONFLICT in INSERT ... SELECT
+        )
+        .on_conflict_do_nothing()
+        .returning(User)
+    )
@@ -0,0 +1,55 @@
+"""
+Authenticated Principal Cache
+Keeps the user fields get_current_user needs so authenticated requests skip
+the users table lookup
+"""
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.auth.models import User
+from app.auth.schemas import Principal
+from app.common.cache import TwoTierCache
+
+principal_cache = TwoTierCache(
+    namespace="principal",
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+    local_ttl=settings.PRINCIPAL_CACHE_LOCAL_TTL,
+    maxsize=settings.PRINCIPAL_CACHE_MAXSIZE,
+)
+
+
+async def get_principal(db: AsyncSession, user_id: int) -> Optional[Principal]:
+    """
+    Get principal by user ID, loading it from the database on a cache miss
+    
+    Args:
+        db: Database session
+        user_id: User ID
+    
+    Returns:
+        Principal or None if the user does not exist
+    """
+    cached = await principal_cache.get(user_id)
+    if cached is not None:
+        return Principal.model_validate(cached)
+    
+    # Taken before the read: an invalidation racing this fill wins
+    version = await principal_cache.version(user_id)
+    user = await db.scalar(select(User).where(User.id == user_id))
+    if user is None:
+        return None
+    
+    principal = Principal.model_validate(user)
+    await principal_cache.set(user_id, principal.model_dump(mode="json"), version=version)
+    return principal
+
+
+async def invalidate_principal(user_id: int) -> None:
+    """
+    Drop a cached principal after the user's account changes
+    
+    Args:
+        user_id: User ID
+    """
+    await principal_cache.delete(user_id)
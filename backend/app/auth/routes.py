@@ -1,60 +1,88 @@
 """
 Authentication Routes
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError
 from app.database import get_db
 from app.dependencies import get_current_user
 from app.config import settings
-from app.auth.models import User
 from app.auth.schemas import (
     UserRegister,
     UserLogin,
     GoogleLoginRequest,
     Token,
     TokenRefresh,
-    UserResponse
+    UserResponse,
+    Principal
 )
 from app.auth.service import create_user, authenticate_user
-from app.auth.jwt import create_access_token, create_refresh_token, verify_token
+from app.auth.jwt import create_access_token, uses_shared_secret, verify_token
+from app.auth.keys import keyset
+from app.auth.principal import get_principal
+from app.auth.sessions import create_session, rotate_session, revoke_session, revoke_all_sessions
 from app.auth.oauth import verify_google_token, get_or_create_user_from_google
+from app.common.exceptions import InvalidRefreshTokenError
+from app.common.rate_limit import limit_by_account, limit_by_ip, reset_account_limit
+from app.common.responses import FastJSONResponse
 
 router = APIRouter()
 
+# Served at the site root rather than under API_V1_PREFIX
+well_known_router = APIRouter()
 
-@router.post("/auth/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+
+@well_known_router.get("/.well-known/jwks.json")
+async def jwks(response: Response):
+    """
+    Public keys for verifying our access tokens locally
+    
+    Cacheable: a new key is published one rotation period before it is used
+    for signing, so verifiers only need to refetch within that window (or
+    when they see an unknown kid).
+    """
+    if uses_shared_secret():
+        return {"keys": []}
+    max_age = int(min(3600, settings.JWT_KEY_ROTATION_DAYS * 86400 / 2))
+    response.headers["Cache-Control"] = f"public, max-age={max_age}"
+    return keyset.jwks()
+
+
+@router.post(
+    "/auth/register",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_by_ip("register"))],
+)
 async def register(
     user_data: UserRegister,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     User registration
     """
-    user = create_user(db, user_data)
-    return user
+    await limit_by_account("register", user_data.email)
+    user = await create_user(db, user_data)
+    return FastJSONResponse(UserResponse.model_validate(user), status_code=status.HTTP_201_CREATED)
 
 
-@router.post("/auth/login", response_model=Token)
+@router.post("/auth/login", response_model=Token, dependencies=[Depends(limit_by_ip("login"))])
 async def login(
     login_data: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     User login
     """
-    user = authenticate_user(db, login_data)
+    await limit_by_account("login", login_data.email)
+    user = await authenticate_user(db, login_data)
+    await reset_account_limit("login", login_data.email)
     
     # Generate tokens
     access_token = create_access_token(data={"sub": user.id})
-    refresh_token = create_refresh_token(data={"sub": user.id})
+    refresh_token = await create_session(user.id)
     
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
+    return FastJSONResponse(Token(access_token=access_token, refresh_token=refresh_token))
 
 
 @router.get("/auth/config")
@@ -73,10 +101,10 @@ async def get_auth_config():
     }
 
 
-@router.post("/auth/google/test")
+@router.post("/auth/google/test", dependencies=[Depends(limit_by_ip("google"))])
 async def test_google_token(
     google_data: GoogleLoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Test Google Token verification (for debugging only, does not create user)
@@ -131,10 +159,10 @@ async def test_google_token(
         }
 
 
-@router.post("/auth/google", response_model=Token)
+@router.post("/auth/google", response_model=Token, dependencies=[Depends(limit_by_ip("google"))])
 async def google_login(
     google_data: GoogleLoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Google login
@@ -163,15 +191,13 @@ async def google_login(
         
         # Generate tokens
         access_token = create_access_token(data={"sub": user.id})
-        refresh_token = create_refresh_token(data={"sub": user.id})
+        refresh_token = await create_session(user.id)
         
         logger.info(f"Login successful for user: {user.email}")
         
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer"
-        }
+        return FastJSONResponse(Token(access_token=access_token, refresh_token=refresh_token))
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"Google login failed: {str(e)}")
         raise HTTPException(
@@ -186,66 +212,82 @@ async def google_login(
         )
 
 
+def _verify_refresh_token(refresh_token: str) -> dict:
+    """Decode a refresh token and check its type"""
+    try:
+        payload = verify_token(refresh_token)
+    except JWTError:
+        raise InvalidRefreshTokenError()
+    
+    # Verify token type
+    if payload.get("type") != "refresh":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token type"
+        )
+    return payload
+
+
 @router.post("/auth/refresh", response_model=Token)
 async def refresh_token(
     token_data: TokenRefresh,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Refresh access token
+    
+    Rotates the refresh token: the presented one stops working, and using it
+    again revokes the whole session. The account check uses the principal
+    cache, so a refresh normally needs no database query.
     """
+    payload = _verify_refresh_token(token_data.refresh_token)
+    
+    # Verify user exists and is active before the session is touched, so a
+    # disabled account never gets a new refresh token
     try:
-        payload = verify_token(token_data.refresh_token)
-        
-        # Verify token type
-        if payload.get("type") != "refresh":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token type"
-            )
-        
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-        
-        # Convert to integer
-        user_id = int(user_id)
-        
-        # Verify user exists and is active
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user or not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found or inactive"
-            )
-        
-        # Generate new tokens
-        access_token = create_access_token(data={"sub": user.id})
-        refresh_token = create_refresh_token(data={"sub": user.id})
-        
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer"
-        }
-    except (JWTError, ValueError) as e:
-        # Only catch JWT validation errors and ValueError from int() conversion
-        # Let HTTPException propagate to preserve specific error messages and status codes
+        user_id = int(payload["sub"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidRefreshTokenError()
+    principal = await get_principal(db, user_id)
+    if not principal or not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid refresh token"
+            detail="User not found or inactive"
         )
+    
+    new_refresh_token = await rotate_session(payload)
+    
+    return FastJSONResponse(Token(
+        access_token=create_access_token(data={"sub": user_id}),
+        refresh_token=new_refresh_token,
+    ))
+
+
+@router.post("/auth/logout", status_code=status.HTTP_200_OK)
+async def logout(token_data: TokenRefresh):
+    """
+    End the session of the given refresh token
+    """
+    payload = _verify_refresh_token(token_data.refresh_token)
+    await revoke_session(payload)
+    return {"message": "Logged out"}
+
+
+@router.post("/auth/logout-all", status_code=status.HTTP_200_OK)
+async def logout_all(current_user: Principal = Depends(get_current_user)):
+    """
+    Revoke every refresh session of the current user
+    """
+    await revoke_all_sessions(current_user.id)
+    return {"message": "All sessions revoked"}
 
 
 @router.get("/auth/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get current user information
     """
-    return current_user
+    return FastJSONResponse(current_user)
 
@@ -48,3 +48,8 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class Principal(UserResponse):
+    """Authenticated user snapshot returned (and cached) by get_current_user"""
+    pass
@@ -1,60 +1,24 @@
 """
 Authentication Service: Business Logic
 """
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-import bcrypt
-import hashlib
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.auth.models import User
 from app.auth.schemas import UserRegister, UserLogin
+from app.auth.hashing import password_hasher
+from app.auth.principal import invalidate_principal
+from app.auth.sessions import revoke_all_sessions
+from app.profile.models import UserProfile
+from app.profile.cache import invalidate_profile
 from app.common.exceptions import (
     UserAlreadyExistsError,
     InvalidCredentialsError,
     UserNotFoundError
 )
 
-# Password encryption context
-# Use bcrypt with appropriate rounds
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password"""
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception:
-        # If passlib fails, use direct bcrypt verification
-        try:
-            return bcrypt.checkpw(
-                plain_password.encode('utf-8'),
-                hashed_password.encode('utf-8')
-            )
-        except Exception:
-            return False
-
-
-def get_password_hash(password: str) -> str:
-    """Generate password hash"""
-    # bcrypt limits password length to 72 bytes, hash first if exceeds
-    password_bytes = password.encode('utf-8')
-    password_to_hash = password
-    
-    # If password exceeds 72 bytes, hash with SHA256 first
-    if len(password_bytes) > 72:
-        password_to_hash = hashlib.sha256(password_bytes).hexdigest()
-    
-    try:
-        return pwd_context.hash(password_to_hash)
-    except Exception as e:
-        # If passlib fails, use direct bcrypt
-        print(f"Warning: passlib hashing failed, using direct bcrypt: {e}")
-        password_bytes = password_to_hash.encode('utf-8')
-        salt = bcrypt.gensalt(rounds=12)
-        hashed = bcrypt.hashpw(password_bytes, salt)
-        return hashed.decode('utf-8')
-
-
-def create_user(db: Session, user_data: UserRegister) -> User:
+async def create_user(db: AsyncSession, user_data: UserRegister) -> User:
     """
     Create new user
     
@@ -68,33 +32,34 @@ def create_user(db: Session, user_data: UserRegister) -> User:
     Raises:
         UserAlreadyExistsError: User already exists
     """
-    # Check if email already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
-        raise UserAlreadyExistsError()
+    # Hash first so the transaction below does no waiting on bcrypt
+    hashed_password = await password_hasher.hash(user_data.password)
     
-    # Check if username already exists
-    existing_username = db.query(User).filter(User.username == user_data.username).first()
-    if existing_username:
+    # Create new user, relying on the unique email/username indexes instead of
+    # checking first (check-then-insert is both slower and racy)
+    try:
+        new_user = await db.scalar(
+            insert(User)
+            .values(
+                email=user_data.email,
+                username=user_data.username,
+                hashed_password=hashed_password,
+                is_active=True,
+                is_verified=False  # Default unverified, can add email verification later
+            )
+            .returning(User)
+        )
+        # Create the (empty) profile now so profile reads never write
+        await db.execute(insert(UserProfile).values(user_id=new_user.id))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
         raise UserAlreadyExistsError()
     
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    new_user = User(
-        email=user_data.email,
-        username=user_data.username,
-        hashed_password=hashed_password,
-        is_active=True,
-        is_verified=False  # Default unverified, can add email verification later
-    )
-    
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
     return new_user
 
 
-def authenticate_user(db: Session, login_data: UserLogin) -> User:
+async def authenticate_user(db: AsyncSession, login_data: UserLogin) -> User:
     """
     Authenticate user login
     
@@ -109,7 +74,7 @@ def authenticate_user(db: Session, login_data: UserLogin) -> User:
         InvalidCredentialsError: Invalid credentials
         UserNotFoundError: User not found
     """
-    user = db.query(User).filter(User.email == login_data.email).first()
+    user = await db.scalar(select(User).where(User.email == login_data.email))
     
     if not user:
         raise InvalidCredentialsError()
@@ -117,7 +82,7 @@ def authenticate_user(db: Session, login_data: UserLogin) -> User:
     if not user.hashed_password:
         raise InvalidCredentialsError()
     
-    if not verify_password(login_data.password, user.hashed_password):
+    if not await password_hasher.verify(login_data.password, user.hashed_password):
         raise InvalidCredentialsError()
     
     if not user.is_active:
@@ -126,7 +91,7 @@ def authenticate_user(db: Session, login_data: UserLogin) -> User:
     return user
 
 
-def get_user_by_id(db: Session, user_id: int) -> User:
+async def get_user_by_id(db: AsyncSession, user_id: int) -> User:
     """
     Get user by ID
     
@@ -140,13 +105,13 @@ def get_user_by_id(db: Session, user_id: int) -> User:
     Raises:
         UserNotFoundError: User not found
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise UserNotFoundError()
     return user
 
 
-def get_user_by_email(db: Session, email: str) -> User:
+async def get_user_by_email(db: AsyncSession, email: str) -> User:
     """
     Get user by email
     
@@ -157,10 +122,10 @@ def get_user_by_email(db: Session, email: str) -> User:
     Returns:
         User object or None
     """
-    return db.query(User).filter(User.email == email).first()
+    return await db.scalar(select(User).where(User.email == email))
 
 
-def get_user_by_google_id(db: Session, google_id: str) -> User:
+async def get_user_by_google_id(db: AsyncSession, google_id: str) -> User:
     """
     Get user by Google ID
     
@@ -171,5 +136,31 @@ def get_user_by_google_id(db: Session, google_id: str) -> User:
     Returns:
         User object or None
     """
-    return db.query(User).filter(User.google_id == google_id).first()
+    return await db.scalar(select(User).where(User.google_id == google_id))
+
 
+
+async def set_user_active(db: AsyncSession, user_id: int, is_active: bool) -> User:
+    """
+    Enable or disable a user account
+    
+    Args:
+        db: Database session
+        user_id: User ID
+        is_active: New account status
+    
+    Returns:
+        Updated user object
+    
+    Raises:
+        UserNotFoundError: User not found
+    """
+    user = await get_user_by_id(db, user_id)
+    user.is_active = is_active
+    await db.commit()
+    await db.refresh(user)
+    await invalidate_principal(user.id)
+    await invalidate_profile(user.id)
+    if not is_active:
+        await revoke_all_sessions(user.id)
+    return user
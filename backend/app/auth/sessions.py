@@ -0,0 +1,240 @@
+"""
+Refresh Token Sessions
+Server-side state for refresh tokens: rotation on every use, reuse
+detection, and revocation of one session or all of a user's sessions
+
+Each login starts a session `sid`. Its refresh token carries the session ID,
+a per-token `jti` and the user's session generation `gen`. The store keeps
+only the current jti of each session plus one generation counter per user:
+
+- refresh: the presented jti must be the session's current one; it is then
+  replaced by a new jti (rotation)
+- reuse: presenting an already-rotated jti means the token was copied, so
+  the whole session is revoked
+- revoke all: incrementing the user's generation invalidates every session
+  at once without enumerating them
+
+With REDIS_ENABLED the store is Redis only. While Redis is unreachable the
+session operations (login, refresh, logout) fail closed with a retryable 503
+instead of falling back to process memory: a session kept in one worker
+could not be rotated, reuse-checked or revoked by the others, so a logout or
+logout-all would silently not apply everywhere.
+"""
+import logging
+import time
+import uuid
+from typing import Optional
+from redis.exceptions import RedisError
+from app.config import settings
+from app.auth.jwt import create_refresh_token
+from app.common.exceptions import InvalidRefreshTokenError, ServiceBusyError
+from app.common.metrics import Counter
+from app.common.redis import get_redis, mark_redis_unavailable
+
+logger = logging.getLogger(__name__)
+
+refresh_rotations_total = Counter(
+    "refresh_rotations_total", "Refresh token rotations by outcome", ("result",)
+)
+
+# KEYS: session key, generation key; ARGV: jti, ttl (ms)
+# Returns the user's current generation
+CREATE_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return tonumber(redis.call('GET', KEYS[2]) or '0')
+"""
+
+# KEYS: session key, generation key; ARGV: jti, new jti, gen, ttl (ms)
+ROTATE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 'missing'
+end
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[3] then
+    redis.call('DEL', KEYS[1])
+    return 'revoked'
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 'reused'
+end
+redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[4])
+return 'ok'
+"""
+
+
+class RedisSessionStore:
+    """Sessions in Redis, updated atomically by Lua scripts"""
+
+    def __init__(self):
+        self._scripts = {}
+        self._client = None
+
+    def _script(self, redis, source: str):
+        if self._client is not redis:
+            self._scripts = {}
+            self._client = redis
+        if source not in self._scripts:
+            self._scripts[source] = redis.register_script(source)
+        return self._scripts[source]
+
+    @staticmethod
+    def _keys(user_id: int, sid: str) -> list[str]:
+        return [f"refresh:session:{sid}", f"refresh:gen:{user_id}"]
+
+    async def _call(self, operation):
+        redis = get_redis()
+        if redis is None:
+            # Sessions only live in Redis; fail closed but retryable instead of
+            # logging everyone out or accepting unverifiable tokens
+            raise ServiceBusyError(retry_after=settings.REDIS_RETRY_SECONDS)
+        try:
+            return await operation(redis)
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+            raise ServiceBusyError(retry_after=settings.REDIS_RETRY_SECONDS)
+
+    async def create(self, user_id: int, sid: str, jti: str, ttl: float) -> int:
+        return int(await self._call(lambda redis: self._script(redis, CREATE_SCRIPT)(
+            keys=self._keys(user_id, sid), args=[jti, int(ttl * 1000)],
+        )))
+
+    async def rotate(self, user_id: int, sid: str, jti: str, new_jti: str, gen: int, ttl: float) -> str:
+        return await self._call(lambda redis: self._script(redis, ROTATE_SCRIPT)(
+            keys=self._keys(user_id, sid), args=[jti, new_jti, str(gen), int(ttl * 1000)],
+        ))
+
+    async def revoke(self, user_id: int, sid: str) -> None:
+        await self._call(lambda redis: redis.delete(self._keys(user_id, sid)[0]))
+
+    async def revoke_all(self, user_id: int) -> None:
+        # No expiry: sessions created after the bump carry the new generation
+        # and must keep matching it for as long as they live
+        gen_key = self._keys(user_id, "")[1]
+        await self._call(lambda redis: redis.incr(gen_key))
+
+
+class LocalSessionStore:
+    """In-process sessions for single-worker setups without Redis (REDIS_ENABLED=false)"""
+
+    def __init__(self, purge_threshold: int = 10000):
+        self.purge_threshold = purge_threshold
+        self._sessions: dict[str, tuple[str, float]] = {}
+        self._generations: dict[int, int] = {}
+
+    def _current(self, sid: str) -> Optional[str]:
+        entry = self._sessions.get(sid)
+        if entry is None or entry[1] <= time.monotonic():
+            self._sessions.pop(sid, None)
+            return None
+        return entry[0]
+
+    async def create(self, user_id: int, sid: str, jti: str, ttl: float) -> int:
+        now = time.monotonic()
+        if len(self._sessions) >= self.purge_threshold:
+            self._sessions = {k: v for k, v in self._sessions.items() if v[1] > now}
+        self._sessions[sid] = (jti, now + ttl)
+        return self._generations.get(user_id, 0)
+
+    async def rotate(self, user_id: int, sid: str, jti: str, new_jti: str, gen: int, ttl: float) -> str:
+        current = self._current(sid)
+        if current is None:
+            return "missing"
+        if self._generations.get(user_id, 0) != gen:
+            del self._sessions[sid]
+            return "revoked"
+        if current != jti:
+            del self._sessions[sid]
+            return "reused"
+        self._sessions[sid] = (new_jti, time.monotonic() + ttl)
+        return "ok"
+
+    async def revoke(self, user_id: int, sid: str) -> None:
+        self._sessions.pop(sid, None)
+
+    async def revoke_all(self, user_id: int) -> None:
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+
+_redis_store = RedisSessionStore()
+_local_store = LocalSessionStore()
+
+
+def _store():
+    return _redis_store if settings.REDIS_ENABLED else _local_store
+
+
+def _ttl() -> float:
+    return settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex
+
+
+async def create_session(user_id: int) -> str:
+    """
+    Start a new refresh session (login)
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        Refresh token for the new session
+    """
+    sid, jti = _new_id(), _new_id()
+    gen = await _store().create(user_id, sid, jti, _ttl())
+    return create_refresh_token(data={"sub": user_id, "sid": sid, "jti": jti, "gen": gen})
+
+
+async def rotate_session(payload: dict) -> str:
+    """
+    Exchange a refresh token for its successor
+
+    Args:
+        payload: Verified refresh token claims
+
+    Returns:
+        New refresh token for the same session
+
+    Raises:
+        InvalidRefreshTokenError: Session expired, revoked, or the token was
+            already used (which also revokes the session)
+    """
+    try:
+        user_id = int(payload["sub"])
+        sid, jti, gen = payload["sid"], payload["jti"], int(payload["gen"])
+    except (KeyError, TypeError, ValueError):
+        # Includes stateless tokens issued before sessions existed
+        raise InvalidRefreshTokenError()
+
+    new_jti = _new_id()
+    result = await _store().rotate(user_id, sid, jti, new_jti, gen, _ttl())
+    refresh_rotations_total.inc(result)
+    if result == "reused":
+        logger.warning(f"Refresh token reuse detected for user {user_id}, session revoked")
+    if result != "ok":
+        raise InvalidRefreshTokenError()
+
+    return create_refresh_token(data={"sub": user_id, "sid": sid, "jti": new_jti, "gen": gen})
+
+
+async def revoke_session(payload: dict) -> None:
+    """
+    End the session a refresh token belongs to (logout)
+
+    Args:
+        payload: Verified refresh token claims
+    """
+    if "sid" in payload:
+        await _store().revoke(int(payload["sub"]), payload["sid"])
+
+
+async def revoke_all_sessions(user_id: int) -> None:
+    """
+    Invalidate every refresh session of a user in O(1)
+
+    Args:
+        user_id: User ID
+    """
+    await _store().revoke_all(user_id)
@@ -0,0 +1,242 @@
+"""
+Caching Utilities
+In-process TTL/LRU cache, a two-tier cache that puts it in front of Redis,
+and single-flight coalescing of concurrent cache misses
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from redis.exceptions import RedisError
+from app.common.redis import get_redis, mark_redis_unavailable
+
+
+class TTLCache:
+    """
+    In-process LRU cache with per-entry expiry
+
+    Not thread-safe: intended for use from the event loop thread only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a value, or None if missing or expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a value if present"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all values"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# KEYS: value key, version key; ARGV: value, version read before the fill, ttl (s)
+# Store the value only if no write or delete happened since the version was read
+FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+
+class TwoTierCache:
+    """
+    In-process TTLCache in front of Redis
+
+    Values must be JSON-serializable. The local tier absorbs repeated reads
+    within one worker; Redis shares entries across workers. A local entry can
+    outlive a delete() issued by another worker for at most `local_ttl`
+    seconds. When Redis is unavailable the cache degrades to local-only.
+
+    Filling after a miss is guarded against racing invalidations: take
+    version() before reading the source and pass it to set(). Every delete()
+    and unversioned set() bumps the key's version, so a fill that read the
+    source before the change is dropped instead of caching stale data.
+    """
+
+    def __init__(self, namespace: str, ttl: int, local_ttl: float, maxsize: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        # Bumped by every local write/delete; a fill taken before any of them
+        # skips the local tier (coarse, but bounded in memory)
+        self._local_generation = 0
+        self._fill_script = None
+        self._client = None
+
+    def _redis_key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _version_key(self, key: Hashable) -> str:
+        return f"{self.namespace}:version:{key}"
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        """Get a value from the local tier, then from Redis"""
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(self._redis_key(key))
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+            return None
+        if raw is None:
+            return None
+
+        value = json.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    async def version(self, key: Hashable) -> tuple:
+        """Version token to pass to set() when filling after a miss"""
+        redis = get_redis()
+        if redis is None:
+            return self._local_generation, None
+        try:
+            return self._local_generation, await redis.get(self._version_key(key)) or "0"
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+            return self._local_generation, None
+
+    async def set(self, key: Hashable, value: Any, version: Optional[tuple] = None) -> None:
+        """
+        Store a value in both tiers
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            version: Token from version() taken before the value was read
+                from the source; the value is then stored only if the key
+                was not written or deleted since. Without it the write is
+                authoritative (fresh data) and invalidates running fills.
+        """
+        if version is None:
+            self._local_generation += 1
+            self.local.set(key, value)
+        elif version[0] == self._local_generation:
+            self.local.set(key, value)
+
+        redis = get_redis()
+        if redis is None:
+            return
+        payload = json.dumps(value)
+        try:
+            if version is None:
+                await self._bump(redis, key, set_value=payload)
+            elif version[1] is not None:
+                if self._client is not redis:
+                    self._fill_script = redis.register_script(FILL_SCRIPT)
+                    self._client = redis
+                stored = await self._fill_script(
+                    keys=[self._redis_key(key), self._version_key(key)], args=[payload, version[1], self.ttl]
+                )
+                if not stored:
+                    self.local.delete(key)
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+
+    async def delete(self, key: Hashable) -> None:
+        """Remove a value from both tiers (fills in progress are dropped)"""
+        self._local_generation += 1
+        self.local.delete(key)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await self._bump(redis, key)
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+
+    async def _bump(self, redis, key: Hashable, set_value: Optional[str] = None) -> None:
+        version_key = self._version_key(key)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.incr(version_key)
+            # Outlives any fill in progress; an expired version reads as 0,
+            # which no fill started after the bump can hold
+            pipe.expire(version_key, self.ttl * 2)
+            if set_value is None:
+                pipe.delete(self._redis_key(key))
+            else:
+                pipe.set(self._redis_key(key), set_value, ex=self.ttl)
+            await pipe.execute()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one execution
+
+    The first caller's coroutine runs as a task; callers arriving while it
+    runs await the same task and get its result (or exception). The task is
+    shielded, so a caller that disconnects does not cancel the work others
+    are waiting for. Per process: workers do not see each other's calls.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `func()` unless a call for `key` is already running, then wait for it
+
+        Args:
+            key: Identity of the work
+            func: Coroutine function doing the work
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved even if every caller went away
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether a call for `key` is running"""
+        return key in self._calls
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -1,6 +1,7 @@
 """
 Custom Exception Classes
 """
+import math
 from fastapi import HTTPException, status
 
 
@@ -31,6 +32,15 @@ class InvalidCredentialsError(HTTPException):
         )
 
 
+class InvalidRefreshTokenError(HTTPException):
+    """Invalid, expired or revoked refresh token exception"""
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+
+
 class InactiveUserError(HTTPException):
     """Inactive user exception"""
     def __init__(self):
@@ -39,3 +49,41 @@ class InactiveUserError(HTTPException):
             detail="User account has been disabled"
         )
 
+
+
+class ServiceBusyError(HTTPException):
+    """Service temporarily overloaded exception"""
+    def __init__(self, retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service is busy, please try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class RateLimitExceededError(HTTPException):
+    """Rate limit exceeded exception"""
+    def __init__(self, retry_after: float = 1):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please try again later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+
+class RecommendationJobNotFoundError(HTTPException):
+    """Recommendation job not found exception"""
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recommendation not found"
+        )
+
+
+class LLMUpstreamError(HTTPException):
+    """Language model service failed or timed out exception"""
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Language model service is unavailable, please try again later"
+        )
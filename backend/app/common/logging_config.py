@@ -0,0 +1,91 @@
+"""
+Logging Configuration
+Log records are handed to a background thread through a queue, so writing
+to stderr (or anything slower) never happens on the request path
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from typing import Optional
+from app.config import settings
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_atexit_registered = False
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formatter for records carrying structured fields
+
+    Fields passed as `extra={"fields": {...}}` are appended as key=value
+    pairs in text mode, or merged into one JSON object per line in JSON mode.
+    """
+
+    def __init__(self, json_output: bool = False):
+        super().__init__(TEXT_FORMAT)
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None)
+        if self.json_output:
+            data = {
+                "time": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+            }
+            if fields:
+                data.update(fields)
+            if record.exc_info:
+                data["exc_info"] = self.formatException(record.exc_info)
+            return json.dumps(data, ensure_ascii=False, default=str)
+
+        message = super().format(record)
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+def setup_logging() -> None:
+    """
+    Route all logging through a QueueHandler drained by a background thread
+
+    Safe to call again after shutdown_logging() (e.g. on the next lifespan
+    startup); does nothing while the listener is running.
+    """
+    global _listener, _atexit_registered
+    if _listener is not None:
+        return
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    output = logging.StreamHandler()
+    output.setFormatter(StructuredFormatter(json_output=settings.LOG_JSON))
+
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    if not _atexit_registered:
+        atexit.register(shutdown_logging)
+        _atexit_registered = True
+
+
+def shutdown_logging() -> None:
+    """
+    Flush queued records and stop the background thread
+
+    The root logger then writes to the output handlers directly, so records
+    logged after shutdown are still emitted rather than left in the queue.
+    """
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    logging.getLogger().handlers = list(listener.handlers)
@@ -0,0 +1,405 @@
+"""
+Prometheus Metrics
+Per-worker counters, gauges and histograms rendered in the Prometheus text
+format, with optional aggregation across uvicorn workers
+
+Metrics are only updated from the event loop thread, so plain dict updates
+are safe and no locks are taken on the request path. With several workers,
+set METRICS_MULTIPROC_DIR: each worker periodically writes a snapshot there
+and /metrics merges the snapshots of all workers. Counters and histograms
+are summed across workers; gauges describe one process each, so they are
+reported per worker with a `pid` label.
+
+Snapshots of exited workers do not pile up: the next /metrics scrape folds
+their counters and histograms into a single `aggregate.json` in the same
+directory and deletes their files, so the directory holds one file per live
+worker plus the aggregate, and totals survive worker restarts. The directory
+is not cleared at startup, as a restarting worker cannot tell a fresh
+deployment from its siblings still running; clear it when (re)deploying.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+import uuid
+from bisect import bisect_left
+from typing import Callable, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """Base class: a named metric family with label names"""
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict = {}
+        registry.register(self)
+
+    def snapshot(self) -> dict:
+        """Serializable state of this metric"""
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": [[list(labels), value] for labels, value in self._values.items()],
+        }
+
+
+class Counter(Metric):
+    """Monotonically increasing counter"""
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down, optionally read from a callback at render time"""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, *labels) -> None:
+        self._values[labels] = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the (unlabelled) value from `function` whenever metrics are rendered"""
+        self._function = function
+
+    def snapshot(self) -> dict:
+        if self._function is not None:
+            try:
+                self._values[()] = float(self._function())
+            except Exception as e:
+                logger.debug(f"Gauge {self.name} callback failed: {e}")
+        return super().snapshot()
+
+
+class Histogram(Metric):
+    """Bucketed distribution of observed values"""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        state = self._values.get(labels)
+        if state is None:
+            # Per-bucket (non-cumulative) counts incl. +Inf, sum, count
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def time(self, *labels) -> "_Timer":
+        """Context manager observing the elapsed time of its block"""
+        return _Timer(self, labels)
+
+    def snapshot(self) -> dict:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Registry:
+    """Collection of metrics with snapshot, merge and text rendering"""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self, snapshots: list[tuple[Optional[int], dict]]) -> str:
+        """
+        Merge per-worker snapshots and render them in Prometheus text format
+
+        Args:
+            snapshots: (worker pid, snapshot) pairs; counters and histograms
+                are summed, gauges get a `pid` label unless the pid is None
+        """
+        merged: dict[str, dict] = {}
+        for pid, snapshot in snapshots:
+            for name, data in snapshot.items():
+                per_worker = data["type"] == "gauge" and pid is not None
+                family = merged.get(name)
+                if family is None:
+                    labelnames = [*data["labelnames"], "pid"] if per_worker else data["labelnames"]
+                    family = merged[name] = {**data, "labelnames": labelnames, "samples": {}}
+                for labels, value in data["samples"]:
+                    key = (*labels, pid) if per_worker else tuple(labels)
+                    if key not in family["samples"]:
+                        family["samples"][key] = value
+                    else:
+                        family["samples"][key] = _add(data["type"], family["samples"][key], value)
+
+        lines = []
+        for name, family in merged.items():
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            labelnames = family["labelnames"]
+            for labels, value in family["samples"].items():
+                if family["type"] == "histogram":
+                    counts, total, count = value
+                    cumulative = 0
+                    for bound, bucket_count in zip([*family["buckets"], "+Inf"], counts):
+                        cumulative += bucket_count
+                        le = bound if bound == "+Inf" else repr(float(bound))
+                        lines.append(f"{name}_bucket{_labels(labelnames, labels, le=le)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labelnames, labels)} {total}")
+                    lines.append(f"{name}_count{_labels(labelnames, labels)} {count}")
+                else:
+                    lines.append(f"{name}{_labels(labelnames, labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _add(metric_type: str, a, b):
+    """Sum of two samples of a counter (number) or histogram ([counts, sum, count])"""
+    if metric_type == "histogram":
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+    return a + b
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labelnames, values, **extra) -> str:
+    pairs = list(zip(labelnames, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+registry = Registry()
+
+
+_process_id: Optional[tuple[int, str]] = None
+
+# Totals of exited workers, next to the per-worker snapshots
+AGGREGATE_FILE = "aggregate.json"
+# A snapshot whose PID is still alive is only folded after this many flush
+# intervals without a write (PID reused); folding a worker that is merely
+# slow would count its totals twice once it writes again
+FOLD_AFTER_INTERVALS = 60
+
+
+def _snapshot_id() -> str:
+    """
+    Random ID naming this process's snapshot file
+
+    Not the PID: a new worker reusing a dead worker's PID would overwrite
+    that worker's final counts. Regenerated after a fork.
+    """
+    global _process_id
+    if _process_id is None or _process_id[0] != os.getpid():
+        _process_id = (os.getpid(), uuid.uuid4().hex)
+    return _process_id[1]
+
+
+def _snapshot_path(snapshot_id: str) -> str:
+    return os.path.join(settings.METRICS_MULTIPROC_DIR, f"metrics-{snapshot_id}.json")
+
+
+def write_snapshot() -> None:
+    """Write this worker's snapshot for the other workers to merge"""
+    snapshot_id = _snapshot_id()
+    path = _snapshot_path(snapshot_id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"id": snapshot_id, "pid": os.getpid(), "metrics": registry.snapshot()}, f)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect_snapshots(local: Optional[dict] = None) -> list[tuple[Optional[int], dict]]:
+    """
+    This worker's live snapshot plus the latest snapshot of every other worker
+
+    Counters and histograms of exited workers are kept so totals never go
+    backwards (they are folded into the aggregate file, see the module
+    docstring); their gauges are dropped. A worker counts as exited when its
+    PID is gone; a snapshot not rewritten for three flush intervals loses its
+    gauges, and after FOLD_AFTER_INTERVALS it is folded too (its PID was
+    reused).
+
+    Args:
+        local: This worker's snapshot if already taken (default: take it now)
+
+    Returns:
+        (pid, snapshot) pairs; the pid is None in single-process mode
+    """
+    if local is None:
+        local = registry.snapshot()
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory or not os.path.isdir(directory):
+        return [(None, local)]
+
+    snapshots = [(os.getpid(), local)]
+    own_id = _snapshot_id()
+    stale_before = time.time() - 3 * settings.METRICS_FLUSH_INTERVAL
+    abandoned_before = time.time() - FOLD_AFTER_INTERVALS * settings.METRICS_FLUSH_INTERVAL
+    exited = []
+    for path, data, modified in _read_snapshots(directory):
+        if data.get("id") == own_id:
+            continue
+        pid_alive = _pid_alive(data["pid"])
+        if not pid_alive or modified < abandoned_before:
+            exited.append(path)
+            continue
+        metrics = data["metrics"]
+        if modified < stale_before:
+            metrics = {name: m for name, m in metrics.items() if m["type"] != "gauge"}
+        snapshots.append((data["pid"], metrics))
+    if exited:
+        try:
+            _fold_exited(directory, exited)
+        except OSError as e:
+            logger.warning(f"Could not fold exited worker metrics: {e}")
+    aggregate = _read_aggregate(directory)
+    if aggregate["metrics"]:
+        snapshots.append((None, aggregate["metrics"]))
+    return snapshots
+
+
+def _read_snapshots(directory: str):
+    """(path, content, mtime) of every readable worker snapshot in `directory`"""
+    for filename in os.listdir(directory):
+        if not (filename.startswith("metrics-") and filename.endswith(".json")):
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            modified = os.path.getmtime(path)
+        except (OSError, ValueError):
+            continue
+        yield path, data, modified
+
+
+def _read_aggregate(directory: str) -> dict:
+    """
+    Folded totals of exited workers
+
+    `folded` lists the snapshot IDs merged by the last fold, so a snapshot
+    whose deletion was interrupted is removed rather than counted twice.
+    """
+    try:
+        with open(os.path.join(directory, AGGREGATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"folded": [], "metrics": {}}
+
+
+def _fold_exited(directory: str, paths: list[str]) -> None:
+    """Add the counters and histograms of exited workers to the aggregate and delete their snapshots"""
+    with open(os.path.join(directory, AGGREGATE_FILE + ".lock"), "w") as lock:
+        # Several workers may scrape at once; only one may fold a given snapshot
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        aggregate = _read_aggregate(directory)
+        already_folded = set(aggregate["folded"])
+        totals = aggregate["metrics"]
+        folded = []
+        for path in paths:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # Folded by another worker meanwhile
+            if data["id"] not in already_folded:
+                _accumulate(totals, data["metrics"])
+                folded.append(data["id"])
+
+        if folded:
+            path = os.path.join(directory, AGGREGATE_FILE)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"folded": folded, "metrics": totals}, f)
+            os.replace(f"{path}.tmp", path)
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def _accumulate(totals: dict, snapshot: dict) -> None:
+    """Add a snapshot's counters and histograms to `totals` (same format); gauges are dropped"""
+    for name, data in snapshot.items():
+        if data["type"] == "gauge":
+            continue
+        family = totals.setdefault(name, {**data, "samples": []})
+        samples = {tuple(labels): value for labels, value in family["samples"]}
+        for labels, value in data["samples"]:
+            key = tuple(labels)
+            samples[key] = _add(data["type"], samples[key], value) if key in samples else value
+        family["samples"] = [[list(labels), value] for labels, value in samples.items()]
+
+
+def render_metrics(local: Optional[dict] = None) -> str:
+    """
+    Prometheus text exposition for all workers
+
+    Reads the other workers' snapshot files, so async code should run it in
+    a thread, passing `registry.snapshot()` taken on the event loop (metrics
+    are only safe to read from the loop thread).
+    """
+    return registry.render(collect_snapshots(local))
+
+
+async def snapshot_loop() -> None:
+    """Periodically publish this worker's snapshot (multi-worker mode only)"""
+    os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+    while True:
+        try:
+            write_snapshot()
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+        await asyncio.sleep(settings.METRICS_FLUSH_INTERVAL)
+
+
+# HTTP metrics (recorded by RequestInstrumentationMiddleware)
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
@@ -1,37 +1,101 @@
 """
 Middleware
 """
+import random
 import time
 import logging
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.common.metrics import http_request_duration_seconds, http_requests_total
 
 logger = logging.getLogger(__name__)
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Request logging middleware"""
-    
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        # Log request information
-        logger.info(
-            f"Request: {request.method} {request.url.path} - "
-            f"Client: {request.client.host if request.client else 'unknown'}"
-        )
-        
-        response = await call_next(request)
-        
-        # Calculate processing time
-        process_time = time.time() - start_time
-        
-        # Log response information
-        logger.info(
-            f"Response: {response.status_code} - "
-            f"Time: {process_time:.3f}s"
-        )
-        
-        response.headers["X-Process-Time"] = str(process_time)
-        return response
+class RequestInstrumentationMiddleware:
+    """
+    Request instrumentation middleware (pure ASGI)
 
+    Adds X-Process-Time to every response, records per-route latency and
+    status metrics, and writes a structured access log record for a sample
+    of requests. Errors (5xx) and slow requests are
+    always logged. Unlike BaseHTTPMiddleware it wraps `send` directly, so it
+    adds no extra task or response stream per request.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = 0.1,
+        slow_threshold_ms: float = 1000,
+        cors_debug: bool = False,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.cors_debug = cors_debug
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        response_headers = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", f"{time.perf_counter() - start:.6f}")
+                if self.cors_debug:
+                    response_headers = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            self._record_metrics(scope, status_code, duration)
+            if self.cors_debug:
+                self._log_cors(scope, response_headers)
+            if (
+                status_code >= 500
+                or duration >= self.slow_threshold
+                or random.random() < self.sample_rate
+            ):
+                self._log_request(scope, status_code, duration)
+
+    def _record_metrics(self, scope: Scope, status_code: int, duration: float) -> None:
+        # Label by route template (/api/users/{id}), not the raw path, to keep
+        # label cardinality bounded; the router stores the matched route in scope
+        route = scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        http_requests_total.inc(scope["method"], route_path, str(status_code))
+        http_request_duration_seconds.observe(duration, scope["method"], route_path)
+
+    def _log_request(self, scope: Scope, status_code: int, duration: float) -> None:
+        client = scope.get("client")
+        level = logging.WARNING if status_code >= 500 else logging.INFO
+        logger.log(level, "request", extra={"fields": {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 2),
+            "client": client[0] if client else "unknown",
+        }})
+
+    def _log_cors(self, scope: Scope, response_headers) -> None:
+        """Opt-in CORS debugging: request origin and CORS response headers"""
+        cors_headers = {}
+        if response_headers is not None:
+            cors_headers = {
+                k: v for k, v in response_headers.items() if k.startswith("access-control")
+            }
+        logger.info("cors", extra={"fields": {
+            "method": scope["method"],
+            "path": scope["path"],
+            "origin": Headers(scope=scope).get("origin"),
+            "cors_headers": cors_headers,
+        }})
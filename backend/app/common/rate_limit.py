@@ -0,0 +1,191 @@
+"""
+Rate Limiting
+Sliding-window limits for the endpoints that cost a bcrypt computation or an
+outbound verification, checked before any of that work starts
+"""
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+from fastapi import Request
+from redis.exceptions import RedisError
+from app.config import settings
+from app.common.exceptions import RateLimitExceededError
+from app.common.metrics import Counter
+from app.common.redis import get_redis, mark_redis_unavailable
+
+logger = logging.getLogger(__name__)
+
+rate_limit_rejected_total = Counter(
+    "rate_limit_rejected_total", "Requests rejected by the rate limiter", ("scope", "kind")
+)
+
+# Sliding window log in a sorted set (score = hit time in ms), evaluated
+# atomically so concurrent workers cannot both take the last slot.
+# Returns 0 when the hit is allowed, otherwise milliseconds until a slot frees.
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+if redis.call('ZCARD', key) < limit then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('PEXPIRE', key, window)
+    return 0
+end
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+return math.max(1, tonumber(oldest[2]) + window - now)
+"""
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding-window rate limiter on Redis, with an in-process fallback
+
+    The fallback keeps the same window per worker, so while Redis is down the
+    effective limit is multiplied by the number of workers rather than lost.
+    """
+
+    def __init__(self, prefix: str = "ratelimit", local_maxsize: int = 100000):
+        self.prefix = prefix
+        self.local_maxsize = local_maxsize
+        self._local: OrderedDict[str, deque] = OrderedDict()
+        self._script = None
+        self._script_client = None
+
+    def _get_script(self, redis):
+        # Script objects are bound to a client; rebuild if the client changed
+        if self._script is None or self._script_client is not redis:
+            self._script = redis.register_script(SLIDING_WINDOW_SCRIPT)
+            self._script_client = redis
+        return self._script
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        """
+        Record one hit against `key` if the window has room
+
+        Args:
+            key: Rate limit bucket
+            limit: Hits allowed per window
+            window: Window length in seconds
+
+        Returns:
+            0 if allowed, otherwise seconds until the next hit would be allowed
+        """
+        redis = get_redis()
+        if redis is not None:
+            now_ms = int(time.time() * 1000)
+            try:
+                retry_ms = await self._get_script(redis)(
+                    keys=[f"{self.prefix}:{key}"],
+                    args=[now_ms, int(window * 1000), limit, f"{now_ms}-{uuid.uuid4().hex[:8]}"],
+                )
+                return int(retry_ms) / 1000
+            except (RedisError, OSError) as e:
+                mark_redis_unavailable(e)
+        return self._local_hit(key, limit, window)
+
+    def _local_hit(self, key: str, limit: int, window: float) -> float:
+        now = time.monotonic()
+        hits = self._local.get(key)
+        if hits is None:
+            hits = self._local[key] = deque()
+            if len(self._local) > self.local_maxsize:
+                self._local.popitem(last=False)
+        else:
+            self._local.move_to_end(key)
+
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+        if len(hits) < limit:
+            hits.append(now)
+            return 0.0
+        return max(hits[0] + window - now, 0.001)
+
+    async def clear(self, key: str) -> None:
+        """Forget all hits recorded against `key`"""
+        self._local.pop(key, None)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(f"{self.prefix}:{key}")
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+
+    def reset(self) -> None:
+        """Forget all in-process windows"""
+        self._local.clear()
+
+
+limiter = SlidingWindowLimiter()
+
+
+def _account_key(identifier: str) -> str:
+    # Hashed so raw emails do not end up in Redis key names
+    return hashlib.sha256(identifier.strip().lower().encode("utf-8")).hexdigest()[:32]
+
+
+async def _enforce(scope: str, kind: str, key: str, limit: int, window: float) -> None:
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    retry_after = await limiter.hit(f"{scope}:{kind}:{key}", limit, window)
+    if retry_after > 0:
+        rate_limit_rejected_total.inc(scope, kind)
+        logger.warning(f"Rate limit exceeded for {scope} ({kind})")
+        raise RateLimitExceededError(retry_after=retry_after)
+
+
+def limit_by_ip(scope: str) -> Callable:
+    """
+    Dependency limiting requests per client IP for one endpoint
+
+    Uses the address uvicorn reports; run it with --proxy-headers behind a
+    reverse proxy so this is the real client rather than the proxy.
+
+    Args:
+        scope: Endpoint name, so each endpoint gets its own budget
+    """
+    async def dependency(request: Request) -> None:
+        client = request.client.host if request.client else "unknown"
+        await _enforce(
+            scope, "ip", client,
+            settings.RATE_LIMIT_IP_REQUESTS, settings.RATE_LIMIT_IP_WINDOW,
+        )
+
+    return dependency
+
+
+async def limit_by_account(scope: str, identifier: Optional[str]) -> None:
+    """
+    Limit attempts against one account (email or user ID)
+
+    Called before any password hashing, so a credential-stuffing run against
+    a single account is cut off no matter how many IPs it comes from.
+
+    Raises:
+        RateLimitExceededError: Too many attempts in the current window
+    """
+    if not identifier:
+        return
+    await _enforce(
+        scope, "account", _account_key(str(identifier)),
+        settings.RATE_LIMIT_ACCOUNT_REQUESTS, settings.RATE_LIMIT_ACCOUNT_WINDOW,
+    )
+
+
+async def reset_account_limit(scope: str, identifier: Optional[str]) -> None:
+    """
+    Clear an account's attempts after it authenticated successfully
+
+    limit_by_account() has to count an attempt before the password is
+    checked; clearing the window on success means only failed attempts
+    build up towards the limit, so a user logging in repeatedly is never
+    locked out.
+    """
+    if not identifier or not settings.RATE_LIMIT_ENABLED:
+        return
+    await limiter.clear(f"{scope}:account:{_account_key(str(identifier))}")
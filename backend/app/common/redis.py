@@ -0,0 +1,92 @@
+"""
+Redis Client
+Shared async Redis connection built from the REDIS_* settings
+"""
+import logging
+import time
+from typing import Optional
+from redis.asyncio import Redis
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[Redis] = None
+_blocking_client: Optional[Redis] = None
+_unavailable_until = 0.0
+
+
+def get_redis() -> Optional[Redis]:
+    """
+    Get the shared Redis client
+
+    Returns None when Redis is disabled or failed recently, so callers can
+    fall back to their in-process behaviour instead of waiting on timeouts.
+    """
+    global _client
+    if not settings.REDIS_ENABLED or time.monotonic() < _unavailable_until:
+        return None
+    if _client is None:
+        _client = Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD or None,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            decode_responses=True,
+        )
+    return _client
+
+
+def get_blocking_redis() -> Optional[Redis]:
+    """
+    Get the client for blocking commands (BLMOVE)
+
+    A separate connection without REDIS_SOCKET_TIMEOUT, which would cut a
+    blocking read short. Returns None whenever get_redis() does.
+    """
+    global _blocking_client
+    if get_redis() is None:
+        return None
+    if _blocking_client is None:
+        _blocking_client = Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD or None,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_keepalive=True,
+            decode_responses=True,
+        )
+    return _blocking_client
+
+
+def set_redis(client: Optional[Redis]) -> None:
+    """Replace the shared client (e.g. with a fakeredis instance in tests), also for blocking commands"""
+    global _client, _blocking_client, _unavailable_until
+    _client = client
+    _blocking_client = client
+    _unavailable_until = 0.0
+
+
+def mark_redis_unavailable(error: Exception) -> None:
+    """Skip Redis for REDIS_RETRY_SECONDS after a failed call"""
+    global _unavailable_until
+    # Concurrent calls that were already in flight fail together; log once
+    already_marked = time.monotonic() < _unavailable_until
+    _unavailable_until = time.monotonic() + settings.REDIS_RETRY_SECONDS
+    if not already_marked:
+        logger.warning(
+            f"Redis unavailable, using in-process fallback for "
+            f"{settings.REDIS_RETRY_SECONDS}s: {error}"
+        )
+
+
+async def close_redis() -> None:
+    """Close the shared clients"""
+    global _client, _blocking_client
+    if _blocking_client is not None and _blocking_client is not _client:
+        await _blocking_client.close()
+    if _client is not None:
+        await _client.close()
+    _client = _blocking_client = None
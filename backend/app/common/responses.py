@@ -0,0 +1,27 @@
+"""
+JSON Responses
+Response class that encodes with pydantic-core's Rust serializer
+
+FastAPI's default path for a route with `response_model` dumps the returned
+object to a dict, validates it again against the response model, converts it
+with jsonable_encoder and finally runs json.dumps. A route that already holds
+a validated response model can instead return `FastJSONResponse(model)`:
+FastAPI passes Response objects through untouched, so the model is
+serialized exactly once, straight to bytes. Output is the same JSON the
+default path produces (pydantic formats datetimes etc. in both cases).
+"""
+from typing import Any
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for pydantic models and plain JSON data
+
+    Also used as the application's default response class, so routes that
+    return dicts skip json.dumps as well.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
@@ -1,34 +1,93 @@
 """
 Database Connection and Session Management
 """
-from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.common.metrics import Gauge
+
+# Async driver for each sync URL scheme accepted in DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """
+    Convert a sync database URL to its async driver equivalent
+
+    DATABASE_URL keeps the sync form so Alembic can keep using psycopg2,
+    while the application talks to the database through asyncpg/aiosqlite.
+    """
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+def _engine_options(url: str) -> dict:
+    """Pool options (SQLite stand-ins do not use a sized connection pool)"""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_pre_ping": True,  # Check if connection is valid before connecting
+        "pool_size": 10,
+        "max_overflow": 20,
+    }
+
 
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Check if connection is valid before connecting
-    pool_size=10,
-    max_overflow=20,
+engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    **_engine_options(settings.DATABASE_URL),
+)
+
+# Connection pool gauges (pools without a fixed size, e.g. SQLite, report 0)
+_pool = engine.sync_engine.pool
+Gauge("db_pool_size", "Configured connection pool size").set_function(
+    lambda: getattr(_pool, "size", lambda: 0)()
+)
+Gauge("db_pool_checked_out", "Connections currently checked out of the pool").set_function(
+    lambda: getattr(_pool, "checkedout", lambda: 0)()
+)
+Gauge("db_pool_overflow", "Connections open beyond pool_size").set_function(
+    lambda: max(0, getattr(_pool, "overflow", lambda: 0)())
 )
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: attributes must stay loaded after commit because
+# async sessions cannot lazy-load them on access
+AsyncSessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 # Create base model class
 Base = declarative_base()
 
 
-def get_db():
+def dialect_insert(db: AsyncSession, table):
+    """
+    INSERT construct for the session's dialect
+    
+    The PostgreSQL/SQLite variants support ON CONFLICT clauses, which the
+    generic insert() does not.
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"ON CONFLICT is not supported for {dialect}")
+
+
+async def get_db():
     """
     Get database session dependency
     Used for FastAPI dependency injection
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
@@ -3,53 +3,63 @@ Dependency Injection
 """
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+from jose import JWTError
 from app.database import get_db
-from app.config import settings
-from app.auth.models import User
+from app.auth.jwt import verify_token
+from app.auth.schemas import Principal
+from app.auth.principal import get_principal
 
 security = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    Get current user from JWT token
-    """
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def get_current_user_id(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> int:
+    """
+    Get current user ID from JWT token alone
     
+    Does no database or cache lookup: routes depending on this directly must
+    check that the user exists and is active themselves
+    """
     try:
-        token = credentials.credentials
-        payload = jwt.decode(
-            token, 
-            settings.JWT_SECRET_KEY, 
-            algorithms=[settings.JWT_ALGORITHM]
-        )
+        payload = verify_token(credentials.credentials)
         user_id = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
-        user_id = int(user_id)
+            raise credentials_exception()
+        return int(user_id)
     except (JWTError, ValueError):
         # Catch JWTError from token validation and ValueError from int() conversion
         # Both should result in 401 Unauthorized response
-        raise credentials_exception
+        raise credentials_exception()
+
+
+async def get_current_user(
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """
+    Get current user from JWT token
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
+    Returns the cached principal (id, email, username, status flags); load the
+    User row explicitly where the full record is needed
+    """
+    principal = await get_principal(db, user_id)
+    if principal is None:
+        raise credentials_exception()
     
-    if not user.is_active:
+    if not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account has been disabled"
         )
     
-    return user
-
+    return principal
@@ -0,0 +1 @@
+# LLM proxy module
@@ -0,0 +1,89 @@
+"""
+Micro-batching
+Collects concurrent calls that can share one upstream request
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class _Batch:
+    def __init__(self):
+        self.items: list = []
+        self.futures: list[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """
+    Groups calls with the same key arriving within `window` seconds into a
+    single `send(key, items)` call
+
+    A batch is sent when its window ends or once it holds `max_size` items,
+    whichever comes first, so batching adds at most `window` to a call's
+    latency. With window 0 every call is sent on its own.
+
+    Args:
+        send: Coroutine function taking (key, items) and returning one
+            result per item, in order
+        window: Seconds the first call of a batch waits for others
+        max_size: Items per batch
+    """
+
+    def __init__(self, send: Callable[[Hashable, list], Awaitable[list]], window: float, max_size: int):
+        self.send = send
+        self.window = window
+        self.max_size = max(max_size, 1)
+        self._open: dict[Hashable, _Batch] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """
+        Add an item to the open batch for `key` and wait for its result
+
+        Args:
+            key: Compatibility key; only items with equal keys share a batch
+            item: Item passed to `send`
+
+        Returns:
+            The item's result from `send`; an exception raised by `send` is
+            raised to every caller of the batch
+        """
+        batch = self._open.get(key)
+        if batch is None:
+            batch = self._open[key] = _Batch()
+            if self.window > 0:
+                batch.timer = asyncio.get_running_loop().call_later(self.window, self._flush, key, batch)
+        future = asyncio.get_running_loop().create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        if len(batch.items) >= self.max_size or self.window <= 0:
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key: Hashable, batch: _Batch) -> None:
+        if self._open.get(key) is batch:
+            del self._open[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+        task = asyncio.create_task(self._send(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, key: Hashable, batch: _Batch) -> None:
+        try:
+            results = await self.send(key, batch.items)
+            if len(results) != len(batch.items):
+                raise ValueError(f"Batch of {len(batch.items)} items returned {len(results)} results")
+        except asyncio.CancelledError:
+            for future in batch.futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            if not future.done():  # The caller may have given up
+                future.set_result(result)
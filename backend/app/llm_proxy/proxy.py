@@ -0,0 +1,403 @@
+"""
+LLM Proxy
+Single gateway for language model calls (recommendation explanations, gap
+reports, IELTS feedback) to an OpenAI-compatible API
+
+- One pooled httpx.AsyncClient per process (keep-alive connections are
+  reused instead of a TLS handshake per call)
+- Concurrency limits: at most LLM_MAX_CONCURRENCY upstream requests in
+  flight per process, and LLM_USER_CONCURRENCY calls per user. A call that
+  cannot get a slot within LLM_QUEUE_TIMEOUT is rejected (503 / 429)
+  rather than queueing without bound.
+- Micro-batching: for models served by the legacy /completions endpoint
+  (LLM_COMPLETIONS_MODELS), complete() calls with the same model and
+  parameters arriving within LLM_BATCH_WINDOW_MS are sent as one request
+  with a list of prompts (e.g. one explanation per recommended program).
+  Chat-only models (the default LLM_MODEL) get each prompt as its own
+  /chat/completions request.
+- Accounting: latency, time to first token, batch sizes and token usage by
+  model and purpose are exported as metrics
+- Streaming: stream_chat() yields text as the model produces it
+
+Usage:
+    completion = await llm_proxy.chat(messages, user_id=user.id, purpose="gap_report")
+    async for text in llm_proxy.stream_chat(messages, user_id=user.id, purpose="ielts_feedback"):
+        ...
+
+Per-user limits are enforced per process. For local development, point
+LLM_BASE_URL at the fake server (benchmarks/fake_llm_server.py).
+"""
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Hashable, Optional, Sequence
+from app.config import settings
+from app.common.exceptions import LLMUpstreamError, RateLimitExceededError, ServiceBusyError
+from app.common.metrics import Counter, Gauge, Histogram
+from app.llm_proxy.batching import MicroBatcher
+from app.llm_proxy.schemas import ChatMessage, Completion, Usage
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+llm_request_seconds = Histogram(
+    "llm_request_seconds", "Upstream LLM request time", ("operation", "result"), LLM_BUCKETS
+)
+llm_first_token_seconds = Histogram(
+    "llm_first_token_seconds", "Time from a streamed call's upstream request to its first text", (), LLM_BUCKETS
+)
+llm_slot_wait_seconds = Histogram(
+    "llm_slot_wait_seconds", "Time LLM calls waited for a concurrency slot", ("scope",)
+)
+llm_batch_size = Histogram(
+    "llm_batch_size", "Prompts per upstream completion request", (), (1, 2, 4, 8, 16, 32, 64)
+)
+llm_tokens_total = Counter(
+    "llm_tokens_total", "Tokens used by LLM calls", ("model", "purpose", "kind")
+)
+llm_rejected_total = Counter(
+    "llm_rejected_total", "LLM calls rejected for lack of a concurrency slot", ("scope",)
+)
+llm_requests_in_flight = Gauge(
+    "llm_requests_in_flight", "Upstream LLM requests in flight"
+)
+
+
+class LLMProxy:
+    """
+    Concurrency-limited, batching client for an OpenAI-compatible API
+
+    Creating the proxy is free: the HTTP client is created on first use.
+
+    Args:
+        base_url: API base URL, e.g. https://api.openai.com/v1
+        api_key: Bearer token (None = no Authorization header)
+        model: Default model
+        timeout: Upstream request timeout, seconds
+        max_connections: Connection pool size
+        max_concurrency: Upstream requests in flight
+        user_concurrency: Calls in flight per user
+        queue_timeout: Seconds a call waits for a slot before it is rejected
+        batch_window: Seconds complete() waits to batch compatible prompts
+        batch_max_size: Prompts per batch
+        completions_models: Models served by /completions; complete() sends
+            prompts for any other model to /chat/completions, unbatched
+        transport: httpx transport override (e.g. httpx.ASGITransport)
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        model: str,
+        timeout: float = 60,
+        max_connections: int = 20,
+        max_concurrency: int = 16,
+        user_concurrency: int = 2,
+        queue_timeout: float = 10,
+        batch_window: float = 0.01,
+        batch_max_size: int = 16,
+        completions_models: Sequence[str] = (),
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.user_concurrency = user_concurrency
+        self.queue_timeout = queue_timeout
+        self.completions_models = frozenset(completions_models)
+        self._transport = transport
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._upstream = asyncio.Semaphore(max_concurrency)
+        self._users: dict[int, list] = {}  # user ID -> [semaphore, calls holding or waiting]
+        self._in_flight = 0
+        self._batcher = MicroBatcher(self._send_completions, batch_window, batch_max_size)
+
+    @property
+    def in_flight(self) -> int:
+        """Upstream requests in flight"""
+        return self._in_flight
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            # Imported lazily: only processes that call the model need httpx
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else None,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close the HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _acquire(self, semaphore: asyncio.Semaphore, scope: str) -> None:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            llm_rejected_total.inc(scope)
+            if scope == "user":
+                raise RateLimitExceededError(retry_after=self.queue_timeout)
+            raise ServiceBusyError(retry_after=1)
+        llm_slot_wait_seconds.observe(time.perf_counter() - started, scope)
+
+    @asynccontextmanager
+    async def _user_slot(self, user_id: Optional[int]):
+        """Hold one of the user's slots (no limit for user_id None, e.g. background jobs)"""
+        if user_id is None:
+            yield
+            return
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = [asyncio.Semaphore(self.user_concurrency), 0]
+        entry[1] += 1
+        try:
+            await self._acquire(entry[0], "user")
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._users[user_id]
+
+    @asynccontextmanager
+    async def _upstream_slot(self):
+        await self._acquire(self._upstream, "global")
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._upstream.release()
+
+    async def _post(self, operation: str, path: str, body: dict) -> dict:
+        """Send one upstream request (caller holds an upstream slot)"""
+        import httpx
+
+        started = time.perf_counter()
+        result = "error"
+        try:
+            response = await self._get_client().post(path, json=body)
+            response.raise_for_status()
+            result = "ok"
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"LLM {operation} request failed: {e!r}")
+            raise LLMUpstreamError()
+        finally:
+            llm_request_seconds.observe(time.perf_counter() - started, operation, result)
+
+    @staticmethod
+    def _account(model: str, purpose: str, usage: Optional[dict]) -> Optional[Usage]:
+        if not usage:
+            return None
+        usage = Usage(
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            completion_tokens=usage.get("completion_tokens") or 0,
+        )
+        llm_tokens_total.inc(model, purpose, "prompt", amount=usage.prompt_tokens)
+        llm_tokens_total.inc(model, purpose, "completion", amount=usage.completion_tokens)
+        return usage
+
+    async def complete(
+        self,
+        prompt: str,
+        *,
+        user_id: Optional[int],
+        purpose: str,
+        model: Optional[str] = None,
+        max_tokens: int = 256,
+        temperature: float = 0.2,
+    ) -> Completion:
+        """
+        Complete a single prompt
+
+        For a model in `completions_models` the prompt is batched with
+        concurrent compatible calls into one /completions request; for chat
+        models it is sent to /chat/completions as a single user message.
+
+        Args:
+            prompt: Prompt text
+            user_id: User the call is made for (None = not user-limited)
+            purpose: Accounting label, e.g. "explanation"
+            model: Model (default LLM_MODEL)
+            max_tokens: Completion length limit
+            temperature: Sampling temperature
+
+        Returns:
+            Completion; `usage` is None when the prompt was sent in a batch
+            of several (the batch total is still accounted)
+
+        Raises:
+            RateLimitExceededError: The user has too many calls in flight
+            ServiceBusyError: No upstream slot became free in time
+            LLMUpstreamError: Upstream request failed or timed out
+        """
+        model = model or self.model
+        if model not in self.completions_models:
+            return await self.chat(
+                [ChatMessage(role="user", content=prompt)],
+                user_id=user_id, purpose=purpose, model=model, max_tokens=max_tokens, temperature=temperature,
+            )
+        async with self._user_slot(user_id):
+            return await self._batcher.submit((model, purpose, max_tokens, temperature), prompt)
+
+    async def _send_completions(self, key: Hashable, prompts: list[str]) -> list[Completion]:
+        model, purpose, max_tokens, temperature = key
+        llm_batch_size.observe(len(prompts))
+        async with self._upstream_slot():
+            data = await self._post("completions", "/completions", {
+                "model": model,
+                "prompt": prompts[0] if len(prompts) == 1 else prompts,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            })
+        usage = self._account(data.get("model", model), purpose, data.get("usage"))
+        choices = sorted(data.get("choices", []), key=lambda choice: choice.get("index", 0))
+        if len(choices) != len(prompts):
+            logger.warning(f"LLM returned {len(choices)} choices for {len(prompts)} prompts")
+            raise LLMUpstreamError()
+        return [
+            Completion(
+                text=choice.get("text", ""),
+                model=data.get("model", model),
+                finish_reason=choice.get("finish_reason"),
+                usage=usage if len(prompts) == 1 else None,
+            )
+            for choice in choices
+        ]
+
+    def _chat_body(self, messages: Sequence[ChatMessage], model: Optional[str], max_tokens: int,
+                   temperature: float) -> dict:
+        return {
+            "model": model or self.model,
+            "messages": [message.model_dump() for message in messages],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+
+    async def chat(
+        self,
+        messages: Sequence[ChatMessage],
+        *,
+        user_id: Optional[int],
+        purpose: str,
+        model: Optional[str] = None,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+    ) -> Completion:
+        """
+        Chat completion (not batched: the chat API takes one conversation per request)
+
+        Args and raised errors as for complete()
+        """
+        body = self._chat_body(messages, model, max_tokens, temperature)
+        async with self._user_slot(user_id), self._upstream_slot():
+            data = await self._post("chat", "/chat/completions", body)
+        try:
+            choice = data["choices"][0]
+            text = choice["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError):
+            logger.warning("LLM chat response without a message")
+            raise LLMUpstreamError()
+        model = data.get("model", body["model"])
+        return Completion(
+            text=text,
+            model=model,
+            finish_reason=choice.get("finish_reason"),
+            usage=self._account(model, purpose, data.get("usage")),
+        )
+
+    async def stream_chat(
+        self,
+        messages: Sequence[ChatMessage],
+        *,
+        user_id: Optional[int],
+        purpose: str,
+        model: Optional[str] = None,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+    ) -> AsyncIterator[str]:
+        """
+        Chat completion streamed as text fragments
+
+        The user and upstream slots are held until the stream ends or the
+        consumer stops iterating (close the generator to stop early). Usage is
+        accounted when the server reports it (stream_options.include_usage).
+
+        Args and raised errors as for complete(); LLMUpstreamError may also
+        be raised mid-stream
+        """
+        import httpx
+
+        body = self._chat_body(messages, model, max_tokens, temperature)
+        body.update(stream=True, stream_options={"include_usage": True})
+        async with self._user_slot(user_id), self._upstream_slot():
+            started = time.perf_counter()
+            result, first, model, usage = "error", True, body["model"], None
+            try:
+                async with self._get_client().stream("POST", "/chat/completions", json=body) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        model = chunk.get("model") or model
+                        usage = chunk.get("usage") or usage
+                        for choice in chunk.get("choices") or ():
+                            text = (choice.get("delta") or {}).get("content")
+                            if text:
+                                if first:
+                                    llm_first_token_seconds.observe(time.perf_counter() - started)
+                                    first = False
+                                yield text
+                result = "ok"
+            except (GeneratorExit, asyncio.CancelledError):
+                result = "closed"  # Consumer stopped early
+                raise
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning(f"LLM stream failed: {e!r}")
+                raise LLMUpstreamError()
+            finally:
+                llm_request_seconds.observe(time.perf_counter() - started, "chat_stream", result)
+                self._account(model, purpose, usage)
+
+
+llm_proxy = LLMProxy(
+    base_url=settings.LLM_BASE_URL,
+    api_key=settings.LLM_API_KEY,
+    model=settings.LLM_MODEL,
+    timeout=settings.LLM_TIMEOUT,
+    max_connections=settings.LLM_MAX_CONNECTIONS,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    user_concurrency=settings.LLM_USER_CONCURRENCY,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+    batch_window=settings.LLM_BATCH_WINDOW_MS / 1000,
+    batch_max_size=settings.LLM_BATCH_MAX_SIZE,
+    completions_models=settings.LLM_COMPLETIONS_MODELS,
+)
+llm_requests_in_flight.set_function(lambda: llm_proxy.in_flight)
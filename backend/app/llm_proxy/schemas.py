@@ -0,0 +1,25 @@
+"""
+LLM proxy Pydantic schemas
+"""
+from pydantic import BaseModel
+from typing import Literal, Optional
+
+
+class ChatMessage(BaseModel):
+    """One chat message (OpenAI format)"""
+    role: Literal["system", "user", "assistant"]
+    content: str
+
+
+class Usage(BaseModel):
+    """Tokens billed for a call"""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class Completion(BaseModel):
+    """Generated text"""
+    text: str
+    model: str
+    finish_reason: Optional[str] = None
+    usage: Optional[Usage] = None  # None for batched prompts (usage is reported per batch)
@@ -1,15 +1,93 @@
 """
 FastAPI Application Entry Point
+
+Importing this module does no database or network work. Tables are created
+in the lifespan hook only when DB_CREATE_ALL is set (otherwise the schema is
+managed by Alembic), and optional providers such as Google login load their
+dependencies on first use.
 """
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from app.config import settings
 from app.database import engine, Base
-from app.auth.routes import router as auth_router
+from app.auth.hashing import password_hasher
+from app.auth.google_certs import google_certificates
+from app.auth.jwt import uses_shared_secret
+from app.auth.keys import keyset
+from app.common.redis import close_redis
+from app.common.logging_config import setup_logging, shutdown_logging
+from app.common.metrics import Gauge, registry, render_metrics, snapshot_loop, write_snapshot
+from app.common.middleware import RequestInstrumentationMiddleware
+from app.common.responses import FastJSONResponse
+from app.llm_proxy.proxy import llm_proxy
+from app.auth.routes import router as auth_router, well_known_router
 from app.profile.routes import router as profile_router
+from app.recommendation.routes import router as recommendation_router
+from app.recommendation.service import recommendation_jobs
+
+logger = logging.getLogger(__name__)
+
+startup_seconds = Gauge("app_startup_seconds", "Time spent in each startup phase", ("phase",))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup and shutdown hooks"""
+    started = time.perf_counter()
+    setup_logging()  # Again after a previous lifespan's shutdown_logging()
+    logger.info(f"CORS Configuration - Allowed Origins: {settings.CORS_ORIGINS}")
+    if settings.GOOGLE_CLIENT_ID:
+        logger.info(f"Google OAuth configured - Client ID: {settings.GOOGLE_CLIENT_ID[:20]}...")
+    else:
+        logger.warning("Google OAuth not configured - Please set GOOGLE_CLIENT_ID in backend/.env")
+
+    # Load (or create) the signing keys now rather than on the first login
+    if not uses_shared_secret():
+        keyset.signing_key()
+
+    if settings.DB_CREATE_ALL:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    # Publish this worker's metrics for aggregation across workers
+    metrics_task = None
+    if settings.METRICS_MULTIPROC_DIR:
+        metrics_task = asyncio.create_task(snapshot_loop())
+
+    # Workers running queued recommendation jobs
+    recommendation_jobs.start()
+
+    startup_seconds.set(time.perf_counter() - started, "lifespan")
+    logger.info("startup", extra={"fields": {
+        "import_ms": round(import_seconds * 1000, 1),
+        "lifespan_ms": round((time.perf_counter() - started) * 1000, 1),
+        "create_all": settings.DB_CREATE_ALL,
+    }})
+
+    yield
+
+    # Close pooled connections, hashing workers and background tasks
+    await recommendation_jobs.stop()
+    if metrics_task is not None:
+        metrics_task.cancel()
+        write_snapshot()  # Keep this worker's final counts in the aggregate
+    await engine.dispose()
+    password_hasher.shutdown()
+    await google_certificates.close()
+    await llm_proxy.close()
+    await close_redis()
+    shutdown_logging()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 # Create FastAPI application
 app = FastAPI(
@@ -17,44 +95,21 @@ app = FastAPI(
     version=settings.APP_VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Configure logging
-import logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+setup_logging()
+
+# Compress large responses (innermost, so it only sees route output)
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=settings.GZIP_MINIMUM_SIZE,
+    compresslevel=settings.GZIP_COMPRESS_LEVEL,
 )
 
 # Configure CORS
-# Print CORS configuration for debugging
-print(f"CORS Configuration - Allowed Origins: {settings.CORS_ORIGINS}")
-
-# Print Google OAuth configuration status
-if settings.GOOGLE_CLIENT_ID:
-    print(f"✓ Google OAuth configured - Client ID: {settings.GOOGLE_CLIENT_ID[:20]}...")
-else:
-    print("⚠ Google OAuth not configured - Please set GOOGLE_CLIENT_ID in backend/.env")
-
-# Add request logging middleware for CORS debugging
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-
-logger = logging.getLogger(__name__)
-
-class CORSDebugMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        origin = request.headers.get("origin")
-        method = request.method
-        path = request.url.path
-        logger.info(f"CORS Debug - Method: {method}, Path: {path}, Origin: {origin}")
-        response = await call_next(request)
-        cors_headers = {k: v for k, v in response.headers.items() if k.lower().startswith('access-control')}
-        logger.info(f"CORS Response Headers: {cors_headers}")
-        return response
-
-app.add_middleware(CORSDebugMiddleware)
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -64,9 +119,19 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Request instrumentation (outermost, so it also times CORS preflights)
+app.add_middleware(
+    RequestInstrumentationMiddleware,
+    sample_rate=settings.REQUEST_LOG_SAMPLE_RATE,
+    slow_threshold_ms=settings.REQUEST_LOG_SLOW_MS,
+    cors_debug=settings.CORS_DEBUG,
+)
+
 # Register routes
 app.include_router(auth_router, prefix=settings.API_V1_PREFIX, tags=["Authentication"])
 app.include_router(profile_router, prefix=settings.API_V1_PREFIX, tags=["User Profile"])
+app.include_router(recommendation_router, prefix=settings.API_V1_PREFIX, tags=["Recommendations"])
+app.include_router(well_known_router, tags=["Authentication"])
 
 
 @app.get("/")
@@ -85,6 +150,13 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics (all workers when METRICS_MULTIPROC_DIR is set)"""
+    text = await run_in_threadpool(render_metrics, registry.snapshot())
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+
 @app.get("/debug/cors")
 async def debug_cors():
     """Debug CORS configuration"""
@@ -93,3 +165,8 @@ async def debug_cors():
         "cors_origins_type": str(type(settings.CORS_ORIGINS)),
         "cors_origins_length": len(settings.CORS_ORIGINS) if isinstance(settings.CORS_ORIGINS, list) else "not a list"
     }
+
+
+# Module import time, including all application modules imported above
+import_seconds = time.perf_counter() - _import_started
+startup_seconds.set(import_seconds, "import")
@@ -0,0 +1,24 @@
+"""
+Profile Cache
+Short-lived cache of the GET /profile/me response, so repeat reads skip the
+database entirely
+"""
+from app.config import settings
+from app.common.cache import TwoTierCache
+
+profile_cache = TwoTierCache(
+    namespace="profile",
+    ttl=settings.PROFILE_CACHE_TTL,
+    local_ttl=settings.PROFILE_CACHE_LOCAL_TTL,
+    maxsize=settings.PROFILE_CACHE_MAXSIZE,
+)
+
+
+async def invalidate_profile(user_id: int) -> None:
+    """
+    Drop a cached profile after any field it contains changes
+    
+    Args:
+        user_id: User ID
+    """
+    await profile_cache.delete(user_id)
@@ -1,7 +1,7 @@
 """
 User Profile Model
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Float, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -17,6 +17,15 @@ class UserProfile(Base):
     nickname = Column(String, nullable=True)  # Nickname
     bio = Column(Text, nullable=True)  # Biography
     phone = Column(String, nullable=True)  # Phone number
+    
+    # Academic profile (input to recommendations)
+    gpa = Column(Float, nullable=True)  # 4.0 scale
+    ielts_score = Column(Float, nullable=True)
+    toefl_score = Column(Integer, nullable=True)
+    major = Column(String, nullable=True)  # Intended major, e.g. "computer_science"
+    target_degree = Column(String, nullable=True)  # bachelor / master / phd
+    target_countries = Column(JSON, nullable=True)  # ISO country codes, e.g. ["GB", "US"]
+    budget = Column(Integer, nullable=True)  # Yearly tuition budget (USD)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
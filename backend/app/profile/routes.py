@@ -2,75 +2,88 @@
 User Profile Routes
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.dependencies import get_current_user
-from app.auth.models import User
+from app.dependencies import get_current_user, get_current_user_id, credentials_exception
+from app.auth.schemas import Principal
 from app.profile.schemas import ProfileUpdate, PasswordChange, ProfileResponse
-from app.profile.service import get_user_profile, update_user_profile, change_password
+from app.profile.service import get_profile_view, update_user_profile, change_password
+from app.common.exceptions import InactiveUserError
+from app.common.responses import FastJSONResponse
+from app.common.rate_limit import limit_by_account, limit_by_ip
 
 router = APIRouter()
 
 
+async def _load_profile(db: AsyncSession, user_id: int) -> ProfileResponse:
+    """Current profile view with the account checks of get_current_user"""
+    profile = await get_profile_view(db, user_id)
+    if profile is None:
+        raise credentials_exception()
+    if not profile.is_active:
+        raise InactiveUserError()
+    return profile
+
+
 @router.get("/profile/me", response_model=ProfileResponse)
 async def get_my_profile(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get current user's profile
+    
+    Checks the account on the same cached/joined row it returns instead of a
+    separate get_current_user lookup, so this costs at most one query
+    """
+    return FastJSONResponse(await _load_profile(db, user_id))
+
+
+@router.patch("/profile/me", response_model=ProfileResponse)
+async def patch_my_profile(
+    profile_data: ProfileUpdate,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
     """
-    profile = get_user_profile(db, current_user.id)
+    Partially update current user's profile
     
-    return ProfileResponse(
-        id=current_user.id,
-        email=current_user.email,
-        username=current_user.username,
-        nickname=profile.nickname,
-        avatar_url=profile.avatar_url,
-        bio=profile.bio,
-        phone=profile.phone,
-        is_active=current_user.is_active,
-        is_verified=current_user.is_verified,
-        created_at=current_user.created_at
-    )
+    Only fields present in the body are changed; null clears a profile field.
+    Values equal to the stored ones are not written.
+    """
+    await _load_profile(db, user_id)  # Account checks; the update reads the stored row itself
+    profile = await update_user_profile(db, user_id, profile_data.model_dump(exclude_unset=True))
+    return FastJSONResponse(profile)
 
 
 @router.put("/profile/me", response_model=ProfileResponse)
 async def update_my_profile(
     profile_data: ProfileUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Update current user's profile
+    Update current user's profile (null or missing fields are left unchanged)
     """
-    user = update_user_profile(db, current_user, profile_data)
-    profile = get_user_profile(db, user.id)
-    
-    return ProfileResponse(
-        id=user.id,
-        email=user.email,
-        username=user.username,
-        nickname=profile.nickname,
-        avatar_url=profile.avatar_url,
-        bio=profile.bio,
-        phone=profile.phone,
-        is_active=user.is_active,
-        is_verified=user.is_verified,
-        created_at=user.created_at
-    )
+    await _load_profile(db, user_id)  # Account checks; the update reads the stored row itself
+    profile = await update_user_profile(db, user_id, profile_data.model_dump(exclude_none=True))
+    return FastJSONResponse(profile)
 
 
-@router.put("/profile/password", status_code=status.HTTP_200_OK)
+@router.put(
+    "/profile/password",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(limit_by_ip("password"))],
+)
 async def change_my_password(
     password_data: PasswordChange,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Change current user's password
     """
-    change_password(db, current_user, password_data)
+    await limit_by_account("password", current_user.id)
+    await change_password(db, current_user.id, password_data)
     return {"message": "Password changed successfully"}
 
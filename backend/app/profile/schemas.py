@@ -2,7 +2,7 @@
 User Profile-related Pydantic schemas
 """
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 
 
@@ -13,6 +13,14 @@ class ProfileUpdate(BaseModel):
     avatar_url: Optional[str] = None
     bio: Optional[str] = Field(None, max_length=500)
     phone: Optional[str] = Field(None, max_length=20)
+    # Academic profile (used by recommendations)
+    gpa: Optional[float] = Field(None, ge=0, le=4.0)
+    ielts_score: Optional[float] = Field(None, ge=0, le=9)
+    toefl_score: Optional[int] = Field(None, ge=0, le=120)
+    major: Optional[str] = Field(None, max_length=100)
+    target_degree: Optional[Literal["bachelor", "master", "phd"]] = None
+    target_countries: Optional[list[str]] = Field(None, max_length=20)
+    budget: Optional[int] = Field(None, ge=0)  # Yearly tuition budget (USD)
 
 
 class PasswordChange(BaseModel):
@@ -30,6 +38,14 @@ class ProfileResponse(BaseModel):
     avatar_url: Optional[str]
     bio: Optional[str]
     phone: Optional[str]
+    # Defaults keep profiles cached before these fields existed readable
+    gpa: Optional[float] = None
+    ielts_score: Optional[float] = None
+    toefl_score: Optional[int] = None
+    major: Optional[str] = None
+    target_degree: Optional[str] = None
+    target_countries: Optional[list[str]] = None
+    budget: Optional[int] = None
     is_active: bool
     is_verified: bool
     created_at: datetime
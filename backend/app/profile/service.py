@@ -1,87 +1,157 @@
 """
 User Profile Service: Business Logic
 """
-from sqlalchemy.orm import Session
+from typing import Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import dialect_insert
 from app.auth.models import User
 from app.profile.models import UserProfile
-from app.profile.schemas import ProfileUpdate, PasswordChange
-from app.auth.service import verify_password, get_password_hash
+from app.profile.schemas import PasswordChange, ProfileResponse
+from app.profile.cache import profile_cache
+from app.auth.hashing import password_hasher
+from app.auth.service import get_user_by_id
+from app.auth.principal import invalidate_principal
+from app.auth.sessions import revoke_all_sessions
 from app.common.exceptions import InvalidCredentialsError, UserAlreadyExistsError
+from app.recommendation.cache import invalidate_recommendations
+from app.recommendation.service import PROFILE_CRITERIA
 
+# Columns editable through the profile endpoints, by table
+USER_FIELDS = ("username",)
+PROFILE_FIELDS = (
+    "nickname", "avatar_url", "bio", "phone",
+    "gpa", "ielts_score", "toefl_score", "major", "target_degree", "target_countries", "budget",
+)
 
-def get_user_profile(db: Session, user_id: int) -> UserProfile:
+# users columns in the profile view
+USER_VIEW_FIELDS = ("id", "email", "username", "is_active", "is_verified", "created_at")
+
+
+def _profile_query(user_id: int):
+    """Joined users + user_profiles row of the profile view"""
+    return (
+        select(
+            *(getattr(User, k) for k in USER_VIEW_FIELDS),
+            *(getattr(UserProfile, k) for k in PROFILE_FIELDS),
+        )
+        .outerjoin(UserProfile, UserProfile.user_id == User.id)
+        .where(User.id == user_id)
+    )
+
+
+async def get_profile_view(db: AsyncSession, user_id: int) -> Optional[ProfileResponse]:
     """
-    Get user profile (create if not exists)
+    Get the combined user + profile view for GET /profile/me
+    
+    Served from the profile cache when possible; otherwise read with one
+    joined query. The outer join covers users created before profiles were
+    created at sign-up (their profile fields are simply empty).
     
     Args:
         db: Database session
         user_id: User ID
     
     Returns:
-        User profile object
+        Profile response or None if the user does not exist
     """
-    profile = db.query(UserProfile).filter(UserProfile.user_id == user_id).first()
-    
-    if not profile:
-        # If not exists, create default profile
-        profile = UserProfile(user_id=user_id)
-        db.add(profile)
-        db.commit()
-        db.refresh(profile)
-    
+    cached = await profile_cache.get(user_id)
+    if cached is not None:
+        return ProfileResponse.model_validate(cached)
+    
+    # Taken before the read: an invalidation racing this fill wins
+    version = await profile_cache.version(user_id)
+    row = (await db.execute(_profile_query(user_id))).first()
+    if row is None:
+        return None
+    
+    profile = ProfileResponse.model_validate(row._mapping)
+    await profile_cache.set(user_id, profile.model_dump(mode="json"), version=version)
     return profile
 
 
-def update_user_profile(
-    db: Session,
-    user: User,
-    profile_data: ProfileUpdate
-) -> User:
+async def update_user_profile(
+    db: AsyncSession,
+    user_id: int,
+    changes: dict
+) -> ProfileResponse:
     """
-    Update user profile
+    Update user profile with the minimum number of writes
+    
+    The user's row is read and locked first (SELECT ... FOR UPDATE), and
+    fields equal to their stored value are dropped. The cached view is not
+    used for this: another worker's copy may be stale. What remains is
+    written with at most one UPDATE on users and one upsert on user_profiles,
+    and the response is built from the locked row and their RETURNING rows
+    only, then stored in the profile cache.
     
     Args:
         db: Database session
-        user: User object
-        profile_data: Profile update data
+        user_id: User ID
+        changes: Field values to set (None clears a profile field)
     
     Returns:
-        Updated user object
+        Updated profile
+    
+    Raises:
+        UserAlreadyExistsError: Username is already taken
     """
-    # Update user basic information
-    if profile_data.username is not None and profile_data.username != user.username:
-        # Check if username is already taken
-        existing_user = db.query(User).filter(
-            User.username == profile_data.username,
-            User.id != user.id
-        ).first()
-        if existing_user:
-            raise UserAlreadyExistsError()
-        user.username = profile_data.username
-    
-    # Get or create user profile
-    profile = get_user_profile(db, user.id)
-    
-    # Update profile information
-    if profile_data.nickname is not None:
-        profile.nickname = profile_data.nickname
-    if profile_data.avatar_url is not None:
-        profile.avatar_url = profile_data.avatar_url
-    if profile_data.bio is not None:
-        profile.bio = profile_data.bio
-    if profile_data.phone is not None:
-        profile.phone = profile_data.phone
-    
-    db.commit()
-    db.refresh(user)
-    db.refresh(profile)
+    # A username cannot be cleared, only changed
+    if changes.get("username", ...) is None:
+        del changes["username"]
+    
+    try:
+        # Only the users row can be locked: the profile is the nullable side
+        # of the join (the upsert below serializes on its primary key anyway)
+        row = (await db.execute(_profile_query(user_id).with_for_update(of=User))).one()
+        stored = dict(row._mapping)
+        changes = {k: v for k, v in changes.items() if stored[k] != v}
+        user_changes = {k: v for k, v in changes.items() if k in USER_FIELDS}
+        profile_changes = {k: v for k, v in changes.items() if k in PROFILE_FIELDS}
+        
+        if user_changes:
+            # The unique index rejects a taken username; no need to check first
+            row = (await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(**user_changes)
+                .returning(*(getattr(User, k) for k in USER_VIEW_FIELDS))
+            )).one()
+            stored.update(row._mapping)
+        
+        if profile_changes:
+            # Upsert: users created before profiles were added at sign-up may lack one
+            row = (await db.execute(
+                dialect_insert(db, UserProfile)
+                .values(user_id=user_id, **profile_changes)
+                .on_conflict_do_update(
+                    index_elements=[UserProfile.user_id],
+                    set_={**profile_changes, "updated_at": func.now()},
+                )
+                .returning(*(getattr(UserProfile, k) for k in PROFILE_FIELDS))
+            )).one()
+            stored.update(row._mapping)
+        
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise UserAlreadyExistsError()
+    
+    # Also refreshes a stale cached view when nothing changed
+    profile = ProfileResponse.model_validate(stored)
+    await profile_cache.set(user_id, profile.model_dump(mode="json"))
+    if user_changes:
+        await invalidate_principal(user_id)
+    if any(k in PROFILE_CRITERIA for k in changes):
+        await invalidate_recommendations(user_id)
     
-    return user
+    return profile
 
 
-def change_password(
-    db: Session,
-    user: User,
+async def change_password(
+    db: AsyncSession,
+    user_id: int,
     password_data: PasswordChange
 ) -> User:
     """
@@ -89,7 +159,7 @@ def change_password(
     
     Args:
         db: Database session
-        user: User object
+        user_id: User ID
         password_data: Password data
     
     Returns:
@@ -98,17 +168,22 @@ def change_password(
     Raises:
         InvalidCredentialsError: Old password is incorrect
     """
+    user = await get_user_by_id(db, user_id)
+    
     # Verify old password
     if not user.hashed_password:
         raise InvalidCredentialsError()
     
-    if not verify_password(password_data.old_password, user.hashed_password):
+    if not await password_hasher.verify(password_data.old_password, user.hashed_password):
         raise InvalidCredentialsError()
     
     # Update password
-    user.hashed_password = get_password_hash(password_data.new_password)
-    db.commit()
-    db.refresh(user)
+    user.hashed_password = await password_hasher.hash(password_data.new_password)
+    await db.commit()
+    await db.refresh(user)
+    await invalidate_principal(user.id)
+    # Sign out every device that knew the old password
+    await revoke_all_sessions(user.id)
     
     return user
 
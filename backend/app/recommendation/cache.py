@@ -0,0 +1,266 @@
+"""
+Recommendation Cache
+Computed recommendation responses, cached per user under a fingerprint of
+everything the result depends on
+
+    recommendations:<user_id>                Redis hash: fingerprint -> response JSON
+    recommendations:filled:<user_id>         sorted set: fingerprint -> fill time (ms)
+    recommendations:lock:<user_id>:<fp>      held by the worker computing an entry
+
+A user keeps at most `max_entries` entries; filling one more evicts the
+least recently filled.
+
+The fingerprint covers the effective criteria (the request merged with the
+profile's academic fields), the catalog version and, for text queries, the
+retrieval index versions, so a changed profile, catalog or index simply
+misses. update_user_profile also drops a user's entries when one of those
+profile fields changes, so stale entries do not linger until they expire.
+
+Identical misses are computed once: within a worker through SingleFlight,
+across workers through the lock key (the others wait for the entry to
+appear instead of computing it again).
+"""
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+from redis.exceptions import RedisError
+from app.config import settings
+from app.common.cache import SingleFlight, TTLCache
+from app.common.metrics import Counter
+from app.common.redis import get_redis, mark_redis_unavailable
+from app.recommendation.catalog import normalize_category, normalize_country
+from app.recommendation.schemas import RecommendationRequest
+
+recommendation_cache_requests_total = Counter(
+    "recommendation_cache_requests_total",
+    "Recommendation requests by cache result (hit, miss, coalesced)",
+    ("result",),
+)
+
+# Delete the lock only if it is still ours (it may have expired and been re-taken)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# KEYS: entries hash, fill times sorted set; ARGV: fingerprint, response, now (ms), ttl, max entries
+# Stores an entry and evicts the oldest fills beyond the limit
+STORE_SCRIPT = """
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[5])
+if excess > 0 then
+    local oldest = redis.call('ZRANGE', KEYS[2], 0, excess - 1)
+    redis.call('HDEL', KEYS[1], unpack(oldest))
+    redis.call('ZREM', KEYS[2], unpack(oldest))
+end
+return 0
+"""
+
+# How often a worker waiting on another worker's computation checks for the entry
+LOCK_POLL_SECONDS = 0.05
+
+
+def fingerprint(criteria: RecommendationRequest, *versions: str) -> str:
+    """
+    Stable hash of effective criteria plus data versions
+
+    Equivalent criteria hash the same: countries and majors are normalized
+    the way the scoring normalizes them, and country order is ignored.
+
+    Args:
+        criteria: Request merged with the profile
+        *versions: Catalog (and index) versions the result was computed from
+    """
+    data = criteria.model_dump(mode="json")
+    if data["target_countries"]:
+        data["target_countries"] = sorted({normalize_country(c) for c in data["target_countries"]})
+    if data["major"]:
+        data["major"] = normalize_category(data["major"])
+    if data["query"]:
+        data["query"] = " ".join(data["query"].split())
+    payload = json.dumps([data, versions], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class RecommendationCache:
+    """
+    Per-user cache of recommendation responses (JSON-serializable dicts)
+
+    An in-process tier holds each user's recent entries for `local_ttl`
+    seconds in front of Redis; without Redis the cache is local-only.
+
+    Args:
+        namespace: Redis key prefix
+        ttl: Redis expiry of a user's entries, seconds (refreshed on write)
+        local_ttl: In-process tier expiry, seconds
+        maxsize: Users held in the in-process tier
+        max_entries: Entries kept per user (distinct criteria / queries)
+        lock_timeout: Longest time a worker waits for another worker's
+            computation before computing itself, seconds
+    """
+
+    def __init__(self, namespace: str, ttl: int, local_ttl: float, maxsize: int, max_entries: int,
+                 lock_timeout: float):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock_timeout = lock_timeout
+        self.local = TTLCache(maxsize=maxsize, ttl=local_ttl)  # user_id -> {fingerprint: response}
+        self.flights = SingleFlight()
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.namespace}:{user_id}"
+
+    def _filled_key(self, user_id: int) -> str:
+        return f"{self.namespace}:filled:{user_id}"
+
+    def _lock_key(self, user_id: int, key: str) -> str:
+        return f"{self.namespace}:lock:{user_id}:{key}"
+
+    def _set_local(self, user_id: int, key: str, value: dict) -> None:
+        entries = dict(self.local.get(user_id) or {})
+        entries.pop(key, None)
+        entries[key] = value
+        while len(entries) > self.max_entries:
+            del entries[next(iter(entries))]  # Oldest first
+        self.local.set(user_id, entries)
+
+    async def get(self, user_id: int, key: str) -> Optional[dict]:
+        """Cached response, or None"""
+        value = (self.local.get(user_id) or {}).get(key)
+        if value is not None:
+            return value
+
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.hget(self._key(user_id), key)
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+            return None
+        if raw is None:
+            return None
+
+        value = json.loads(raw)
+        self._set_local(user_id, key, value)
+        return value
+
+    async def set(self, user_id: int, key: str, value: dict) -> None:
+        """Store a response in both tiers, evicting the user's oldest entries beyond `max_entries`"""
+        self._set_local(user_id, key, value)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.eval(
+                STORE_SCRIPT, 2, self._key(user_id), self._filled_key(user_id),
+                key, json.dumps(value), int(time.time() * 1000), self.ttl, self.max_entries,
+            )
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drop all of a user's entries"""
+        self.local.delete(user_id)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(self._key(user_id), self._filled_key(user_id))
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+
+    async def get_or_compute(self, user_id: int, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        Cached response, computing and storing it on a miss
+
+        Args:
+            user_id: User ID
+            key: Fingerprint of the request (see fingerprint())
+            compute: Coroutine function producing the response
+        """
+        value = await self.get(user_id, key)
+        if value is not None:
+            recommendation_cache_requests_total.inc("hit")
+            return value
+        if (user_id, key) in self.flights:
+            recommendation_cache_requests_total.inc("coalesced")
+        return await self.flights.do((user_id, key), lambda: self._fill(user_id, key, compute))
+
+    async def _fill(self, user_id: int, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        redis = get_redis()
+        lock_key, token = self._lock_key(user_id, key), uuid.uuid4().hex
+        locked = False
+        if redis is not None:
+            try:
+                locked = bool(await redis.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)))
+            except (RedisError, OSError) as e:
+                mark_redis_unavailable(e)
+            if not locked and get_redis() is not None:
+                value = await self._wait_for_entry(user_id, key, lock_key)
+                if value is not None:
+                    recommendation_cache_requests_total.inc("coalesced")
+                    return value
+
+        recommendation_cache_requests_total.inc("miss")
+        try:
+            value = await compute()
+            await self.set(user_id, key, value)
+            return value
+        finally:
+            if locked:
+                try:
+                    await redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except (RedisError, OSError) as e:
+                    mark_redis_unavailable(e)
+
+    async def _wait_for_entry(self, user_id: int, key: str, lock_key: str) -> Optional[dict]:
+        """Wait for another worker's computation; None if it fails or takes too long"""
+        redis = get_redis()
+        deadline = time.monotonic() + self.lock_timeout
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.hget(self._key(user_id), key)
+                    pipe.exists(lock_key)
+                    raw, locked = await pipe.execute()
+                if raw is not None:
+                    value = json.loads(raw)
+                    self._set_local(user_id, key, value)
+                    return value
+                if not locked:
+                    return None  # The other worker gave up without storing a result
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+        return None
+
+
+recommendation_cache = RecommendationCache(
+    namespace="recommendations",
+    ttl=settings.RECOMMENDATION_CACHE_TTL,
+    local_ttl=settings.RECOMMENDATION_CACHE_LOCAL_TTL,
+    maxsize=settings.RECOMMENDATION_CACHE_MAXSIZE,
+    max_entries=settings.RECOMMENDATION_CACHE_MAX_ENTRIES,
+    lock_timeout=settings.RECOMMENDATION_CACHE_LOCK_TIMEOUT,
+)
+
+
+async def invalidate_recommendations(user_id: int) -> None:
+    """
+    Drop a user's cached recommendations after a criteria field of their
+    profile changes
+
+    Args:
+        user_id: User ID
+    """
+    await recommendation_cache.invalidate(user_id)
@@ -0,0 +1,207 @@
+"""
+Program Catalog
+Active programs held in memory as column-oriented NumPy arrays, so scoring a
+profile against every program is a handful of vectorized operations instead
+of a query plus a Python loop per request
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Mapping, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.common.metrics import Gauge
+from app.recommendation.models import Program
+
+logger = logging.getLogger(__name__)
+
+# Broad field of each major category; programs in the same field as the
+# student's major count as a partial match
+MAJOR_GROUPS = {
+    "computer_science": "stem", "data_science": "stem", "software_engineering": "stem",
+    "electrical_engineering": "stem", "mechanical_engineering": "stem", "civil_engineering": "stem",
+    "mathematics": "stem", "statistics": "stem", "physics": "stem", "chemistry": "stem", "biology": "stem",
+    "business": "business", "management": "business", "finance": "business",
+    "accounting": "business", "marketing": "business", "economics": "business",
+    "law": "social", "psychology": "social", "sociology": "social", "education": "social",
+    "political_science": "social", "international_relations": "social", "media": "social",
+    "art": "arts", "design": "arts", "architecture": "arts", "music": "arts",
+    "medicine": "health", "public_health": "health", "nursing": "health", "pharmacy": "health",
+}
+
+MAJOR_GROUP_NAMES = sorted(set(MAJOR_GROUPS.values()))
+
+# ETS TOEFL iBT -> IELTS band comparison, interpolated between points
+TOEFL_POINTS = (0, 32, 35, 46, 60, 79, 94, 102, 110, 115, 118, 120)
+IELTS_POINTS = (0.0, 4.5, 5.0, 5.5, 6.0, 6.5, 7.0, 7.5, 8.0, 8.5, 9.0, 9.0)
+
+# Columns loaded into the catalog (descriptions stay in the database)
+CATALOG_COLUMNS = (
+    Program.id, Program.school_name, Program.program_name, Program.country, Program.city,
+    Program.degree, Program.major, Program.qs_rank, Program.tuition,
+    Program.min_gpa, Program.min_ielts, Program.min_toefl,
+)
+
+
+def normalize_country(value: str) -> str:
+    return value.strip().upper()
+
+
+def normalize_category(value: str) -> str:
+    """Canonical form of a degree or major name ("Computer Science" -> "computer_science")"""
+    return value.strip().lower().replace("-", "_").replace(" ", "_")
+
+
+def major_group_code(major: str) -> int:
+    """Code of a major's broad field, -1 if the major is not in MAJOR_GROUPS"""
+    group = MAJOR_GROUPS.get(major)
+    return MAJOR_GROUP_NAMES.index(group) if group else -1
+
+
+def toefl_to_ielts(scores):
+    """IELTS band equivalent of TOEFL scores (NaN stays NaN)"""
+    return np.interp(scores, TOEFL_POINTS, IELTS_POINTS)
+
+
+class ProgramCatalog:
+    """
+    Immutable snapshot of the active programs
+
+    Numeric requirements are float32 arrays with NaN meaning "not specified".
+    Categorical fields are int32 codes into a per-column vocabulary, so
+    filters compare integers. Display fields stay Python lists and are only
+    read for the programs actually returned.
+
+    Args:
+        rows: Program rows (mappings with the CATALOG_COLUMNS keys)
+    """
+
+    def __init__(self, rows: Sequence[Mapping]):
+        self.ids = np.array([row["id"] for row in rows], dtype=np.int64)
+        self.qs_rank = self._floats(rows, "qs_rank")
+        self.tuition = self._floats(rows, "tuition")
+        self.min_gpa = self._floats(rows, "min_gpa")
+        # Either test is accepted, so the requirement is the easier of the two
+        self.min_language_band = np.fmin(
+            self._floats(rows, "min_ielts"),
+            toefl_to_ielts(self._floats(rows, "min_toefl")).astype(np.float32),
+        )
+
+        self.countries, self.country = self._encode(rows, "country", normalize_country)
+        self.degrees, self.degree = self._encode(rows, "degree", normalize_category)
+        self.majors, self.major = self._encode(rows, "major", normalize_category)
+        group_of_major = np.array([major_group_code(m) for m in self.majors], dtype=np.int32)
+        self.major_group = group_of_major[self.major] if self.majors else np.empty(0, dtype=np.int32)
+
+        self.school_name = [row["school_name"] for row in rows]
+        self.program_name = [row["program_name"] for row in rows]
+        self.city = [row["city"] for row in rows]
+
+        self.version = self._digest()
+
+    @staticmethod
+    def _floats(rows: Sequence[Mapping], column: str) -> np.ndarray:
+        return np.array(
+            [np.nan if row[column] is None else row[column] for row in rows], dtype=np.float32
+        )
+
+    @staticmethod
+    def _encode(rows: Sequence[Mapping], column: str, normalize) -> tuple[list[str], np.ndarray]:
+        vocabulary: dict[str, int] = {}
+        codes = np.array(
+            [vocabulary.setdefault(normalize(row[column]), len(vocabulary)) for row in rows],
+            dtype=np.int32,
+        )
+        return list(vocabulary), codes
+
+    def _digest(self) -> str:
+        """Content hash: identical catalogs get the same version in every worker"""
+        digest = hashlib.sha1()
+        for array in (self.ids, self.qs_rank, self.tuition, self.min_gpa, self.min_language_band,
+                      self.country, self.degree, self.major):
+            digest.update(array.tobytes())
+        for vocabulary in (self.countries, self.degrees, self.majors, self.school_name, self.program_name):
+            digest.update("\0".join(str(v) for v in vocabulary).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def code(self, vocabulary: str, value: str) -> int:
+        """Code of a (normalized) value in one of countries/degrees/majors, -1 if absent"""
+        try:
+            return getattr(self, vocabulary).index(value)
+        except ValueError:
+            return -1
+
+
+class CatalogLoader:
+    """
+    Loads the catalog on first use and reloads it after `ttl` seconds
+
+    A reload builds a new snapshot and swaps it in; while one request
+    reloads, others keep scoring against the previous snapshot.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._catalog: Optional[ProgramCatalog] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def current(self) -> Optional[ProgramCatalog]:
+        """Last loaded snapshot, without triggering a load"""
+        return self._catalog
+
+    def _fresh(self) -> bool:
+        return self._catalog is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    async def get(self, db: AsyncSession) -> ProgramCatalog:
+        """
+        Current catalog snapshot
+
+        Args:
+            db: Database session (used only when the catalog must be loaded)
+        """
+        if self._fresh():
+            return self._catalog
+        if self._lock.locked() and self._catalog is not None:
+            return self._catalog
+        async with self._lock:
+            if not self._fresh():
+                await self._load(db)
+        return self._catalog
+
+    async def _load(self, db: AsyncSession) -> None:
+        started = time.perf_counter()
+        result = await db.execute(
+            select(*CATALOG_COLUMNS).where(Program.is_active.is_not(False)).order_by(Program.id)
+        )
+        catalog = ProgramCatalog(result.mappings().all())
+        self._catalog = catalog
+        self._loaded_at = time.monotonic()
+        logger.info(
+            f"Loaded program catalog: {len(catalog)} programs, version {catalog.version} "
+            f"({(time.perf_counter() - started) * 1000:.1f} ms)"
+        )
+
+    def set(self, catalog: ProgramCatalog) -> None:
+        """Install a prebuilt snapshot (e.g. from a benchmark)"""
+        self._catalog = catalog
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Reload on the next request (call after changing programs)"""
+        self._loaded_at = 0.0
+
+
+program_catalog = CatalogLoader(ttl=settings.RECOMMENDATION_CATALOG_TTL)
+Gauge("recommendation_catalog_programs", "Programs in this worker's catalog snapshot").set_function(
+    lambda: len(program_catalog.current) if program_catalog.current is not None else 0
+)
@@ -0,0 +1,78 @@
+"""
+Embedders
+Pluggable text embedding models, selected by an import spec
+("package.module:ClassName") so the pipeline and the API load the same one
+
+An embedder has a `name` (part of every content hash), a `dim`, and
+`embed(texts) -> float32 array of shape (len(texts), dim)` returning
+L2-normalized rows.
+"""
+import hashlib
+import importlib
+import re
+
+import numpy as np
+
+# Latin words/numbers, or single CJK characters (Chinese has no spaces)
+TOKEN = re.compile(r"[a-z0-9]+|[㐀-䶿一-鿿]")
+
+
+class HashingEmbedder:
+    """
+    Dependency-free stand-in model: feature hashing of words, CJK character
+    bigrams and word bigrams into `dim` buckets
+
+    Captures lexical overlap only, but is deterministic and fast enough to
+    run the pipeline and the semantic search end to end without a model
+    download.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> list[str]:
+        tokens = TOKEN.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                vectors[row, digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """
+    sentence-transformers model (pip install sentence-transformers)
+
+    Args:
+        model: Model name, e.g. a multilingual model for Chinese + English text
+    """
+
+    def __init__(self, model: str = "paraphrase-multilingual-MiniLM-L12-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model)
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = f"st-{model}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return self._model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def load_embedder(spec: str, **options):
+    """
+    Instantiate an embedder from "package.module:ClassName"
+
+    Args:
+        spec: Import spec of the embedder class
+        **options: Constructor arguments
+    """
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Embedder spec must look like 'module:Class', got {spec!r}")
+    return getattr(importlib.import_module(module_name), class_name)(**options)
@@ -0,0 +1,99 @@
+"""
+Index Versions
+Versioned on-disk index directories shared by the vector and lexical indexes
+
+    <directory>/CURRENT      name of the active version
+    <directory>/<version>/   files of one build
+
+A build writes a new version directory, then publish() switches CURRENT
+atomically. Workers re-check CURRENT periodically and open the new version;
+processes still mapping files of an older one keep reading them safely.
+"""
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Callable, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def new_version(directory: str) -> tuple[str, str]:
+    """
+    Create an empty version directory
+
+    Returns:
+        (version name, path)
+    """
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    path = os.path.join(directory, version)
+    os.makedirs(path)
+    return version, path
+
+
+def read_current(directory: str) -> Optional[str]:
+    """Name of the active version, None if nothing has been published"""
+    try:
+        with open(os.path.join(directory, "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish(directory: str, version: str) -> None:
+    """Make `version` active, then drop versions older than the previous one"""
+    current = os.path.join(directory, "CURRENT")
+    previous = read_current(directory)
+    tmp = f"{current}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, current)
+    for name in os.listdir(directory):
+        if name not in (version, previous, "CURRENT") and os.path.isdir(os.path.join(directory, name)):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+class IndexLoader(Generic[T]):
+    """
+    Per-process handle on the active version of an index directory
+
+    Re-checks CURRENT at most every `reload_seconds`, so workers pick up a
+    rebuilt index without a restart.
+
+    Args:
+        get_directory: Returns the index directory (read at check time, so
+            settings overrides apply)
+        opener: Opens a version directory
+        reload_seconds: Minimum seconds between CURRENT checks
+    """
+
+    def __init__(self, get_directory: Callable[[], str], opener: Callable[[str], T], reload_seconds: float):
+        self.get_directory = get_directory
+        self.opener = opener
+        self.reload_seconds = reload_seconds
+        self._index: Optional[T] = None
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+
+    def get(self) -> Optional[T]:
+        """Active index, or None if none has been built"""
+        now = time.monotonic()
+        if self._checked_at and now - self._checked_at < self.reload_seconds:
+            return self._index
+        self._checked_at = now
+        directory = self.get_directory()
+        version = read_current(directory)
+        if version is None:
+            self._index, self._version = None, None
+        elif version != self._version:
+            self._index = self.opener(os.path.join(directory, version))
+            self._version = version
+            logger.info(f"Opened index {directory}/{version}")
+        return self._index
+
+    def reset(self) -> None:
+        """Forget the open index; the next get() checks CURRENT again"""
+        self._index, self._version, self._checked_at = None, None, 0.0
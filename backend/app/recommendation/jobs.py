@@ -0,0 +1,651 @@
+"""
+Recommendation Jobs
+Asynchronous recommendation rounds: POST /api/recommendations queues a job
+and returns its ID at once, workers run it, and the client polls
+GET /api/recommendations/{id} for the result
+
+    recommendation_jobs:job:<id>                   Redis hash: the job record
+    recommendation_jobs:queue                      list of queued job IDs
+    recommendation_jobs:processing                 job IDs taken off the queue, until claimed
+    recommendation_jobs:inflight:<user_id>:<fp>    ID of the user's unfinished job for fingerprint fp
+    recommendation_jobs:active:<user_id>           sorted set: the user's unfinished jobs by deadline
+
+A job moves queued -> running -> succeeded | failed, or to cancelled from
+either of the first two. Every transition is a Lua script that checks the
+current status, so a worker finishing a job the user just cancelled does
+not overwrite the cancellation. Submitting the same criteria while a job
+for them is unfinished returns that job instead of queueing another.
+
+Each process runs up to RECOMMENDATION_JOB_WORKERS jobs at once, with a
+thread pool of the same size for their blocking work. One dispatcher per
+process waits for queued jobs with BLMOVE, which moves the ID to the
+processing list atomically, so a process dying before it claims the job
+does not lose it: IDs left there are put back on the queue by the next
+idle dispatcher. A running job whose record is switched to cancelled is
+stopped within RECOMMENDATION_JOB_POLL_SECONDS, and jobs that do not
+finish within RECOMMENDATION_JOB_TIMEOUT of submission fail as timed out,
+also when the worker running them died. Work already running in the
+thread pool cannot be interrupted, so a stopped job keeps its slot until
+that work ends. Without Redis (REDIS_ENABLED=false) jobs live in process
+memory and only this process's workers run them.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+from redis.exceptions import RedisError
+from app.config import settings
+from app.common.exceptions import RateLimitExceededError, ServiceBusyError
+from app.common.metrics import Counter
+from app.common.redis import get_blocking_redis, get_redis, mark_redis_unavailable
+
+logger = logging.getLogger(__name__)
+
+recommendation_jobs_total = Counter(
+    "recommendation_jobs_total",
+    "Recommendation job submissions by outcome (queued, deduplicated, cached, rejected)",
+    ("result",),
+)
+recommendation_jobs_finished_total = Counter(
+    "recommendation_jobs_finished_total",
+    "Recommendation jobs run by a worker, by final status",
+    ("status",),
+)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# KEYS: job, inflight, user's active jobs, queue
+# ARGV: job ID, now (ms), deadline (ms), record TTL (ms), queue limit, user limit, field/value pairs...
+SUBMIT_SCRIPT = """
+local existing = redis.call('GET', KEYS[2])
+if existing then
+    return {'deduplicated', existing}
+end
+if redis.call('LLEN', KEYS[4]) >= tonumber(ARGV[5]) then
+    return {'busy', ''}
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[2])
+if redis.call('ZCARD', KEYS[3]) >= tonumber(ARGV[6]) then
+    return {'limited', ''}
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 7))
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+redis.call('SET', KEYS[2], ARGV[1], 'PXAT', ARGV[3])
+redis.call('ZADD', KEYS[3], ARGV[3], ARGV[1])
+redis.call('PEXPIREAT', KEYS[3], ARGV[3])
+redis.call('RPUSH', KEYS[4], ARGV[1])
+return {'queued', ARGV[1]}
+"""
+
+# KEYS: job, processing list; ARGV: job ID, now
+# Returns the record if the job was still queued (it is now running)
+CLAIM_SCRIPT = """
+redis.call('LREM', KEYS[2], 1, ARGV[1])
+if redis.call('HGET', KEYS[1], 'status') ~= 'queued' then
+    return {}
+end
+redis.call('HSET', KEYS[1], 'status', 'running', 'started_at', ARGV[2])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# KEYS: processing list, queue; ARGV: job key prefix
+# Puts jobs moved off the queue but never claimed back at its front. A job a
+# live dispatcher is about to claim may be put back too; it then runs once,
+# as claiming skips jobs that are no longer queued.
+RECOVER_SCRIPT = """
+local recovered = 0
+for _, id in ipairs(redis.call('LRANGE', KEYS[1], 0, -1)) do
+    redis.call('LREM', KEYS[1], 1, id)
+    if redis.call('HGET', ARGV[1] .. id, 'status') == 'queued' then
+        redis.call('LPUSH', KEYS[2], id)
+        recovered = recovered + 1
+    end
+end
+return recovered
+"""
+
+# KEYS: job, inflight, user's active jobs
+# ARGV: job ID, allowed current statuses (space separated), field/value pairs...
+# Returns the previous status, or false if the job is gone
+TRANSITION_SCRIPT = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if not status then
+    return false
+end
+if not string.find(' ' .. ARGV[2] .. ' ', ' ' .. status .. ' ', 1, true) then
+    return status
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+if redis.call('GET', KEYS[2]) == ARGV[1] then
+    redis.call('DEL', KEYS[2])
+end
+redis.call('ZREM', KEYS[3], ARGV[1])
+return status
+"""
+
+# KEYS: job, queue; ARGV: job ID
+REQUEUE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'running' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', 'queued')
+redis.call('HDEL', KEYS[1], 'started_at')
+redis.call('LPUSH', KEYS[2], ARGV[1])
+return 1
+"""
+
+# Record fields stored as JSON / as numbers in the Redis hash
+JSON_FIELDS = ("criteria", "result")
+FLOAT_FIELDS = ("created_at", "started_at", "finished_at")
+
+
+def _encode(fields: dict) -> dict[str, str]:
+    return {
+        name: json.dumps(value) if name in JSON_FIELDS else str(value)
+        for name, value in fields.items()
+        if value is not None
+    }
+
+
+def _pairs(fields: dict) -> list[str]:
+    """Field/value arguments of a script"""
+    return [item for pair in _encode(fields).items() for item in pair]
+
+
+def _decode(raw: dict) -> dict:
+    record = dict(raw)
+    record["user_id"] = int(record["user_id"])
+    for name in JSON_FIELDS:
+        record[name] = json.loads(record[name]) if name in record else None
+    for name in FLOAT_FIELDS:
+        record[name] = float(record[name]) if name in record else None
+    record.setdefault("error", None)
+    return record
+
+
+class RedisJobStore:
+    """Jobs in Redis, shared by all workers and processes"""
+
+    def __init__(self, namespace: str = "recommendation_jobs"):
+        self.namespace = namespace
+        self._scripts = {}
+        self._client = None
+
+    def _script(self, redis, source: str):
+        if self._client is not redis:
+            self._scripts = {}
+            self._client = redis
+        if source not in self._scripts:
+            self._scripts[source] = redis.register_script(source)
+        return self._scripts[source]
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.namespace}:job:{job_id}"
+
+    def _keys(self, record: dict) -> list[str]:
+        """Job, inflight and active-jobs keys of a record"""
+        return [
+            self._job_key(record["id"]),
+            f"{self.namespace}:inflight:{record['user_id']}:{record['fingerprint']}",
+            f"{self.namespace}:active:{record['user_id']}",
+        ]
+
+    @property
+    def _queue_key(self) -> str:
+        return f"{self.namespace}:queue"
+
+    @property
+    def _processing_key(self) -> str:
+        return f"{self.namespace}:processing"
+
+    async def _call(self, operation):
+        redis = get_redis()
+        if redis is None:
+            # Jobs submitted here may be polled from any worker; without the
+            # shared store neither works, so fail retryably
+            raise ServiceBusyError(retry_after=settings.REDIS_RETRY_SECONDS)
+        try:
+            return await operation(redis)
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+            raise ServiceBusyError(retry_after=settings.REDIS_RETRY_SECONDS)
+
+    async def submit(self, record: dict, deadline: float, ttl: float, queue_limit: int,
+                     user_limit: int) -> tuple[str, str]:
+        outcome, job_id = await self._call(lambda redis: self._script(redis, SUBMIT_SCRIPT)(
+            keys=self._keys(record) + [self._queue_key],
+            args=[record["id"], int(time.time() * 1000), int(deadline * 1000), int(ttl * 1000),
+                  queue_limit, user_limit, *_pairs(record)],
+        ))
+        return outcome, job_id
+
+    async def save(self, record: dict, ttl: float) -> None:
+        key = self._job_key(record["id"])
+
+        async def write(redis):
+            async with redis.pipeline(transaction=True) as pipe:
+                await pipe.hset(key, mapping=_encode(record)).expire(key, int(ttl)).execute()
+
+        await self._call(write)
+
+    async def claim(self, block: float) -> Optional[dict]:
+        blocking = get_blocking_redis()
+        if blocking is None:
+            raise ServiceBusyError(retry_after=settings.REDIS_RETRY_SECONDS)
+        try:
+            job_id = await blocking.blmove(self._queue_key, self._processing_key, block, "LEFT", "RIGHT")
+        except (RedisError, OSError) as e:
+            mark_redis_unavailable(e)
+            raise ServiceBusyError(retry_after=settings.REDIS_RETRY_SECONDS)
+
+        if job_id is None:
+            # Idle: put back jobs whose dispatcher died between move and claim
+            recovered = await self._call(lambda redis: self._script(redis, RECOVER_SCRIPT)(
+                keys=[self._processing_key, self._queue_key], args=[self._job_key("")],
+            ))
+            if recovered:
+                logger.warning(f"Requeued {recovered} unclaimed recommendation jobs")
+            return None
+        raw = await self._call(lambda redis: self._script(redis, CLAIM_SCRIPT)(
+            keys=[self._job_key(job_id), self._processing_key], args=[job_id, time.time()],
+        ))
+        # Empty if cancelled (or expired) while queued
+        return _decode(dict(zip(raw[::2], raw[1::2]))) if raw else None
+
+    async def transition(self, record: dict, allowed: tuple[str, ...], fields: dict) -> Optional[str]:
+        return await self._call(lambda redis: self._script(redis, TRANSITION_SCRIPT)(
+            keys=self._keys(record), args=[record["id"], " ".join(allowed), *_pairs(fields)],
+        ))
+
+    async def requeue(self, job_id: str) -> None:
+        await self._call(lambda redis: self._script(redis, REQUEUE_SCRIPT)(
+            keys=[self._job_key(job_id), self._queue_key], args=[job_id],
+        ))
+
+    async def status(self, job_id: str) -> Optional[str]:
+        return await self._call(lambda redis: redis.hget(self._job_key(job_id), "status"))
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        raw = await self._call(lambda redis: redis.hgetall(self._job_key(job_id)))
+        return _decode(raw) if raw else None
+
+
+class LocalJobStore:
+    """In-process jobs for single-worker setups without Redis (REDIS_ENABLED=false)"""
+
+    def __init__(self, purge_threshold: int = 10000):
+        self.purge_threshold = purge_threshold
+        self._jobs: dict[str, tuple[dict, float]] = {}  # ID -> (record, expiry)
+        self._queue: deque[str] = deque()
+        self._inflight: dict[tuple[int, str], str] = {}
+        self._active: dict[int, dict[str, float]] = {}  # user ID -> {job ID: deadline}
+
+    def _record(self, job_id: str) -> Optional[dict]:
+        entry = self._jobs.get(job_id)
+        if entry is None or entry[1] <= time.time():
+            self._jobs.pop(job_id, None)
+            return None
+        return entry[0]
+
+    async def submit(self, record: dict, deadline: float, ttl: float, queue_limit: int,
+                     user_limit: int) -> tuple[str, str]:
+        now = time.time()
+        existing = self._inflight.get((record["user_id"], record["fingerprint"]))
+        if existing is not None and self._active.get(record["user_id"], {}).get(existing, 0) > now:
+            return "deduplicated", existing
+        if len(self._queue) >= queue_limit:
+            return "busy", ""
+        active = {k: v for k, v in self._active.get(record["user_id"], {}).items() if v > now}
+        if len(active) >= user_limit:
+            return "limited", ""
+        await self.save(record, ttl)
+        self._inflight[(record["user_id"], record["fingerprint"])] = record["id"]
+        active[record["id"]] = deadline
+        self._active[record["user_id"]] = active
+        self._queue.append(record["id"])
+        return "queued", record["id"]
+
+    async def save(self, record: dict, ttl: float) -> None:
+        now = time.time()
+        if len(self._jobs) >= self.purge_threshold:
+            self._jobs = {k: v for k, v in self._jobs.items() if v[1] > now}
+        self._jobs[record["id"]] = (dict(record), now + ttl)
+
+    async def claim(self, block: float) -> Optional[dict]:
+        # Never waits: the runner is woken by notify() when a job is queued
+        while self._queue:
+            record = self._record(self._queue.popleft())
+            if record is not None and record["status"] == "queued":
+                record.update(status="running", started_at=time.time())
+                return dict(record)
+        return None
+
+    async def transition(self, record: dict, allowed: tuple[str, ...], fields: dict) -> Optional[str]:
+        current = self._record(record["id"])
+        if current is None:
+            return None
+        status = current["status"]
+        if status not in allowed:
+            return status
+        current.update(fields)
+        key = (record["user_id"], record["fingerprint"])
+        if self._inflight.get(key) == record["id"]:
+            del self._inflight[key]
+        active = self._active.get(record["user_id"], {})
+        active.pop(record["id"], None)
+        if not active:
+            self._active.pop(record["user_id"], None)
+        return status
+
+    async def requeue(self, job_id: str) -> None:
+        record = self._record(job_id)
+        if record is not None and record["status"] == "running":
+            record.update(status="queued", started_at=None)
+            self._queue.appendleft(job_id)
+
+    async def status(self, job_id: str) -> Optional[str]:
+        record = self._record(job_id)
+        return record["status"] if record else None
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        record = self._record(job_id)
+        return dict(record) if record else None
+
+
+_redis_store = RedisJobStore()
+_local_store = LocalJobStore()
+
+
+def _store():
+    return _redis_store if settings.REDIS_ENABLED else _local_store
+
+
+def _timed_out(record: dict) -> bool:
+    return record["status"] in ACTIVE_STATUSES and time.time() > record["created_at"] + settings.RECOMMENDATION_JOB_TIMEOUT
+
+
+async def submit_job(user_id: int, key: str, criteria: dict, result: Optional[dict] = None) -> dict:
+    """
+    Queue a recommendation job, or return the user's unfinished job for the
+    same criteria
+
+    Args:
+        user_id: User ID
+        key: Fingerprint of the effective criteria (see cache.fingerprint())
+        criteria: Effective criteria, as JSON data
+        result: Response already known (e.g. from the cache); the job is then
+            stored as succeeded without queueing
+
+    Returns:
+        Job record
+
+    Raises:
+        ServiceBusyError: Queue full, or the job store is unavailable
+        RateLimitExceededError: Too many unfinished jobs for this user
+    """
+    now = time.time()
+    record = {
+        "id": uuid.uuid4().hex, "user_id": user_id, "fingerprint": key, "status": "queued",
+        "criteria": criteria, "created_at": now, "started_at": None, "finished_at": None,
+        "result": None, "error": None,
+    }
+    ttl = settings.RECOMMENDATION_JOB_TTL + settings.RECOMMENDATION_JOB_TIMEOUT
+    if result is not None:
+        record.update(status="succeeded", started_at=now, finished_at=now, result=result)
+        await _store().save(record, ttl)
+        recommendation_jobs_total.inc("cached")
+        return record
+
+    outcome, job_id = await _store().submit(
+        record,
+        deadline=now + settings.RECOMMENDATION_JOB_TIMEOUT,
+        ttl=ttl,
+        queue_limit=settings.RECOMMENDATION_JOB_QUEUE_LIMIT,
+        user_limit=settings.RECOMMENDATION_JOB_USER_LIMIT,
+    )
+    if outcome == "busy":
+        recommendation_jobs_total.inc("rejected")
+        raise ServiceBusyError(retry_after=1)
+    if outcome == "limited":
+        recommendation_jobs_total.inc("rejected")
+        raise RateLimitExceededError(retry_after=settings.RECOMMENDATION_JOB_POLL_SECONDS)
+    recommendation_jobs_total.inc(outcome)
+    if outcome == "deduplicated":
+        existing = await get_job(user_id, job_id)
+        if existing is not None:
+            return existing
+        return await submit_job(user_id, key, criteria)  # Expired in between
+    return record
+
+
+async def get_job(user_id: int, job_id: str) -> Optional[dict]:
+    """
+    A user's job record
+
+    A job still unfinished past its deadline (its worker died) is reported
+    as failed.
+
+    Args:
+        user_id: User ID (other users' jobs are not found)
+        job_id: Job ID
+
+    Returns:
+        Job record, or None if it does not exist, expired or is not the user's
+    """
+    record = await _store().get(job_id)
+    if record is None or record["user_id"] != user_id:
+        return None
+    if _timed_out(record):
+        record.update(status="failed", error="Timed out")
+    return record
+
+
+async def cancel_job(user_id: int, job_id: str) -> Optional[dict]:
+    """
+    Cancel a user's queued or running job (no-op once it has finished)
+
+    Args:
+        user_id: User ID
+        job_id: Job ID
+
+    Returns:
+        Job record after cancellation, or None if not found
+    """
+    record = await get_job(user_id, job_id)
+    if record is None or record["status"] not in ACTIVE_STATUSES:
+        return record
+    await _store().transition(record, ACTIVE_STATUSES, {"status": "cancelled", "finished_at": time.time()})
+    return await get_job(user_id, job_id)
+
+
+# ID of the job the current task works for (inherited by tasks it starts)
+_current_job: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("recommendation_job", default=None)
+
+
+class JobRunner:
+    """
+    Runs queued jobs, at most `workers` at a time
+
+    One dispatcher task takes a job off the queue whenever a slot is free
+    and runs it in its own task. Blocking work of a job goes through
+    run_in_thread(), on a thread pool with one thread per slot; since such
+    work cannot be interrupted, a job that is cancelled or times out keeps
+    its slot until the work it started has ended.
+
+    Args:
+        execute: Coroutine function computing a job's result (JSON data)
+            from its record
+        workers: Jobs run concurrently by this process
+        timeout: Seconds from submission before a job is abandoned
+        poll_seconds: How often a running job is checked for cancellation
+        block_seconds: How long an idle dispatcher waits for a job per
+            queue read (BLMOVE) before checking for unclaimed jobs
+    """
+
+    def __init__(self, execute: Callable[[dict], Awaitable[dict]], workers: int, timeout: float,
+                 poll_seconds: float, block_seconds: float = 5):
+        self.execute = execute
+        self.workers = workers
+        self.timeout = timeout
+        self.poll_seconds = poll_seconds
+        self.block_seconds = block_seconds
+        self._tasks: set[asyncio.Task] = set()
+        self._running: dict[str, asyncio.Task] = {}
+        self._threads: dict[str, set[concurrent.futures.Future]] = {}
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._slots = asyncio.Semaphore(max(workers, 1))
+        self._wakeup = asyncio.Event()
+
+    def start(self, workers: Optional[int] = None) -> None:
+        """Start the dispatcher (call from the running event loop)"""
+        count = self.workers if workers is None else workers
+        if count <= 0:
+            return
+        # Bound to the current loop
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(count)
+        self._executor = concurrent.futures.ThreadPoolExecutor(count, thread_name_prefix="recommendation-job")
+        self._spawn(self._dispatch())
+
+    async def stop(self) -> None:
+        """Stop the dispatcher; jobs being run go back to the queue"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def notify(self) -> None:
+        """Wake an idle dispatcher (a job was just queued by this process)"""
+        self._wakeup.set()
+
+    def cancel(self, job_id: str) -> None:
+        """Stop a job if this process is running it (others notice within poll_seconds)"""
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    async def run_in_thread(self, func: Callable[..., Any], *args) -> Any:
+        """
+        Run blocking work of the current job on the runner's thread pool
+
+        The calling job's slot stays taken until `func` returns, even if the
+        job is cancelled or times out first. Outside a started runner this
+        falls back to asyncio.to_thread().
+        """
+        if self._executor is None:
+            return await asyncio.to_thread(func, *args)
+        future = self._executor.submit(func, *args)
+        job_id = _current_job.get()
+        if job_id is not None:
+            self._threads.setdefault(job_id, set()).add(future)
+        return await asyncio.wrap_future(future)
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self) -> None:
+        while True:
+            await self._slots.acquire()
+            try:
+                record = await self._claim()
+            except BaseException:
+                self._slots.release()
+                raise
+            if record is None:
+                self._slots.release()
+            else:
+                self._spawn(self._run_in_slot(record))
+
+    async def _claim(self) -> Optional[dict]:
+        """Wait up to block_seconds for a job"""
+        self._wakeup.clear()
+        started = time.monotonic()
+        try:
+            record = await _store().claim(self.block_seconds)
+        except ServiceBusyError:
+            record = None  # Store unavailable; retry after the block interval
+        except Exception:
+            logger.exception("Could not claim a recommendation job")
+            record = None
+        if record is None:
+            # The local store (and a store that failed) returns at once; wait
+            # out the interval unless this process queues a job meanwhile
+            remaining = self.block_seconds - (time.monotonic() - started)
+            if remaining > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        return record
+
+    async def _run_in_slot(self, record: dict) -> None:
+        try:
+            await self._run(record)
+        finally:
+            self._slots.release()
+
+    async def _cancelled(self, job_id: str) -> bool:
+        try:
+            return await _store().status(job_id) == "cancelled"
+        except ServiceBusyError:
+            return False
+
+    async def _run(self, record: dict) -> None:
+        job_id = record["id"]
+        _current_job.set(job_id)
+        task = asyncio.create_task(self.execute(record))
+        self._running[job_id] = task
+        deadline = record["created_at"] + self.timeout
+        try:
+            while not task.done():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    task.cancel()
+                    break
+                await asyncio.wait({task}, timeout=min(self.poll_seconds, remaining))
+                if not task.done() and await self._cancelled(job_id):
+                    task.cancel()
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # Worker stopped mid-job: let another worker run it
+            task.cancel()
+            self._threads.pop(job_id, None)
+            try:
+                await _store().requeue(job_id)
+            except ServiceBusyError:
+                pass  # It fails as timed out instead
+            raise
+        finally:
+            self._running.pop(job_id, None)
+
+        if task.cancelled():
+            fields = {"status": "failed", "error": "Timed out"}
+        elif task.exception() is not None:
+            logger.error(f"Recommendation job {job_id} failed", exc_info=task.exception())
+            fields = {"status": "failed", "error": "Recommendation failed"}
+        else:
+            fields = {"status": "succeeded", "result": task.result()}
+        fields["finished_at"] = time.time()
+        try:
+            # Only a job that is still running is updated (not one cancelled meanwhile)
+            if await _store().transition(record, ("running",), fields) == "running":
+                recommendation_jobs_finished_total.inc(fields["status"])
+            else:
+                recommendation_jobs_finished_total.inc("cancelled")
+        except ServiceBusyError:
+            logger.warning(f"Could not store the result of recommendation job {job_id}")
+
+        # Hold the slot while threads this job started are still computing
+        pending = [future for future in self._threads.pop(job_id, ()) if not future.done()]
+        if pending:
+            await asyncio.wait([asyncio.wrap_future(future) for future in pending])
@@ -0,0 +1,273 @@
+"""
+Lexical Index
+In-process BM25 inverted index over program text chunks, for the exact-term
+side of hybrid retrieval (course names, "量化", "CFA", ...) that embedding
+search tends to blur
+
+Tokenization is CJK-aware without a segmentation dictionary: Latin words and
+numbers are terms, and each run of CJK characters contributes its character
+bigrams ("量化金融" -> 量化, 化金, 金融), the usual dictionary-free scheme for
+Chinese search. A query matches a word wherever its bigrams occur.
+
+Terms are stored as 64-bit hashes and postings as CSR arrays: for the i-th
+term (in hash order), its postings are rows offsets[i]:offsets[i + 1] of
+`chunks` (int32 chunk numbers, ascending) and `impacts` (float16 BM25 term
+weights computed at build time). A query is then a few array slices, one
+weighted bincount and a partial sort. Like the vector index, the files are versioned and opened
+with mmap.
+
+    <LEXICAL_INDEX_DIR>/CURRENT          name of the active version (see index_versions)
+    <LEXICAL_INDEX_DIR>/<version>/       meta.json, terms.npy, offsets.npy,
+                                         chunks.npy, impacts.npy, programs.npy
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.recommendation.index_versions import IndexLoader, new_version, publish, read_current
+
+logger = logging.getLogger(__name__)
+
+# Latin words / numbers, or runs of CJK ideographs
+TOKEN = re.compile(r"[a-z0-9]+|[㐀-䶿一-鿿豈-﫿]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or that the this to with".split()
+)
+# Longest Latin token indexed (longer ones are usually IDs or URLs)
+MAX_WORD_LENGTH = 32
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Index terms of a text, in order (duplicates kept)
+
+    Args:
+        text: English and/or Chinese text
+
+    Returns:
+        Lowercased words and CJK character bigrams (a lone CJK character is
+        kept as a unigram)
+    """
+    terms = []
+    for token in TOKEN.findall(unicodedata.normalize("NFKC", text).lower()):
+        if token[0] < "㐀":
+            if token not in STOPWORDS and len(token) <= MAX_WORD_LENGTH:
+                terms.append(token)
+        elif len(token) == 1:
+            terms.append(token)
+        else:
+            terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return terms
+
+
+def term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def build_lexical_index(directory: str, program_ids: Sequence[int], texts: Iterable[str]) -> str:
+    """
+    Build a BM25 index over text chunks and make it the active version
+
+    Args:
+        directory: Index directory (LEXICAL_INDEX_DIR)
+        program_ids: Program of each chunk
+        texts: Chunk texts, aligned with `program_ids`
+
+    Returns:
+        Version name of the new index
+    """
+    program_ids = np.asarray(program_ids, dtype=np.int64)
+    hashes: dict[str, int] = {}
+    term_column, chunk_column, tf_column = array("Q"), array("i"), array("H")
+    lengths = array("I")
+    for chunk, text in enumerate(texts):
+        counts = Counter(tokenize(text))
+        lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            value = hashes.get(term)
+            if value is None:
+                value = hashes[term] = term_hash(term)
+            term_column.append(value)
+            chunk_column.append(chunk)
+            tf_column.append(min(tf, 65535))
+    if len(lengths) != len(program_ids) or not len(lengths):
+        raise ValueError("program_ids and texts must be non-empty and of equal length")
+
+    # Chunks grouped by program, so per-program aggregation needs no sort
+    chunk_order = np.argsort(program_ids, kind="stable")
+    renumber = np.empty(len(chunk_order), dtype=np.int32)
+    renumber[chunk_order] = np.arange(len(chunk_order), dtype=np.int32)
+
+    terms, term_ids = np.unique(np.frombuffer(term_column, dtype=np.uint64), return_inverse=True)
+    term_ids = term_ids.ravel()
+    chunks = renumber[np.frombuffer(chunk_column, dtype=np.int32)]
+    tf = np.frombuffer(tf_column, dtype=np.uint16).astype(np.float32)
+    lengths = np.frombuffer(lengths, dtype=np.uint32).astype(np.float32)[chunk_order]
+
+    count = len(lengths)
+    df = np.bincount(term_ids, minlength=len(terms))
+    idf = np.log1p((count - df + 0.5) / (df + 0.5)).astype(np.float32)
+    length_norm = K1 * (1 - B + B * lengths / max(float(lengths.mean()), 1.0))
+    impacts = idf[term_ids] * tf * (K1 + 1) / (tf + length_norm[chunks])
+
+    order = np.lexsort((chunks, term_ids))
+    offsets = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+
+    version, path = new_version(directory)
+    np.save(os.path.join(path, "terms.npy"), terms)
+    np.save(os.path.join(path, "offsets.npy"), offsets)
+    np.save(os.path.join(path, "chunks.npy"), chunks[order])
+    np.save(os.path.join(path, "impacts.npy"), impacts[order].astype(np.float16))
+    np.save(os.path.join(path, "programs.npy"), program_ids[chunk_order])
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"chunks": count, "terms": len(terms), "postings": len(order)}, f)
+
+    publish(directory, version)
+    logger.info(f"Built lexical index {version}: {count} chunks, {len(terms)} terms, {len(order)} postings")
+    return version
+
+
+class LexicalIndex:
+    """
+    Memory-mapped BM25 index (read-only)
+
+    Args:
+        path: Directory of one index version
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = os.path.basename(path)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.terms = load("terms")
+        self.offsets = load("offsets")
+        self.chunks = load("chunks")
+        self.impacts = load("impacts")
+        # Chunks are grouped by program: chunk -> program position, and the
+        # first chunk and ID of each program
+        programs = np.array(load("programs"))
+        self.program_starts = np.flatnonzero(np.r_[True, programs[1:] != programs[:-1]])
+        self.program_ids = programs[self.program_starts]
+        self.chunk_program = np.repeat(
+            np.arange(len(self.program_starts), dtype=np.int32),
+            np.diff(np.r_[self.program_starts, len(programs)]),
+        )
+
+    @classmethod
+    def open(cls, directory: str) -> Optional["LexicalIndex"]:
+        """Open the active version in `directory`, or None if there is none"""
+        version = read_current(directory)
+        return cls(os.path.join(directory, version)) if version else None
+
+    def __len__(self) -> int:
+        return len(self.chunk_program)
+
+    def _postings(self, query: str) -> tuple[np.ndarray, np.ndarray]:
+        hashes = np.array(sorted({term_hash(term) for term in tokenize(query)}), dtype=np.uint64)
+        positions = np.minimum(np.searchsorted(self.terms, hashes), len(self.terms) - 1)
+        positions = positions[self.terms[positions] == hashes]
+        chunks = [self.chunks[self.offsets[p]:self.offsets[p + 1]] for p in positions]
+        impacts = [self.impacts[self.offsets[p]:self.offsets[p + 1]] for p in positions]
+        if not chunks:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        # bincount casts non-float64 weights element by element; one astype is much faster
+        return np.concatenate(chunks), np.concatenate(impacts).astype(np.float64)
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        candidate_ids: Optional[Sequence[int]] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Programs whose best-matching chunk scores highest for the query
+
+        Args:
+            query: Free-text query
+            k: Results to return
+            candidate_ids: Restrict results to these program IDs
+
+        Returns:
+            (program IDs, BM25 scores), best first
+        """
+        chunks, impacts = self._postings(query)
+        if not len(chunks):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        allowed = None if candidate_ids is None else self._program_mask(candidate_ids)
+
+        # Sum term weights per chunk: a dense bincount when many chunks
+        # match, a sort over the matches otherwise
+        if len(chunks) * 16 > len(self):
+            return self._top_programs(np.bincount(chunks, weights=impacts, minlength=len(self)), k, allowed)
+        matched, inverse = np.unique(chunks, return_inverse=True)
+        return self._top_programs(np.bincount(inverse.ravel(), weights=impacts), k, allowed, matched)
+
+    def _program_mask(self, program_ids: Sequence[int]) -> np.ndarray:
+        program_ids = np.asarray(program_ids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.program_ids, program_ids), len(self.program_ids) - 1)
+        mask = np.zeros(len(self.program_ids), dtype=bool)
+        mask[positions[self.program_ids[positions] == program_ids]] = True
+        return mask
+
+    def _top_programs(self, scores: np.ndarray, k: int, allowed: Optional[np.ndarray] = None,
+                      chunks: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Best programs by chunk scores
+
+        A program scores as its best chunk, so long descriptions are not
+        favoured for repeating a term across chunks. The best programs are
+        then the distinct allowed programs of the best chunks, found from a
+        partial sort of a few times `k` chunks (widened until enough are found).
+
+        Args:
+            scores: Chunk scores; `scores[i]` belongs to chunk `chunks[i]`,
+                or to chunk i if `chunks` is None
+            k: Programs to return
+            allowed: Program position -> may be returned
+        """
+        share = 1.0 if allowed is None else max(np.count_nonzero(allowed) / len(allowed), 1e-3)
+        take = min(len(scores), int(4 * k / share))
+        while True:
+            best = np.argpartition(-scores, take - 1)[:take] if take < len(scores) else np.arange(len(scores))
+            best = best[np.argsort(-scores[best], kind="stable")]
+            best = best[scores[best] > 0]
+            exhausted = len(best) < take or take == len(scores)
+            owners = self.chunk_program[best if chunks is None else chunks[best]]
+            if allowed is not None:
+                keep = allowed[owners]
+                best, owners = best[keep], owners[keep]
+            _, first = np.unique(owners, return_index=True)
+            if len(first) >= k or exhausted:
+                break
+            take = min(take * 4, len(scores))
+
+        first = np.sort(first)[:k]
+        ids, top = self.program_ids[owners[first]], scores[best[first]]
+        order = np.lexsort((ids, -top))
+        return ids[order], top[order].astype(np.float32)
+
+
+_loader = IndexLoader(lambda: settings.LEXICAL_INDEX_DIR, LexicalIndex, settings.VECTOR_INDEX_RELOAD_SECONDS)
+
+
+def get_lexical_index() -> Optional[LexicalIndex]:
+    """Active index of LEXICAL_INDEX_DIR, or None if none has been built"""
+    return _loader.get()
@@ -0,0 +1,31 @@
+"""
+Program Catalog Model
+"""
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class Program(Base):
+    """Degree program offered by a school (one row per school + program)"""
+    __tablename__ = "programs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    school_name = Column(String, nullable=False)
+    program_name = Column(String, nullable=False)
+    country = Column(String(2), nullable=False, index=True)  # ISO 3166-1 alpha-2, e.g. "GB"
+    city = Column(String, nullable=True)
+    degree = Column(String, nullable=False)  # bachelor / master / phd
+    major = Column(String, nullable=False)  # Major category, e.g. "computer_science"
+    qs_rank = Column(Integer, nullable=True)  # QS world ranking of the school
+    tuition = Column(Integer, nullable=True)  # Yearly tuition (USD)
+    min_gpa = Column(Float, nullable=True)  # 4.0 scale
+    min_ielts = Column(Float, nullable=True)
+    min_toefl = Column(Integer, nullable=True)
+    description = Column(Text, nullable=True)  # Program introduction / curriculum text
+    is_active = Column(Boolean, default=True)  # Inactive programs are not recommended
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<Program(id={self.id}, school={self.school_name}, program={self.program_name})>"
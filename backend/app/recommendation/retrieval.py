@@ -0,0 +1,119 @@
+"""
+Hybrid Retrieval
+Free-text program search combining the BM25 lexical index and the vector
+index through reciprocal-rank fusion (RRF)
+
+Each retriever returns its own ranked list; RRF scores a program by
+sum(1 / (RETRIEVAL_RRF_K + rank)) over the lists it appears in. Only ranks
+are fused, so BM25 scores and cosine similarities never need to be put on
+a common scale, and a program ranked well by both beats one ranked first
+by only one of them.
+"""
+import logging
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.recommendation.embedders import load_embedder
+from app.recommendation.lexical_index import get_lexical_index
+from app.recommendation.vector_index import get_vector_index
+
+logger = logging.getLogger(__name__)
+
+_query_embedder = None
+
+
+def get_query_embedder():
+    """Embedder of EMBEDDING_MODEL, loaded once per process"""
+    global _query_embedder
+    if _query_embedder is None:
+        _query_embedder = load_embedder(settings.EMBEDDING_MODEL)
+    return _query_embedder
+
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], k: int = 60) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fuse ranked ID lists
+
+    Args:
+        rankings: Program IDs of each retriever, best first
+        k: RRF constant; larger values flatten the advantage of top ranks
+
+    Returns:
+        (program IDs, fused scores), best first; ties go to the lower ID
+    """
+    rankings = [np.asarray(ranking, dtype=np.int64) for ranking in rankings if len(ranking)]
+    if not rankings:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    ids = np.concatenate(rankings)
+    weights = np.concatenate([1.0 / (k + np.arange(1, len(ranking) + 1)) for ranking in rankings])
+    unique, inverse = np.unique(ids, return_inverse=True)
+    scores = np.bincount(inverse.ravel(), weights=weights)
+    order = np.lexsort((unique, -scores))
+    return unique[order], scores[order]
+
+
+def index_version() -> str:
+    """Versions of the active indexes (results computed from them depend on it)"""
+    lexical, vector = get_lexical_index(), get_vector_index()
+    return f"{lexical.version if lexical else '-'}/{vector.version if vector else '-'}"
+
+
+class RetrievalResult:
+    """
+    Programs retrieved for a query
+
+    Attributes:
+        ids: Program IDs, best first
+        scores: Fused RRF scores
+        lexical_hits: Programs found by the lexical index
+        vector_hits: Programs found by the vector index
+    """
+
+    def __init__(self, ids: np.ndarray, scores: np.ndarray, lexical_hits: int, vector_hits: int):
+        self.ids = ids
+        self.scores = scores
+        self.lexical_hits = lexical_hits
+        self.vector_hits = vector_hits
+
+
+def retrieve(
+    query: str,
+    k: Optional[int] = None,
+    candidate_ids: Optional[Sequence[int]] = None,
+) -> Optional[RetrievalResult]:
+    """
+    Hybrid search over program texts
+
+    Either index may be missing (e.g. before the embedding pipeline has run);
+    the other is then used alone.
+
+    Args:
+        query: Free-text query, English and/or Chinese
+        k: Programs to return (default RETRIEVAL_DEPTH); also the depth of
+            each retriever's list
+        candidate_ids: Restrict results to these program IDs
+
+    Returns:
+        Fused results, or None if neither index has been built
+    """
+    k = k or settings.RETRIEVAL_DEPTH
+    lexical, vector = get_lexical_index(), get_vector_index()
+    rankings = []
+    lexical_ids = vector_ids = np.empty(0, dtype=np.int64)
+    if lexical is not None:
+        lexical_ids, _ = lexical.search(query, k, candidate_ids=candidate_ids)
+        rankings.append(lexical_ids)
+    if vector is not None:
+        embedder = get_query_embedder()
+        if embedder.dim == vector.meta["dim"]:
+            vector_ids, _ = vector.search(embedder.embed([query])[0], k, candidate_ids=candidate_ids)
+            rankings.append(vector_ids)
+        else:
+            logger.warning(f"Vector index dim {vector.meta['dim']} does not match {embedder.name}; skipped")
+    if not rankings:
+        return None
+
+    ids, scores = reciprocal_rank_fusion(rankings, k=settings.RETRIEVAL_RRF_K)
+    return RetrievalResult(ids[:k], scores[:k], lexical_hits=len(lexical_ids), vector_hits=len(vector_ids))
@@ -0,0 +1,74 @@
+"""
+Recommendation Routes
+"""
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import get_db
+from app.dependencies import get_current_user, credentials_exception
+from app.auth.schemas import Principal
+from app.profile.service import get_profile_view
+from app.recommendation.schemas import RecommendationJob, RecommendationRequest
+from app.recommendation.service import (
+    cancel_recommendation_job,
+    get_recommendation_job,
+    submit_recommendations,
+)
+from app.common.responses import FastJSONResponse
+
+router = APIRouter()
+
+
+@router.post(
+    "/recommendations",
+    response_model=RecommendationJob,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={200: {"model": RecommendationJob, "description": "Result was already available"}},
+)
+async def create_recommendations(
+    request: RecommendationRequest,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Start a recommendation round for the current user
+
+    Returns at once with a job to poll at `GET /recommendations/{id}`
+    (202), or with the finished job (200) when the same round was computed
+    recently. Submitting the same criteria again while a round is unfinished
+    returns that round.
+
+    Criteria missing from the body come from the user's academic profile.
+    Programs are filtered by degree, country and rank limit, then ranked by
+    an overall 0-100 match score (academic, language, major and budget fit).
+    With a free-text `query`, programs are first retrieved by keyword (BM25)
+    and semantic search, and ranked by both relevance and match score.
+    """
+    profile = await get_profile_view(db, current_user.id)
+    if profile is None:
+        raise credentials_exception()
+    job = await submit_recommendations(db, profile, request)
+    if job.status == "succeeded":
+        return FastJSONResponse(job)
+    return FastJSONResponse(
+        job,
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": f"{settings.API_V1_PREFIX}/recommendations/{job.id}"},
+    )
+
+
+@router.get("/recommendations/{job_id}", response_model=RecommendationJob)
+async def read_recommendations(job_id: str, current_user: Principal = Depends(get_current_user)):
+    """
+    Status of a recommendation round; `result` is set once it has succeeded
+    """
+    return FastJSONResponse(await get_recommendation_job(current_user.id, job_id))
+
+
+@router.delete("/recommendations/{job_id}", response_model=RecommendationJob)
+async def delete_recommendations(job_id: str, current_user: Principal = Depends(get_current_user)):
+    """
+    Cancel a queued or running recommendation round (finished rounds are
+    returned unchanged)
+    """
+    return FastJSONResponse(await cancel_recommendation_job(current_user.id, job_id))
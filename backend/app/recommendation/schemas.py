@@ -0,0 +1,67 @@
+"""
+Recommendation-related Pydantic schemas
+"""
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+
+class RecommendationRequest(BaseModel):
+    """
+    Recommendation request
+
+    Every criterion is optional; missing ones are taken from the user's
+    academic profile (fields of the same name).
+    """
+    gpa: Optional[float] = Field(None, ge=0, le=4.0)
+    ielts_score: Optional[float] = Field(None, ge=0, le=9)
+    toefl_score: Optional[int] = Field(None, ge=0, le=120)
+    major: Optional[str] = Field(None, max_length=100)
+    target_degree: Optional[Literal["bachelor", "master", "phd"]] = None
+    target_countries: Optional[list[str]] = Field(None, max_length=20)
+    budget: Optional[int] = Field(None, ge=0)  # Yearly tuition budget (USD)
+    max_rank: Optional[int] = Field(None, ge=1)  # Only schools ranked this high or better
+    query: Optional[str] = Field(None, min_length=1, max_length=200)  # Free text, e.g. "英国 量化金融 编程课程"
+    limit: int = Field(20, ge=1, le=100)
+
+
+class MatchBreakdown(BaseModel):
+    """Component scores (0-100)"""
+    academic: float
+    language: float
+    major: float
+    budget: float
+
+
+class RecommendationItem(BaseModel):
+    """One recommended program"""
+    program_id: int
+    school_name: str
+    program_name: str
+    country: str
+    city: Optional[str]
+    degree: str
+    major: str
+    qs_rank: Optional[int]
+    tuition: Optional[int]
+    score: float  # Overall match score (0-100)
+    breakdown: MatchBreakdown
+    relevance: Optional[float] = None  # Text relevance to `query` (fused retrieval score)
+
+
+class RecommendationResponse(BaseModel):
+    """Recommendation response"""
+    items: list[RecommendationItem]
+    total_candidates: int  # Programs that passed the structured filter
+    catalog_version: str
+
+
+class RecommendationJob(BaseModel):
+    """Asynchronous recommendation round (poll until status is final)"""
+    id: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[RecommendationResponse] = None  # Set once succeeded
+    error: Optional[str] = None  # Set once failed
@@ -0,0 +1,171 @@
+"""
+Match Scoring
+Structured filter plus a 0-100 match score for academic, language, major and
+budget fit, computed for all candidate programs at once over the catalog's
+NumPy columns
+"""
+from typing import Optional
+
+import numpy as np
+
+from app.recommendation.catalog import (
+    ProgramCatalog,
+    major_group_code,
+    normalize_category,
+    normalize_country,
+    toefl_to_ielts,
+)
+from app.recommendation.schemas import RecommendationRequest
+
+# Weight of each component in the overall score
+WEIGHTS = {"academic": 0.35, "language": 0.25, "major": 0.25, "budget": 0.15}
+
+# Score used when the student has not given the information a component needs
+STUDENT_UNKNOWN = 50.0
+# Score used when the program states no requirement
+NO_REQUIREMENT = 85.0
+
+
+def _margin_score(margin: np.ndarray, base: float, gain: float, penalty: float) -> np.ndarray:
+    """`base` at exactly the requirement, rising by `gain` / falling by `penalty` per unit of margin"""
+    return np.where(margin >= 0, base + gain * margin, base + penalty * margin)
+
+
+def student_language_band(ielts_score: Optional[float], toefl_score: Optional[int]) -> Optional[float]:
+    """Best IELTS-equivalent band of the student's test scores, None if there are none"""
+    bands = []
+    if ielts_score is not None:
+        bands.append(ielts_score)
+    if toefl_score is not None:
+        bands.append(float(toefl_to_ielts(toefl_score)))
+    return max(bands) if bands else None
+
+
+def academic_scores(min_gpa: np.ndarray, gpa: Optional[float]) -> np.ndarray:
+    """70 at the GPA requirement, +60 per point above, -150 per point below"""
+    if gpa is None:
+        return np.full(len(min_gpa), STUDENT_UNKNOWN, dtype=np.float32)
+    scores = _margin_score(gpa - min_gpa, 70.0, 60.0, 150.0)
+    return np.where(np.isnan(min_gpa), NO_REQUIREMENT, scores)
+
+
+def language_scores(min_band: np.ndarray, band: Optional[float]) -> np.ndarray:
+    """75 at the language requirement (IELTS band), +50 per band above, -100 per band below"""
+    if band is None:
+        return np.full(len(min_band), STUDENT_UNKNOWN, dtype=np.float32)
+    scores = _margin_score(band - min_band, 75.0, 50.0, 100.0)
+    return np.where(np.isnan(min_band), NO_REQUIREMENT, scores)
+
+
+def major_scores(majors: np.ndarray, groups: np.ndarray, major_code: int, group_code: int,
+                 has_major: bool) -> np.ndarray:
+    """100 for the same major, 70 for the same broad field, 30 otherwise"""
+    if not has_major:
+        return np.full(len(majors), STUDENT_UNKNOWN, dtype=np.float32)
+    same_field = (groups == group_code) & (group_code >= 0)
+    return np.where(majors == major_code, 100.0, np.where(same_field, 70.0, 30.0))
+
+
+def budget_scores(tuition: np.ndarray, budget: Optional[int]) -> np.ndarray:
+    """100 within budget, -20 per 10% over it; 70 when the tuition is unknown"""
+    if budget is None:
+        return np.full(len(tuition), STUDENT_UNKNOWN, dtype=np.float32)
+    over = np.maximum((tuition - budget) / max(budget, 1), 0)
+    return np.where(np.isnan(tuition), 70.0, 100.0 - 200.0 * over)
+
+
+class ScoredPrograms:
+    """
+    Result of one scoring pass
+
+    Attributes:
+        indices: Catalog row indices of the top programs, best first
+        scores: Overall scores of those programs
+        breakdown: Component name -> scores of those programs
+        total_candidates: Programs that passed the structured filter
+    """
+
+    def __init__(self, indices: np.ndarray, scores: np.ndarray, breakdown: dict, total_candidates: int):
+        self.indices = indices
+        self.scores = scores
+        self.breakdown = breakdown
+        self.total_candidates = total_candidates
+
+
+def candidate_indices(
+    catalog: ProgramCatalog,
+    criteria: RecommendationRequest,
+    program_ids: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Structured filter: degree, countries and rank limit, optionally within `program_ids`"""
+    mask = np.ones(len(catalog), dtype=bool) if program_ids is None else np.isin(catalog.ids, program_ids)
+    if criteria.target_degree:
+        mask &= catalog.degree == catalog.code("degrees", normalize_category(criteria.target_degree))
+    if criteria.target_countries:
+        codes = [catalog.code("countries", normalize_country(c)) for c in criteria.target_countries]
+        mask &= np.isin(catalog.country, codes)
+    if criteria.max_rank is not None:
+        mask &= catalog.qs_rank <= criteria.max_rank  # Unranked schools (NaN) are excluded
+    return np.flatnonzero(mask)
+
+
+def score_programs(
+    catalog: ProgramCatalog,
+    criteria: RecommendationRequest,
+    program_ids: Optional[np.ndarray] = None,
+) -> ScoredPrograms:
+    """
+    Filter the catalog and score every remaining program in one vectorized pass
+
+    Args:
+        catalog: Program catalog snapshot
+        criteria: Request merged with the student's profile
+        program_ids: Only consider these programs (e.g. retrieved for a text query)
+
+    Returns:
+        The `criteria.limit` best programs; ties go to the better-ranked school
+    """
+    candidates = candidate_indices(catalog, criteria, program_ids)
+    if len(candidates) == len(catalog):
+        def take(column):
+            return column  # No filter: skip copying every column
+    else:
+        def take(column):
+            return column[candidates]
+
+    major = normalize_category(criteria.major) if criteria.major else None
+    components = {
+        "academic": academic_scores(take(catalog.min_gpa), criteria.gpa),
+        "language": language_scores(
+            take(catalog.min_language_band),
+            student_language_band(criteria.ielts_score, criteria.toefl_score),
+        ),
+        "major": major_scores(
+            take(catalog.major), take(catalog.major_group),
+            catalog.code("majors", major) if major else -1,
+            major_group_code(major) if major else -1,
+            major is not None,
+        ),
+        "budget": budget_scores(take(catalog.tuition), criteria.budget),
+    }
+    for name, scores in components.items():
+        components[name] = np.clip(scores, 0.0, 100.0).astype(np.float32, copy=False)
+
+    total = sum(WEIGHTS[name] * scores for name, scores in components.items())
+
+    # Partial selection instead of sorting every candidate: keep everything
+    # scoring at least the `limit`-th best (ties included), then sort just those
+    limit = min(criteria.limit, len(candidates))
+    top = np.arange(len(candidates))
+    if limit < len(candidates):
+        threshold = -np.partition(-total, limit - 1)[limit - 1]
+        top = np.flatnonzero(total >= threshold)
+    rank = np.nan_to_num(take(catalog.qs_rank)[top], nan=np.inf)
+    top = top[np.lexsort((take(catalog.ids)[top], rank, -total[top]))][:limit]
+
+    return ScoredPrograms(
+        indices=candidates[top],
+        scores=total[top],
+        breakdown={name: scores[top] for name, scores in components.items()},
+        total_candidates=len(candidates),
+    )
@@ -0,0 +1,252 @@
+"""
+Recommendation Service: Business Logic
+"""
+import math
+import numpy as np
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.common.exceptions import RecommendationJobNotFoundError
+from app.database import AsyncSessionLocal
+from app.profile.schemas import ProfileResponse
+from app.recommendation.cache import fingerprint, recommendation_cache, recommendation_cache_requests_total
+from app.recommendation.catalog import ProgramCatalog, program_catalog
+from app.recommendation.jobs import JobRunner, cancel_job, get_job, submit_job
+from app.recommendation.retrieval import index_version, reciprocal_rank_fusion, retrieve
+from app.recommendation.schemas import (
+    MatchBreakdown,
+    RecommendationItem,
+    RecommendationJob,
+    RecommendationRequest,
+    RecommendationResponse,
+)
+from app.recommendation.scoring import ScoredPrograms, candidate_indices, score_programs
+
+# Request fields that default to the profile field of the same name
+PROFILE_CRITERIA = (
+    "gpa", "ielts_score", "toefl_score", "major", "target_degree", "target_countries", "budget",
+)
+
+
+def merge_criteria(request: RecommendationRequest, profile: ProfileResponse) -> RecommendationRequest:
+    """Fill criteria missing from the request from the user's academic profile"""
+    defaults = {
+        field: getattr(profile, field)
+        for field in PROFILE_CRITERIA
+        if getattr(request, field) is None and getattr(profile, field) is not None
+    }
+    return request.model_copy(update=defaults) if defaults else request
+
+
+def _item(catalog: ProgramCatalog, result: ScoredPrograms, position: int,
+          relevance: Optional[float] = None) -> RecommendationItem:
+    index = int(result.indices[position])
+    qs_rank, tuition = catalog.qs_rank[index], catalog.tuition[index]
+    return RecommendationItem(
+        program_id=int(catalog.ids[index]),
+        school_name=catalog.school_name[index],
+        program_name=catalog.program_name[index],
+        country=catalog.countries[catalog.country[index]],
+        city=catalog.city[index],
+        degree=catalog.degrees[catalog.degree[index]],
+        major=catalog.majors[catalog.major[index]],
+        qs_rank=None if math.isnan(qs_rank) else int(qs_rank),  # NaN = unranked
+        tuition=None if math.isnan(tuition) else int(tuition),
+        score=round(float(result.scores[position]), 1),
+        breakdown=MatchBreakdown(**{
+            name: round(float(scores[position]), 1) for name, scores in result.breakdown.items()
+        }),
+        relevance=None if relevance is None else round(relevance, 6),
+    )
+
+
+def _recommend_for_query(catalog: ProgramCatalog, criteria: RecommendationRequest) -> Optional[RecommendationResponse]:
+    """
+    Text query path: hybrid retrieval within the structured filter, then
+    the retrieved programs' relevance ranking and match-score ranking are
+    fused with RRF, so results are both on-topic and a good fit
+
+    Returns None when no retrieval index has been built.
+    """
+    candidates = candidate_indices(catalog, criteria)
+    # Unfiltered: skip passing every program ID down to the indexes
+    candidate_ids = None if len(candidates) == len(catalog) else catalog.ids[candidates]
+    retrieval = retrieve(criteria.query, candidate_ids=candidate_ids)
+    if retrieval is None:
+        return None
+
+    result = score_programs(
+        catalog, criteria.model_copy(update={"limit": max(len(retrieval.ids), 1)}), program_ids=retrieval.ids
+    )
+    matched_ids = catalog.ids[result.indices]
+    relevance = dict(zip(retrieval.ids.tolist(), retrieval.scores.tolist()))
+    position = {program_id: i for i, program_id in enumerate(matched_ids.tolist())}
+    fused, _ = reciprocal_rank_fusion(
+        [retrieval.ids[np.isin(retrieval.ids, matched_ids)], matched_ids], k=settings.RETRIEVAL_RRF_K
+    )
+    return RecommendationResponse(
+        items=[
+            _item(catalog, result, position[program_id], relevance[program_id])
+            for program_id in fused[:criteria.limit].tolist()
+        ],
+        total_candidates=result.total_candidates,
+        catalog_version=catalog.version,
+    )
+
+
+def compute_recommendations(catalog: ProgramCatalog, criteria: RecommendationRequest) -> RecommendationResponse:
+    """
+    Recommend programs from a catalog snapshot (uncached)
+    
+    With a text query, only programs the hybrid retriever finds for it (up
+    to RETRIEVAL_DEPTH) are considered.
+    
+    Args:
+        catalog: Program catalog snapshot
+        criteria: Request merged with the user's profile
+    
+    Returns:
+        Best matching programs, best first
+    """
+    if criteria.query:
+        response = _recommend_for_query(catalog, criteria)
+        if response is not None:
+            return response
+    
+    result = score_programs(catalog, criteria)
+    return RecommendationResponse(
+        items=[_item(catalog, result, position) for position in range(len(result.indices))],
+        total_candidates=result.total_candidates,
+        catalog_version=catalog.version,
+    )
+
+
+def _fingerprint(catalog: ProgramCatalog, criteria: RecommendationRequest) -> str:
+    """Cache key: criteria plus the catalog (and, for text queries, index) versions"""
+    versions = (catalog.version, index_version()) if criteria.query else (catalog.version,)
+    return fingerprint(criteria, *versions)
+
+
+def _job_view(record: dict) -> RecommendationJob:
+    def timestamp(value: Optional[float]) -> Optional[datetime]:
+        return None if value is None else datetime.fromtimestamp(value, timezone.utc)
+
+    return RecommendationJob(
+        id=record["id"],
+        status=record["status"],
+        created_at=timestamp(record["created_at"]),
+        started_at=timestamp(record["started_at"]),
+        finished_at=timestamp(record["finished_at"]),
+        result=record["result"],
+        error=record["error"],
+    )
+
+
+async def run_recommendation_job(record: dict) -> dict:
+    """
+    Compute a job's recommendations (executed by the job workers)
+    
+    Goes through the recommendation cache, so identical rounds computed
+    meanwhile are reused and the result serves later submissions. Scoring
+    runs on the job runner's thread pool, so the event loop keeps serving
+    requests and at most RECOMMENDATION_JOB_WORKERS rounds score at once.
+    
+    Args:
+        record: Job record; `criteria` holds the effective criteria
+    
+    Returns:
+        Recommendation response as JSON data
+    """
+    criteria = RecommendationRequest.model_validate(record["criteria"])
+    async with AsyncSessionLocal() as db:  # Connects only if the catalog must be (re)loaded
+        catalog = await program_catalog.get(db)
+    
+    async def compute() -> dict:
+        response = await recommendation_jobs.run_in_thread(compute_recommendations, catalog, criteria)
+        return response.model_dump(mode="json")
+    
+    return await recommendation_cache.get_or_compute(record["user_id"], _fingerprint(catalog, criteria), compute)
+
+
+recommendation_jobs = JobRunner(
+    execute=run_recommendation_job,
+    workers=settings.RECOMMENDATION_JOB_WORKERS,
+    timeout=settings.RECOMMENDATION_JOB_TIMEOUT,
+    poll_seconds=settings.RECOMMENDATION_JOB_POLL_SECONDS,
+    block_seconds=settings.RECOMMENDATION_JOB_BLOCK_SECONDS,
+)
+
+
+async def submit_recommendations(
+    db: AsyncSession,
+    profile: ProfileResponse,
+    request: RecommendationRequest
+) -> RecommendationJob:
+    """
+    Start a recommendation round for a user
+    
+    Returns without scoring: the round is queued for the job workers, unless
+    its result is already cached (the job is then returned as succeeded) or
+    the user has an unfinished job for the same criteria (that job is
+    returned instead).
+    
+    Args:
+        db: Database session (for loading the catalog)
+        profile: User's profile view
+        request: Recommendation request
+    
+    Returns:
+        The job
+    
+    Raises:
+        ServiceBusyError: Job queue full or job store unavailable
+        RateLimitExceededError: Too many unfinished jobs for this user
+    """
+    criteria = merge_criteria(request, profile)
+    catalog = await program_catalog.get(db)
+    key = _fingerprint(catalog, criteria)
+    cached = await recommendation_cache.get(profile.id, key)
+    if cached is not None:
+        recommendation_cache_requests_total.inc("hit")
+    record = await submit_job(profile.id, key, criteria.model_dump(mode="json"), result=cached)
+    if record["status"] == "queued":
+        recommendation_jobs.notify()
+    return _job_view(record)
+
+
+async def get_recommendation_job(user_id: int, job_id: str) -> RecommendationJob:
+    """
+    Current state of a user's recommendation round
+    
+    Args:
+        user_id: User ID
+        job_id: Job ID
+    
+    Raises:
+        RecommendationJobNotFoundError: No such job for this user (or expired)
+    """
+    record = await get_job(user_id, job_id)
+    if record is None:
+        raise RecommendationJobNotFoundError()
+    return _job_view(record)
+
+
+async def cancel_recommendation_job(user_id: int, job_id: str) -> RecommendationJob:
+    """
+    Cancel a user's queued or running recommendation round
+    
+    Finished jobs are returned unchanged.
+    
+    Args:
+        user_id: User ID
+        job_id: Job ID
+    
+    Raises:
+        RecommendationJobNotFoundError: No such job for this user (or expired)
+    """
+    record = await cancel_job(user_id, job_id)
+    if record is None:
+        raise RecommendationJobNotFoundError()
+    recommendation_jobs.cancel(job_id)
+    return _job_view(record)
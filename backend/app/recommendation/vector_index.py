@@ -0,0 +1,234 @@
+"""
+Vector Index
+In-process IVF (inverted file) index over program-description embeddings, a
+local stand-in for the vector database in the semantic re-ranking step
+
+Vectors are L2-normalized, so inner product = cosine similarity. k-means
+splits them into `nlist` clusters, and the vectors are stored grouped by
+cluster so each inverted list is one contiguous block. A search scores the
+`nprobe` clusters whose centroids are closest to the query and only the
+vectors in them.
+
+The index is a directory of .npy files opened with mmap: every worker maps
+the same pages from the page cache instead of holding its own copy, and
+opening an index costs no parsing or copying regardless of its size.
+
+    <VECTOR_INDEX_DIR>/CURRENT          name of the active version (see index_versions)
+    <VECTOR_INDEX_DIR>/<version>/       meta.json, centroids.npy, offsets.npy,
+                                        vectors.npy, ids.npy, sorted_ids.npy,
+                                        sorted_rows.npy
+"""
+import json
+import logging
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.recommendation.index_versions import IndexLoader, new_version, publish, read_current
+
+logger = logging.getLogger(__name__)
+
+# Candidate sets up to this size are searched exactly instead of through the lists
+EXACT_SEARCH_MAX_CANDIDATES = 4096
+# Rows per block when assigning vectors to centroids (bounds temporary memory)
+ASSIGN_BLOCK = 8192
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows (zero rows stay zero)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK):
+        block = vectors[start:start + ASSIGN_BLOCK]
+        assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
+
+
+def _kmeans(vectors: np.ndarray, nlist: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Spherical k-means: centroids are re-normalized cluster means"""
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest_centroid(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=nlist)
+        nonempty = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[nonempty]
+        centroids[nonempty] = np.add.reduceat(vectors[order], starts, axis=0)
+        # Re-seed empty clusters with random vectors
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = normalize(centroids)
+    return centroids
+
+
+def build_index(
+    directory: str,
+    ids: Sequence[int],
+    vectors: np.ndarray,
+    nlist: Optional[int] = None,
+    iterations: int = 10,
+    train_size: int = 100000,
+    seed: int = 0,
+) -> str:
+    """
+    Build an IVF index and make it the active version
+
+    Args:
+        directory: Index directory (VECTOR_INDEX_DIR)
+        ids: Program ID of each vector
+        vectors: Embeddings, shape (len(ids), dim)
+        nlist: Number of clusters (default 4 * sqrt(n))
+        iterations: k-means iterations
+        train_size: Vectors sampled for training the centroids
+        seed: Random seed
+
+    Returns:
+        Version name of the new index
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    vectors = normalize(vectors)
+    if len(ids) != len(vectors) or not len(ids):
+        raise ValueError("ids and vectors must be non-empty and of equal length")
+
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist or max(1, int(4 * np.sqrt(len(ids)))), len(ids))
+    sample = vectors if len(vectors) <= train_size else vectors[rng.choice(len(vectors), train_size, replace=False)]
+    centroids = _kmeans(sample, nlist, iterations, rng)
+
+    assignment = _nearest_centroid(vectors, centroids)
+    order = np.argsort(assignment, kind="stable")
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=nlist)))).astype(np.int64)
+    stored_ids = ids[order]
+    sorted_rows = np.argsort(stored_ids, kind="stable")
+
+    version, path = new_version(directory)
+    np.save(os.path.join(path, "centroids.npy"), centroids)
+    np.save(os.path.join(path, "offsets.npy"), offsets)
+    np.save(os.path.join(path, "vectors.npy"), vectors[order])
+    np.save(os.path.join(path, "ids.npy"), stored_ids)
+    np.save(os.path.join(path, "sorted_ids.npy"), stored_ids[sorted_rows])
+    np.save(os.path.join(path, "sorted_rows.npy"), sorted_rows)
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"count": len(ids), "dim": vectors.shape[1], "nlist": nlist}, f)
+
+    publish(directory, version)
+    logger.info(f"Built vector index {version}: {len(ids)} vectors, {nlist} lists")
+    return version
+
+
+class IVFIndex:
+    """
+    Memory-mapped IVF index (read-only)
+
+    Args:
+        path: Directory of one index version
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = os.path.basename(path)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.centroids = np.array(load("centroids"))  # Small; read fully
+        self.offsets = np.array(load("offsets"))
+        self.vectors = load("vectors")
+        self.ids = load("ids")
+        self.sorted_ids = load("sorted_ids")
+        self.sorted_rows = load("sorted_rows")
+
+    @classmethod
+    def open(cls, directory: str) -> Optional["IVFIndex"]:
+        """Open the active version in `directory`, or None if there is none"""
+        version = read_current(directory)
+        return cls(os.path.join(directory, version)) if version else None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows_for(self, program_ids: Sequence[int]) -> np.ndarray:
+        """Storage rows of the given program IDs (IDs not in the index are skipped)"""
+        program_ids = np.asarray(program_ids, dtype=np.int64)
+        positions = np.searchsorted(self.sorted_ids, program_ids)
+        positions = np.minimum(positions, len(self.sorted_ids) - 1)
+        found = self.sorted_ids[positions] == program_ids
+        return np.sort(self.sorted_rows[positions[found]])
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        nprobe: Optional[int] = None,
+        candidate_ids: Optional[Sequence[int]] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Programs most similar to a query embedding
+
+        Args:
+            query: Query embedding (normalized here)
+            k: Results to return
+            nprobe: Clusters to scan (default VECTOR_INDEX_NPROBE)
+            candidate_ids: Restrict results to these program IDs (e.g. the
+                structured filter's candidates). Small sets are scored
+                exactly; larger ones are filtered inside the probed lists.
+
+        Returns:
+            (program IDs, cosine similarities), best first
+        """
+        query = normalize(query)
+        nprobe = min(nprobe or settings.VECTOR_INDEX_NPROBE, len(self.centroids))
+
+        candidate_rows = None
+        if candidate_ids is not None:
+            candidate_rows = self.rows_for(candidate_ids)
+            if len(candidate_rows) <= EXACT_SEARCH_MAX_CANDIDATES:
+                return self._top(candidate_rows, self.vectors[candidate_rows] @ query, k)
+
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows, scores = [], []
+        for cluster in lists:
+            start, end = self.offsets[cluster], self.offsets[cluster + 1]
+            if candidate_rows is None:
+                rows.append(np.arange(start, end))
+                scores.append(self.vectors[start:end] @ query)
+            else:
+                # Candidate rows are sorted, so the ones in this list are one slice
+                lo, hi = np.searchsorted(candidate_rows, (start, end))
+                block = candidate_rows[lo:hi]
+                rows.append(block)
+                scores.append(self.vectors[block] @ query)
+        rows, scores = np.concatenate(rows), np.concatenate(scores)
+        if not len(rows):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return self._top(rows, scores, k)
+
+    def _top(self, rows: np.ndarray, scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        if len(scores) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+        return np.asarray(self.ids[rows[order]]), scores[order]
+
+
+_loader = IndexLoader(lambda: settings.VECTOR_INDEX_DIR, IVFIndex, settings.VECTOR_INDEX_RELOAD_SECONDS)
+
+
+def get_vector_index() -> Optional[IVFIndex]:
+    """
+    Active index of VECTOR_INDEX_DIR, or None if none has been built
+
+    Re-checks CURRENT at most every VECTOR_INDEX_RELOAD_SECONDS, so workers
+    pick up a rebuilt index without a restart.
+    """
+    return _loader.get()
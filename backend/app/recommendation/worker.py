@@ -0,0 +1,61 @@
+"""
+Recommendation Job Worker
+Standalone process running queued recommendation jobs, for deployments
+where the API processes only enqueue (RECOMMENDATION_JOB_WORKERS=0) or
+need extra capacity next to their own workers. Jobs are taken from the
+shared Redis queue, so Redis is required.
+
+Usage (from backend/):
+    python -m app.recommendation.worker
+    python -m app.recommendation.worker --workers 16
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.config import settings
+from app.database import engine
+from app.common.logging_config import setup_logging, shutdown_logging
+from app.common.redis import close_redis
+from app.recommendation.service import recommendation_jobs
+
+logger = logging.getLogger(__name__)
+
+
+async def serve(workers: int) -> None:
+    """Run `workers` job workers until SIGINT / SIGTERM"""
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    recommendation_jobs.start(workers)
+    logger.info(f"Recommendation job worker started with {workers} workers")
+    try:
+        await stopping.wait()
+    finally:
+        # Running jobs go back to the queue for the other workers
+        await recommendation_jobs.stop()
+        await engine.dispose()
+        await close_redis()
+        logger.info("Recommendation job worker stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=max(settings.RECOMMENDATION_JOB_WORKERS, 1),
+                        help="jobs run concurrently (default RECOMMENDATION_JOB_WORKERS)")
+    args = parser.parse_args()
+    if not settings.REDIS_ENABLED:
+        parser.error("REDIS_ENABLED=false: jobs are then queued in the API process and run only there")
+
+    setup_logging()
+    try:
+        asyncio.run(serve(args.workers))
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
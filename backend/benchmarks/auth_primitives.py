@@ -0,0 +1,167 @@
+"""
+Micro-benchmarks for the auth primitives
+
+Times the CPU-bound functions every authenticated request goes through:
+
+- create_access_token / create_refresh_token / verify_token (app.auth.jwt)
+  with RS256 (the key set) and HS256 (shared secret), for several claim
+  payload sizes; verify_token is measured both uncached and from the token
+  cache
+- the same encode/decode with PyJWT, as an alternative to python-jose
+  (skipped if PyJWT is not installed)
+- get_password_hash / verify_password at several bcrypt cost factors
+
+For each case the report gives the median and p99 time per call over
+`--repeat` batches, plus the peak memory allocated by one call and the
+memory still held after a batch (tracemalloc, measured in a separate pass so
+tracing does not distort the timings).
+
+Usage (from backend/):
+    python benchmarks/auth_primitives.py
+    python benchmarks/auth_primitives.py --rounds 10 11 12 13 --output auth.json
+    python benchmarks/auth_primitives.py --skip-bcrypt --payloads small large
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from _common import percentile, print_table, write_json
+
+PAYLOADS = {
+    "small": {"sub": 123},
+    "medium": {"sub": 123, "email": "user@example.com", "username": "user_123",
+               "scope": "profile recommendations", "sid": "a" * 32, "jti": "b" * 32},
+    "large": {"sub": 123, "roles": [f"role-{i}" for i in range(100)],
+              "schools": list(range(200))},
+}
+COLUMNS = ["backend", "operation", "algorithm", "case", "us_median", "us_p99", "peak_kib", "retained_b"]
+
+
+def measure(func, iterations: int, repeat: int) -> dict:
+    """Per-call time (median and p99 of batch means) and allocations of func()"""
+    func()  # Warm up caches and lazy imports
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        samples.append((time.perf_counter() - started) / iterations)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    for _ in range(iterations):
+        func()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "us_median": round(percentile(samples, 50) * 1e6, 1),
+        "us_p99": round(percentile(samples, 99) * 1e6, 1),
+        "peak_kib": round((peak - before) / 1024, 1),
+        "retained_b": max(0, round((after - before) / (iterations + 1))),
+    }
+
+
+def jose_cases(args, algorithm: str):
+    from app.config import settings
+    from app.auth import jwt as app_jwt
+
+    settings.JWT_ALGORITHM = algorithm
+    for case in args.payloads:
+        claims = PAYLOADS[case]
+        access = app_jwt.create_access_token(claims)
+
+        def verify_uncached(token=access):
+            app_jwt.token_cache.clear()
+            return app_jwt.verify_token(token)
+
+        yield "create_access_token", case, lambda: app_jwt.create_access_token(claims)
+        yield "create_refresh_token", case, lambda: app_jwt.create_refresh_token(claims)
+        yield "verify_token", case, verify_uncached
+        yield "verify_token (cached)", case, lambda token=access: app_jwt.verify_token(token)
+
+
+def pyjwt_cases(args, algorithm: str):
+    import jwt as pyjwt
+    from app.config import settings
+    from app.auth.keys import keyset
+
+    if algorithm.startswith("HS"):
+        sign_key = verify_key = settings.JWT_SECRET_KEY
+        headers = None
+    else:
+        from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+        kid, _ = keyset.signing_key()
+        with open(keyset._path(kid), "rb") as f:
+            sign_key = load_pem_private_key(f.read(), password=None)
+        verify_key = sign_key.public_key()
+        headers = {"kid": kid}
+
+    for case in args.payloads:
+        claims = {**PAYLOADS[case], "sub": "123", "exp": int(time.time()) + 900, "type": "access"}
+        token = pyjwt.encode(claims, sign_key, algorithm=algorithm, headers=headers)
+        yield "encode", case, lambda c=claims: pyjwt.encode(c, sign_key, algorithm=algorithm, headers=headers)
+        yield "decode", case, lambda t=token: pyjwt.decode(t, verify_key, algorithms=[algorithm])
+
+
+def bcrypt_cases(args):
+    from app.config import settings
+    from app.auth import hashing
+
+    for rounds in args.rounds:
+        settings.PASSWORD_HASH_ROUNDS = rounds
+        hashing.get_pwd_context.cache_clear()
+        hashed = hashing.get_password_hash("benchmark-password")
+        yield "get_password_hash", f"cost {rounds}", lambda: hashing.get_password_hash("benchmark-password")
+        yield "verify_password", f"cost {rounds}", lambda h=hashed: hashing.verify_password("benchmark-password", h)
+
+
+def main(args):
+    try:
+        import jwt  # noqa: F401  (PyJWT)
+        has_pyjwt = True
+    except ImportError:
+        has_pyjwt = False
+        print("PyJWT not installed, skipping the alternative backend (pip install 'PyJWT[crypto]')")
+
+    rows = []
+    for algorithm in args.algorithms:
+        suites = [("python-jose", jose_cases(args, algorithm))]
+        if has_pyjwt:
+            suites.append(("pyjwt", pyjwt_cases(args, algorithm)))
+        for backend, cases in suites:
+            for operation, case, func in cases:
+                rows.append({"backend": backend, "operation": operation, "algorithm": algorithm,
+                             "case": case, **measure(func, args.iterations, args.repeat)})
+    if not args.skip_bcrypt:
+        for operation, case, func in bcrypt_cases(args):
+            rows.append({"backend": "passlib", "operation": operation, "algorithm": "bcrypt",
+                         "case": case, **measure(func, args.hash_iterations, args.hash_repeat)})
+
+    print_table(rows, COLUMNS)
+    if args.output:
+        write_json(args.output, rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithms", nargs="+", choices=["RS256", "HS256"], default=["RS256", "HS256"])
+    parser.add_argument("--payloads", nargs="+", choices=list(PAYLOADS), default=list(PAYLOADS))
+    parser.add_argument("--iterations", type=int, default=200, help="calls per batch (JWT)")
+    parser.add_argument("--repeat", type=int, default=20, help="batches (JWT)")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12], help="bcrypt cost factors")
+    parser.add_argument("--hash-iterations", type=int, default=3, help="calls per batch (bcrypt)")
+    parser.add_argument("--hash-repeat", type=int, default=5, help="batches (bcrypt)")
+    parser.add_argument("--skip-bcrypt", action="store_true")
+    parser.add_argument("--output", default=None, help="write a JSON report to this path")
+    args = parser.parse_args()
+
+    # Throwaway RS256 keys, set before app.config is imported
+    os.environ.setdefault("JWT_KEYS_DIR", tempfile.mkdtemp(prefix="auth-bench-keys-"))
+    main(args)
@@ -0,0 +1,92 @@
+"""
+Embedding pipeline throughput and incremental re-runs
+
+Generates synthetic program documents (English and Chinese sentences drawn
+from a small vocabulary, with some boilerplate shared between programs) and
+runs pipeline.run over them into a fresh store for each worker count. Each
+configuration reports a cold run, an unchanged re-run (nothing should be
+re-embedded) and a re-run after editing a share of the documents (only the
+changed chunks should be).
+
+Usage (from backend/):
+    python benchmarks/embedding_pipeline.py
+    python benchmarks/embedding_pipeline.py --documents 5000 --workers 0 2 4 --batch-size 64 --output pipeline.json
+"""
+import argparse
+import random
+import tempfile
+
+from _common import print_table, write_json
+
+WORDS = ("program students research data machine learning finance analysis thesis industry "
+         "course curriculum project statistics management policy design engineering").split()
+CJK_WORDS = ["课程", "研究", "数据", "机器学习", "金融", "分析", "论文", "实习", "项目", "管理"]
+BOILERPLATE = [
+    "Applicants need a bachelor's degree in a related field and IELTS 6.5 or TOEFL 90.",
+    "申请者需要相关专业本科学位，雅思6.5或托福90分。",
+]
+
+
+def synthetic_documents(count: int, seed: int) -> list[tuple[int, str, str]]:
+    rng = random.Random(seed)
+    documents = []
+    for program_id in range(1, count + 1):
+        sentences = []
+        for _ in range(rng.randint(5, 40)):
+            if rng.random() < 0.3:
+                sentences.append("".join(rng.choice(CJK_WORDS) for _ in range(8)) + "。")
+            else:
+                sentences.append(" ".join(rng.choice(WORDS) for _ in range(14)) + ".")
+        documents.append((program_id, "description", " ".join(sentences)))
+        documents.append((program_id, "admissions", rng.choice(BOILERPLATE)))
+    return documents
+
+
+def edited(documents: list, share: float, seed: int) -> list:
+    """Append a sentence to `share` of the descriptions"""
+    rng = random.Random(seed)
+    return [
+        (pid, doc_id, text + f" Updated intake {rng.randint(2025, 2030)}.")
+        if doc_id == "description" and rng.random() < share else (pid, doc_id, text)
+        for pid, doc_id, text in documents
+    ]
+
+
+def main(args):
+    from app.recommendation.embedders import load_embedder
+    from pipeline.run import run_pipeline
+    from pipeline.store import EmbeddingStore
+
+    documents = synthetic_documents(args.documents, args.seed)
+    changed = edited(documents, args.edit_share, args.seed + 1)
+    embedder = load_embedder(args.embedder)
+    rows = []
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory(prefix="embeddings-") as directory:
+            store = EmbeddingStore(directory, embedder.name, embedder.dim, dtype=args.dtype)
+            for run, docs in (("cold", documents), ("unchanged", documents), ("edited", changed)):
+                stats = run_pipeline(docs, store, embedder, args.embedder, workers=workers,
+                                     batch_size=args.batch_size)
+                rows.append({"workers": workers, "run": run, **stats})
+            rows[-1]["store_mib"] = round(store.stats()["bytes"] / 2**20, 2)
+            store.close()
+
+    print_table(rows, ["workers", "run", "documents", "chunks", "embedded", "reused", "seconds",
+                       "embedded_per_second", "store_mib"])
+    if args.output:
+        write_json(args.output, {"documents": args.documents, "embedder": embedder.name, "results": rows})
+    if any(row["run"] == "unchanged" and row["embedded"] for row in rows):
+        raise SystemExit("Unchanged re-run embedded chunks again")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=2000, help="programs to generate")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--embedder", default="app.recommendation.embedders:HashingEmbedder")
+    parser.add_argument("--dtype", choices=["float16", "float32"], default="float16")
+    parser.add_argument("--edit-share", type=float, default=0.1, help="share of descriptions edited")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write a JSON report to this path")
+    main(parser.parse_args())
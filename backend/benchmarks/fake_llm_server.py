@@ -0,0 +1,154 @@
+"""
+Fake LLM Server
+Minimal OpenAI-compatible API for running the LLM proxy locally and in
+benchmarks without a model or API key
+
+Implements POST /v1/completions (one prompt or a list) and
+POST /v1/chat/completions (plain or streamed as server-sent events). The
+reply echoes the last prompt / user message word by word, cut at
+max_tokens; one word counts as one token. Each request takes `latency`
+seconds plus `token_delay` per generated token, streamed tokens arriving
+`token_delay` apart. GET /stats reports requests (in total and by
+endpoint), prompts and the highest number of requests in flight seen.
+
+Usage (from backend/):
+    uvicorn benchmarks.fake_llm_server:app --port 8001
+    LLM_BASE_URL=http://localhost:8001/v1 uvicorn app.main:app
+
+    FAKE_LLM_LATENCY and FAKE_LLM_TOKEN_DELAY (seconds) set the timings
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Union
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+
+class CompletionBody(BaseModel):
+    model: str
+    prompt: Union[str, list[str]]
+    max_tokens: int = 16
+
+
+class ChatBody(BaseModel):
+    model: str
+    messages: list[dict[str, Any]]
+    max_tokens: int = 256
+    stream: bool = False
+    stream_options: dict[str, Any] = {}
+
+
+def _reply(text: str, max_tokens: int) -> tuple[list[str], str]:
+    """Reply words and finish reason"""
+    words = f"You said: {text}".split()
+    return words[:max_tokens], "length" if len(words) > max_tokens else "stop"
+
+
+def create_app(latency: float = 0.2, token_delay: float = 0.005) -> FastAPI:
+    """
+    Build a fake server
+
+    Args:
+        latency: Seconds before the first token of every request
+        token_delay: Seconds per generated token
+    """
+    app = FastAPI(title="Fake LLM")
+    stats = {"requests": 0, "prompts": 0, "in_flight": 0, "max_in_flight": 0, "endpoints": {}}
+
+    @contextmanager
+    def tracked(endpoint: str):
+        stats["requests"] += 1
+        stats["endpoints"][endpoint] = stats["endpoints"].get(endpoint, 0) + 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            yield
+        finally:
+            stats["in_flight"] -= 1
+
+    @app.post("/v1/completions")
+    async def completions(body: CompletionBody):
+        prompts = [body.prompt] if isinstance(body.prompt, str) else body.prompt
+        with tracked("completions"):
+            stats["prompts"] += len(prompts)
+            replies = [_reply(prompt, body.max_tokens) for prompt in prompts]
+            await asyncio.sleep(latency + token_delay * max(len(words) for words, _ in replies))
+        return {
+            "id": f"cmpl-{uuid.uuid4().hex}",
+            "object": "text_completion",
+            "created": int(time.time()),
+            "model": body.model,
+            "choices": [
+                {"index": i, "text": " ".join(words), "finish_reason": reason}
+                for i, (words, reason) in enumerate(replies)
+            ],
+            "usage": {
+                "prompt_tokens": sum(len(prompt.split()) for prompt in prompts),
+                "completion_tokens": sum(len(words) for words, _ in replies),
+            },
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: ChatBody):
+        prompt = next((m.get("content", "") for m in reversed(body.messages) if m.get("role") == "user"), "")
+        words, reason = _reply(prompt, body.max_tokens)
+        usage = {
+            "prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in body.messages),
+            "completion_tokens": len(words),
+        }
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": body.model}
+
+        if not body.stream:
+            with tracked("chat"):
+                stats["prompts"] += 1
+                await asyncio.sleep(latency + token_delay * len(words))
+            return {
+                **base,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": reason,
+                }],
+                "usage": usage,
+            }
+
+        async def events():
+            def event(data: dict) -> str:
+                return f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', **data})}\n\n"
+
+            with tracked("chat"):
+                stats["prompts"] += 1
+                await asyncio.sleep(latency)
+                for i, word in enumerate(words):
+                    delta = {"content": word if i == 0 else f" {word}"}
+                    yield event({"choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                    await asyncio.sleep(token_delay)
+                yield event({"choices": [{"index": 0, "delta": {}, "finish_reason": reason}]})
+                if body.stream_options.get("include_usage"):
+                    yield event({"choices": [], "usage": usage})
+                yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def read_stats():
+        return stats
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        stats.update(requests=0, prompts=0, max_in_flight=stats["in_flight"], endpoints={})
+        return stats
+
+    return app
+
+
+app = create_app(
+    latency=float(os.getenv("FAKE_LLM_LATENCY", "0.2")),
+    token_delay=float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.005")),
+)
@@ -0,0 +1,163 @@
+"""
+Hybrid retrieval latency: BM25 lexical index, vector index and RRF fusion
+
+For each `--sizes` chunk count, generates synthetic program text (Zipf-
+distributed English words mixed with runs of Chinese characters,
+`--chunks-per-program` chunks per program) and program embeddings, builds
+app.recommendation.lexical_index and vector_index, then times queries made
+of a few terms taken from a random chunk. Reports build time, index size,
+per-query latency of each retriever, of the fusion step and of the whole
+hybrid search, unfiltered and restricted to a random candidate set (as the
+structured filter would), and how often the lexical side ranks the program
+the query terms came from in its top `--k`.
+
+Usage (from backend/):
+    python benchmarks/hybrid_retrieval.py
+    python benchmarks/hybrid_retrieval.py --sizes 10000 100000 --queries 500 --output hybrid.json
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from _common import percentile, print_table, write_json
+from vector_index import synthetic_embeddings
+
+CJK_BASE = 0x4E00
+
+
+def synthetic_chunks(count: int, words: int, tokens: int, seed: int) -> list[str]:
+    """Chunks of `tokens` terms: Zipf-distributed words, ~30% of them 2-4 character Chinese runs"""
+    rng = np.random.default_rng(seed)
+    vocabulary = [f"w{i:x}q" for i in range(words)]
+    word_ids = np.minimum(rng.zipf(1.2, size=(count, tokens)), words) - 1
+    is_cjk = rng.random((count, tokens)) < 0.3
+    cjk = np.minimum(rng.zipf(1.3, size=(count, tokens, 4)), 3000) - 1
+    chunks = []
+    for row in range(count):
+        parts = []
+        for col in range(tokens):
+            if is_cjk[row, col]:
+                parts.append("".join(chr(CJK_BASE + c) for c in cjk[row, col, :2 + col % 3]))
+            else:
+                parts.append(vocabulary[word_ids[row, col]])
+        chunks.append(" ".join(parts))
+    return chunks
+
+
+def query_from(chunk: str, rng: np.random.Generator) -> str:
+    terms = chunk.split()
+    return " ".join(terms[i] for i in rng.choice(len(terms), 3, replace=False))
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def timing(name: str, latencies: list[float], **extra) -> dict:
+    return {
+        "step": name,
+        **extra,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+    }
+
+
+def main(args):
+    from app.recommendation.index_versions import read_current
+    from app.recommendation.lexical_index import LexicalIndex, build_lexical_index
+    from app.recommendation.retrieval import reciprocal_rank_fusion
+    from app.recommendation.vector_index import IVFIndex, build_index, normalize
+
+    rng = np.random.default_rng(args.seed)
+    rows, builds = [], []
+    for size in args.sizes:
+        programs = max(size // args.chunks_per_program, 1)
+        program_ids = np.sort(rng.integers(1, programs + 1, size))
+        program_ids[:programs] = np.arange(1, programs + 1)  # Every program has a chunk
+        program_ids.sort()
+        started = time.perf_counter()
+        chunks = synthetic_chunks(size, args.words, args.tokens, args.seed)
+        generate_s = time.perf_counter() - started
+        vectors = normalize(synthetic_embeddings(programs, args.dim, args.topics, args.seed))
+
+        with tempfile.TemporaryDirectory(prefix="hybrid-") as directory:
+            lexical_dir, vector_dir = os.path.join(directory, "lexical"), os.path.join(directory, "vector")
+            started = time.perf_counter()
+            build_lexical_index(lexical_dir, program_ids, chunks)
+            lexical_build_s = time.perf_counter() - started
+            started = time.perf_counter()
+            build_index(vector_dir, np.arange(1, programs + 1), vectors, seed=args.seed)
+            vector_build_s = time.perf_counter() - started
+            lexical, vector = LexicalIndex.open(lexical_dir), IVFIndex.open(vector_dir)
+            builds.append({
+                "chunks": size,
+                "programs": programs,
+                "terms": lexical.meta["terms"],
+                "postings": lexical.meta["postings"],
+                "generate_s": round(generate_s, 1),
+                "lexical_build_s": round(lexical_build_s, 1),
+                "vector_build_s": round(vector_build_s, 1),
+                "lexical_mib": round(directory_size(os.path.join(lexical_dir, read_current(lexical_dir))) / 2**20, 1),
+            })
+
+            sources = rng.integers(0, size, args.queries)
+            queries = [query_from(chunks[i], rng) for i in sources]
+            embeddings = normalize(vectors[program_ids[sources] - 1]
+                                   + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32))
+            candidate_sets = {"all": None}
+            candidate_sets[f"{args.candidate_share:.0%}"] = np.sort(
+                rng.choice(np.arange(1, programs + 1), max(int(programs * args.candidate_share), 1), replace=False)
+            )
+
+            for label, candidate_ids in candidate_sets.items():
+                latency = {"lexical": [], "vector": [], "fusion": [], "hybrid": []}
+                hits = eligible = 0
+                for query, embedding, source in zip(queries, embeddings, sources):
+                    started = time.perf_counter()
+                    lexical_ids, _ = lexical.search(query, args.depth, candidate_ids=candidate_ids)
+                    lexical_done = time.perf_counter()
+                    vector_ids, _ = vector.search(embedding, args.depth, candidate_ids=candidate_ids)
+                    vector_done = time.perf_counter()
+                    reciprocal_rank_fusion([lexical_ids, vector_ids])
+                    fused_done = time.perf_counter()
+                    latency["lexical"].append(lexical_done - started)
+                    latency["vector"].append(vector_done - lexical_done)
+                    latency["fusion"].append(fused_done - vector_done)
+                    latency["hybrid"].append(fused_done - started)
+                    if candidate_ids is None or program_ids[source] in candidate_ids:
+                        eligible += 1
+                        hits += int(program_ids[source] in lexical_ids[:args.k])
+                for step, samples in latency.items():
+                    extra = {"chunks": size, "candidates": label}
+                    if step == "lexical":
+                        extra["source_hit"] = round(hits / max(eligible, 1), 3)
+                    rows.append(timing(step, samples, **extra))
+            del lexical, vector  # Release the maps before the directory is removed
+
+    print_table(builds, ["chunks", "programs", "terms", "postings", "generate_s", "lexical_build_s",
+                         "vector_build_s", "lexical_mib"])
+    print()
+    print_table(rows, ["chunks", "candidates", "step", "p50_ms", "p95_ms", "source_hit"])
+    if args.output:
+        write_json(args.output, {"depth": args.depth, "builds": builds, "results": rows})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="chunk counts")
+    parser.add_argument("--chunks-per-program", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=40, help="terms per chunk")
+    parser.add_argument("--words", type=int, default=50000, help="English vocabulary size")
+    parser.add_argument("--dim", type=int, default=128, help="embedding dimension")
+    parser.add_argument("--topics", type=int, default=200, help="clusters in the synthetic embeddings")
+    parser.add_argument("--depth", type=int, default=200, help="results taken from each retriever")
+    parser.add_argument("--k", type=int, default=10, help="cut-off for source_hit")
+    parser.add_argument("--candidate-share", type=float, default=0.2, help="share of programs in the filtered runs")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write a JSON report to this path")
+    main(parser.parse_args())
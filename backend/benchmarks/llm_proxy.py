@@ -0,0 +1,177 @@
+"""
+LLM proxy: micro-batching, concurrency limits and streaming against the
+fake LLM server
+
+Starts fake_llm_server.py on a local port (`--latency` seconds per
+request plus `--token-delay` per token) and drives app.llm_proxy.proxy:
+
+- batching: `--calls` concurrent complete() calls from distinct users, with
+  batching off and with a `--batch-window-ms` window (the fake model is
+  declared a /completions model, as chat models are never batched);
+  reports call latency, wall time and upstream requests made
+- limits: the same burst as chat() calls, reporting the most requests the
+  server saw in flight (must not exceed `--max-concurrency`), and one user
+  firing `--user-calls` calls at once (run `--user-concurrency` at a time;
+  with a short queue timeout the rest are rejected with 429)
+- streaming: time to first text vs. time to the full reply
+
+Usage (from backend/):
+    python benchmarks/llm_proxy.py
+    python benchmarks/llm_proxy.py --calls 500 --latency 0.5 --max-concurrency 32 --output llm.json
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from _common import percentile, print_table, write_json
+
+
+def timing(case: str, latencies: list[float], **extra) -> dict:
+    return {
+        "case": case,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        **extra,
+    }
+
+
+def start_server(latency: float, token_delay: float):
+    """Run the fake server in a background thread; returns (server, thread, base URL)"""
+    import uvicorn
+    from fake_llm_server import create_app
+
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(latency, token_delay), host="127.0.0.1", port=0, log_level="warning", lifespan="off",
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+async def main(args):
+    import httpx
+    from app.common.exceptions import RateLimitExceededError
+    from app.llm_proxy.proxy import LLMProxy
+    from app.llm_proxy.schemas import ChatMessage
+
+    server, thread, url = start_server(args.latency, args.token_delay)
+    stats_client = httpx.AsyncClient(base_url=url)
+
+    async def reset():
+        await stats_client.post("/stats/reset")
+
+    async def stats() -> dict:
+        return (await stats_client.get("/stats")).json()
+
+    def proxy(**overrides) -> LLMProxy:
+        options = dict(
+            base_url=f"{url}/v1", api_key=None, model="fake", max_connections=args.max_concurrency,
+            max_concurrency=args.max_concurrency, user_concurrency=args.user_concurrency,
+            queue_timeout=60, batch_window=0, batch_max_size=args.batch_max_size,
+        )
+        options.update(overrides)
+        return LLMProxy(**options)
+
+    async def timed(call) -> float:
+        started = time.perf_counter()
+        await call()
+        return time.perf_counter() - started
+
+    rows = []
+    messages = lambda i: [ChatMessage(role="user", content=f"Why is program {i} a good match for me?")]
+
+    # Batching
+    for label, window in (("complete, no batching", 0.0), ("complete, batched", args.batch_window_ms / 1000)):
+        client = proxy(batch_window=window, completions_models=["fake"])
+        await reset()
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(
+            timed(lambda i=i: client.complete(f"Explain program {i}", user_id=i, purpose="bench", max_tokens=32))
+            for i in range(args.calls)
+        ))
+        wall = time.perf_counter() - started
+        server_stats = await stats()
+        rows.append(timing(label, latencies, wall_ms=round(wall * 1000), upstream_requests=server_stats["requests"],
+                           max_in_flight=server_stats["max_in_flight"]))
+        await client.close()
+
+    # Global cap
+    client = proxy()
+    await reset()
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(
+        timed(lambda i=i: client.chat(messages(i), user_id=i, purpose="bench", max_tokens=32))
+        for i in range(args.calls)
+    ))
+    server_stats = await stats()
+    rows.append(timing("chat", latencies, wall_ms=round((time.perf_counter() - started) * 1000),
+                       upstream_requests=server_stats["requests"], max_in_flight=server_stats["max_in_flight"]))
+    await client.close()
+
+    # Per-user cap: queued, then rejected
+    for label, queue_timeout in (("chat, one user", 60), ("chat, one user, 0.1s queue", 0.1)):
+        client = proxy(queue_timeout=queue_timeout)
+        await reset()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            timed(lambda: client.chat(messages(0), user_id=0, purpose="bench", max_tokens=32))
+            for _ in range(args.user_calls)
+        ), return_exceptions=True)
+        served = [r for r in results if isinstance(r, float)]
+        rejected = sum(isinstance(r, RateLimitExceededError) for r in results)
+        server_stats = await stats()
+        rows.append(timing(label, served, wall_ms=round((time.perf_counter() - started) * 1000),
+                           upstream_requests=server_stats["requests"], max_in_flight=server_stats["max_in_flight"],
+                           rejected=rejected))
+        await client.close()
+
+    # Streaming
+    client = proxy()
+    first, total = [], []
+
+    async def stream_timed(i: int) -> None:
+        started = time.perf_counter()
+        first_at = None
+        prompt = [ChatMessage(role="user", content=" ".join(f"word{j}" for j in range(args.stream_tokens)))]
+        async for _ in client.stream_chat(prompt, user_id=i, purpose="bench", max_tokens=args.stream_tokens):
+            if first_at is None:
+                first_at = time.perf_counter() - started
+        first.append(first_at)
+        total.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(stream_timed(i) for i in range(args.streams)))
+    rows.append(timing("stream, first text", first))
+    rows.append(timing("stream, full reply", total))
+    await client.close()
+
+    await stats_client.aclose()
+    server.should_exit = True
+    thread.join()
+
+    print_table(rows, ["case", "p50_ms", "p95_ms", "wall_ms", "upstream_requests", "max_in_flight", "rejected"])
+    if args.output:
+        write_json(args.output, {"latency": args.latency, "token_delay": args.token_delay, "results": rows})
+    over = [row for row in rows if row.get("max_in_flight", 0) > args.max_concurrency]
+    if over:
+        raise SystemExit(f"Concurrency cap exceeded: {over}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200, help="concurrent calls per burst")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake server seconds per request")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="fake server seconds per token")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--user-concurrency", type=int, default=2)
+    parser.add_argument("--user-calls", type=int, default=10, help="concurrent calls of the single user")
+    parser.add_argument("--batch-window-ms", type=float, default=10)
+    parser.add_argument("--batch-max-size", type=int, default=16)
+    parser.add_argument("--streams", type=int, default=20, help="concurrent streamed calls")
+    parser.add_argument("--stream-tokens", type=int, default=64)
+    parser.add_argument("--output", default=None, help="write a JSON report to this path")
+    asyncio.run(main(parser.parse_args()))
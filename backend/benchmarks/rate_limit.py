@@ -0,0 +1,86 @@
+"""
+Rate limiter correctness and overhead
+
+Fires `--requests` concurrent hits at one key from `--workers` limiter
+instances (standing in for uvicorn workers) that share one Redis, and checks
+that exactly `--limit` were allowed. Then measures the cost of a single
+check. Runs against fakeredis by default, a real server with --redis-url,
+and the in-process fallback with --backend local.
+
+Usage (from backend/):
+    python benchmarks/rate_limit.py
+    python benchmarks/rate_limit.py --redis-url redis://localhost:6379/15
+    python benchmarks/rate_limit.py --backend local
+"""
+import argparse
+import asyncio
+import time
+
+from _common import print_table, write_json
+
+
+def make_client(args):
+    if args.backend == "local":
+        return None
+    if args.redis_url:
+        from redis.asyncio import Redis
+
+        return Redis.from_url(args.redis_url, decode_responses=True)
+    import fakeredis  # pip install "fakeredis[lua]"
+
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+async def main(args):
+    from app.config import settings
+    from app.common.redis import set_redis
+    from app.common.rate_limit import SlidingWindowLimiter
+
+    client = make_client(args)
+    settings.REDIS_ENABLED = client is not None
+    set_redis(client)
+    if client is not None:
+        await client.delete("bench:ratelimit:burst", "bench:ratelimit:timing")
+
+    # Local windows are per worker, so the fallback is checked with one instance
+    workers = [SlidingWindowLimiter(prefix="bench:ratelimit") for _ in range(args.workers if client else 1)]
+    results = await asyncio.gather(*(
+        workers[i % len(workers)].hit("burst", args.limit, args.window)
+        for i in range(args.requests)
+    ))
+    allowed = sum(1 for retry_after in results if retry_after == 0)
+
+    limiter = workers[0]
+    started = time.perf_counter()
+    for _ in range(args.timing_requests):
+        await limiter.hit("timing", args.timing_requests + 1, args.window)
+    per_check_us = (time.perf_counter() - started) / args.timing_requests * 1e6
+
+    row = {
+        "backend": args.backend if client is None else ("redis" if args.redis_url else "fakeredis"),
+        "workers": len(workers),
+        "requests": args.requests,
+        "limit": args.limit,
+        "allowed": allowed,
+        "ok": allowed == args.limit,
+        "us_per_check": round(per_check_us, 1),
+    }
+    print_table([row], list(row))
+    if args.output:
+        write_json(args.output, row)
+    if client is not None:
+        await client.delete("bench:ratelimit:burst", "bench:ratelimit:timing")
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["redis", "local"], default="redis")
+    parser.add_argument("--redis-url", default=None, help="Real Redis server (default: fakeredis)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--window", type=float, default=60)
+    parser.add_argument("--timing-requests", type=int, default=2000)
+    parser.add_argument("--output", default=None, help="write a JSON report to this path")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,132 @@
+"""
+Recommendation cache: hit vs miss latency and coalescing of identical misses
+
+Scores a synthetic catalog through app.recommendation.service and reports
+the latency of a miss (compute + store), a hit served by the in-process tier
+and a hit served by Redis. Then fires `--concurrency` identical requests at
+each of `--workers` cache instances (standing in for uvicorn workers sharing
+one Redis) and checks the result was computed exactly once. `--compute-ms`
+adds a delay to each computation, standing in for the slower stages
+(semantic re-rank, LLM explanation) a recommendation round will include.
+
+Runs against fakeredis by default, a real server with --redis-url, and the
+in-process tier only with --backend local (coalescing then holds per worker).
+
+Usage (from backend/):
+    python benchmarks/recommendation_cache.py
+    python benchmarks/recommendation_cache.py --redis-url redis://localhost:6379/15 --programs 50000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timezone
+
+from _common import percentile, print_table, write_json
+from rate_limit import make_client
+from recommendation_scoring import synthetic_rows
+
+
+def timing(name: str, latencies: list[float]) -> dict:
+    return {
+        "case": name,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+    }
+
+
+async def main(args):
+    from app.config import settings
+    from app.common.redis import set_redis
+    from app.profile.schemas import ProfileResponse
+    from app.recommendation.cache import RecommendationCache, fingerprint, recommendation_cache
+    from app.recommendation.catalog import ProgramCatalog, program_catalog
+    from app.recommendation.schemas import RecommendationRequest
+    from app.recommendation.service import compute_recommendations, merge_criteria, run_recommendation_job
+
+    client = make_client(args)
+    settings.REDIS_ENABLED = client is not None
+    set_redis(client)
+    if client is not None:
+        await client.flushdb()
+    catalog = ProgramCatalog(synthetic_rows(args.programs))
+    program_catalog.set(catalog)
+    request = RecommendationRequest(target_countries=["GB", "US"], limit=args.limit)
+
+    def profile(user_id: int) -> ProfileResponse:
+        return ProfileResponse(
+            id=user_id, email=f"u{user_id}@example.com", username=f"u{user_id}", nickname=None,
+            avatar_url=None, bio=None, phone=None, is_active=True, is_verified=True,
+            created_at=datetime.now(timezone.utc), gpa=3.5, ielts_score=7.0, major="finance", budget=40000,
+        )
+
+    async def timed(user_ids, before=None) -> list[float]:
+        latencies = []
+        for user_id in user_ids:
+            if before:
+                before(user_id)
+            # The part of a recommendation job a worker runs
+            record = {"user_id": user_id, "criteria": merge_criteria(request, profile(user_id)).model_dump(mode="json")}
+            started = time.perf_counter()
+            await run_recommendation_job(record)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    users = range(1, args.requests + 1)
+    rows = [
+        timing("miss", await timed(users)),
+        timing("hit (local)", await timed(users)),
+    ]
+    if client is not None:
+        rows.append(timing("hit (redis)", await timed(users, before=recommendation_cache.local.delete)))
+
+    # Identical concurrent misses across workers
+    computations = 0
+    criteria = merge_criteria(request, profile(0))
+    key = fingerprint(criteria, catalog.version)
+
+    async def compute():
+        nonlocal computations
+        computations += 1
+        await asyncio.sleep(args.compute_ms / 1000)
+        return compute_recommendations(catalog, criteria).model_dump(mode="json")
+
+    workers = [
+        RecommendationCache("bench-recommendations", ttl=60, local_ttl=5, maxsize=100, max_entries=5,
+                            lock_timeout=10)
+        for _ in range(args.workers)
+    ]
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        worker.get_or_compute(0, key, compute) for worker in workers for _ in range(args.concurrency)
+    ))
+    burst_ms = (time.perf_counter() - started) * 1000
+    expected = 1 if client is not None else args.workers
+    same = all(result == results[0] for result in results)
+
+    print_table(rows, ["case", "p50_ms", "p95_ms"])
+    print(f"\n{len(results)} identical concurrent misses over {args.workers} workers: "
+          f"{computations} computation(s) (expected {expected}), {burst_ms:.1f} ms, identical results: {same}")
+    if args.output:
+        write_json(args.output, {
+            "programs": args.programs,
+            "backend": args.backend if client is None else ("redis" if args.redis_url else "fakeredis"),
+            "results": rows,
+            "burst": {"requests": len(results), "computations": computations, "ms": round(burst_ms, 1)},
+        })
+    if computations != expected or not same:
+        raise SystemExit("Identical misses were not coalesced")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["redis", "local"], default="redis")
+    parser.add_argument("--redis-url", default=None, help="real Redis server (default: fakeredis)")
+    parser.add_argument("--programs", type=int, default=10000, help="catalog size")
+    parser.add_argument("--limit", type=int, default=20, help="programs per response")
+    parser.add_argument("--requests", type=int, default=200, help="users measured per case")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=25, help="identical requests per worker")
+    parser.add_argument("--compute-ms", type=float, default=200, help="extra time per computation")
+    parser.add_argument("--output", default=None, help="write a JSON report to this path")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,137 @@
+"""
+Recommendation jobs: request latency with work moved off the request path
+
+For each `--compute-ms` delay (standing in for the slower stages a round
+will include: semantic re-rank, LLM explanation), `--users` users ask for
+recommendations at once against a synthetic catalog, twice:
+
+- sync: the request computes the recommendations itself (the previous
+  POST /api/recommendations), so its latency is the computation plus
+  queueing behind the others
+- async: the request only submits a job (app.recommendation.jobs) and a
+  JobRunner with `--workers` workers runs it; reported are the submit
+  latency and the time until each job's result is available
+
+Also checks that an identical submission made while a job is unfinished
+returns that job. Runs against fakeredis by default, a real server with
+--redis-url, and the in-process store with --backend local.
+
+Usage (from backend/):
+    python benchmarks/recommendation_jobs.py
+    python benchmarks/recommendation_jobs.py --compute-ms 0 500 5000 --users 200 --workers 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from _common import percentile, print_table, write_json
+from rate_limit import make_client
+from recommendation_scoring import synthetic_rows
+
+
+def timing(latencies: list[float], **extra) -> dict:
+    return {
+        **extra,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+    }
+
+
+async def main(args):
+    from app.config import settings
+    from app.common.redis import set_redis
+    from app.recommendation.cache import fingerprint
+    from app.recommendation.catalog import ProgramCatalog
+    from app.recommendation.jobs import JobRunner, get_job, submit_job
+    from app.recommendation.schemas import RecommendationRequest
+    from app.recommendation.service import compute_recommendations
+
+    client = make_client(args)
+    settings.REDIS_ENABLED = client is not None
+    settings.RECOMMENDATION_JOB_USER_LIMIT = 1000
+    settings.RECOMMENDATION_JOB_QUEUE_LIMIT = max(args.users * 2, settings.RECOMMENDATION_JOB_QUEUE_LIMIT)
+    settings.RECOMMENDATION_JOB_TIMEOUT = 3600
+    set_redis(client)
+    catalog = ProgramCatalog(synthetic_rows(args.programs))
+    criteria = RecommendationRequest(gpa=3.5, ielts_score=7.0, major="finance", target_countries=["GB", "US"],
+                                     limit=args.limit)
+    payload = criteria.model_dump(mode="json")
+    key = fingerprint(criteria, catalog.version)
+
+    async def compute(delay: float) -> dict:
+        await asyncio.sleep(delay)
+        return (await asyncio.to_thread(compute_recommendations, catalog, criteria)).model_dump(mode="json")
+
+    rows = []
+    dedup_ok = True
+    for compute_ms in args.compute_ms:
+        delay = compute_ms / 1000
+        users = range(1, args.users + 1)
+
+        # Synchronous: each request holds its connection for the computation,
+        # with at most `workers` computations at a time as well
+        slots = asyncio.Semaphore(args.workers)
+
+        async def sync_request() -> float:
+            started = time.perf_counter()
+            async with slots:
+                await compute(delay)
+            return time.perf_counter() - started
+
+        latencies = await asyncio.gather(*(sync_request() for _ in users))
+        rows.append(timing(latencies, compute_ms=compute_ms, mode="sync", step="request"))
+
+        # Asynchronous: submit, then poll until done
+        if client is not None:
+            await client.flushdb()
+        runner = JobRunner(lambda record: compute(delay), workers=args.workers, timeout=3600,
+                           poll_seconds=args.poll_seconds)
+        runner.start()
+
+        async def async_request(user_id: int) -> tuple[float, float, bool]:
+            started = time.perf_counter()
+            record = await submit_job(user_id, key, payload)
+            runner.notify()
+            submitted = time.perf_counter() - started
+            duplicate = await submit_job(user_id, key, payload)
+            while record["status"] in ("queued", "running"):
+                await asyncio.sleep(args.poll_seconds)
+                record = await get_job(user_id, record["id"])
+            return submitted, time.perf_counter() - started, duplicate["id"] == record["id"]
+
+        results = await asyncio.gather(*(async_request(user_id) for user_id in users))
+        await runner.stop()
+        dedup_ok &= all(same for _, _, same in results)
+        rows.append(timing([r[0] for r in results], compute_ms=compute_ms, mode="async", step="request"))
+        rows.append(timing([r[1] for r in results], compute_ms=compute_ms, mode="async", step="result ready"))
+
+    print_table(rows, ["compute_ms", "mode", "step", "p50_ms", "p95_ms", "max_ms"])
+    print(f"\n{args.users} concurrent users, {args.workers} workers; "
+          f"duplicate submissions returned the unfinished job: {dedup_ok}")
+    if args.output:
+        write_json(args.output, {
+            "programs": args.programs,
+            "users": args.users,
+            "workers": args.workers,
+            "backend": args.backend if client is None else ("redis" if args.redis_url else "fakeredis"),
+            "results": rows,
+        })
+    if not dedup_ok:
+        raise SystemExit("Duplicate submissions were not deduplicated")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["redis", "local"], default="redis")
+    parser.add_argument("--redis-url", default=None, help="real Redis server (default: fakeredis)")
+    parser.add_argument("--programs", type=int, default=10000, help="catalog size")
+    parser.add_argument("--limit", type=int, default=20, help="programs per response")
+    parser.add_argument("--users", type=int, default=100, help="concurrent users per case")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent computations")
+    parser.add_argument("--compute-ms", type=float, nargs="+", default=[0, 200, 2000],
+                        help="extra time per computation")
+    parser.add_argument("--poll-seconds", type=float, default=0.05, help="client polling and job cancellation check interval")
+    parser.add_argument("--output", default=None, help="write a JSON report to this path")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,186 @@
+"""
+Recommendation scoring: vectorized engine vs a per-row Python loop
+
+Builds a synthetic program catalog of each `--sizes` size and scores a few
+typical requests with app.recommendation.scoring (NumPy, one pass over the
+columns) and with a straightforward loop computing the same formulas row by
+row. Checks that both return the same top programs, and reports the median
+time per request, plus the full uncached service computation (scoring and
+building the response items) and the time to build the catalog from rows.
+
+Usage (from backend/):
+    python benchmarks/recommendation_scoring.py
+    python benchmarks/recommendation_scoring.py --sizes 10000 50000 --repeat 50 --output scoring.json
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+
+from _common import print_table, write_json
+
+COUNTRIES = ["US", "GB", "CA", "AU", "DE", "FR", "NL", "SG", "HK", "JP", "KR", "CH", "SE", "IE", "NZ"]
+DEGREES = ["bachelor", "master", "phd"]
+
+REQUESTS = {
+    "open": dict(gpa=3.4, ielts_score=7.0, major="computer_science", budget=40000),
+    "country": dict(gpa=3.4, toefl_score=100, major="finance", target_countries=["GB", "US"], budget=50000),
+    "narrow": dict(gpa=3.8, ielts_score=7.5, major="data_science", target_degree="master",
+                   target_countries=["SG"], max_rank=200),
+}
+
+
+def synthetic_rows(count: int, seed: int = 0) -> list[dict]:
+    from app.recommendation.catalog import MAJOR_GROUPS
+
+    rng = random.Random(seed)
+    majors = list(MAJOR_GROUPS) + ["liberal_arts", "game_design"]
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": i + 1,
+            "school_name": f"University {i // 20}",
+            "program_name": f"Program {i}",
+            "country": rng.choice(COUNTRIES),
+            "city": f"City {i % 300}",
+            "degree": rng.choice(DEGREES),
+            "major": rng.choice(majors),
+            "qs_rank": None if rng.random() < 0.2 else rng.randint(1, 1500),
+            "tuition": None if rng.random() < 0.05 else rng.randrange(0, 70000, 500),
+            "min_gpa": None if rng.random() < 0.1 else round(rng.uniform(2.5, 3.8), 2),
+            "min_ielts": None if rng.random() < 0.2 else rng.choice([5.5, 6.0, 6.5, 7.0, 7.5]),
+            "min_toefl": None if rng.random() < 0.3 else rng.randrange(70, 111),
+        })
+    return rows
+
+
+def naive_top(rows: list[dict], criteria) -> list[tuple[int, float]]:
+    """Reference implementation: filter, score and sort one row at a time"""
+    from app.recommendation.catalog import major_group_code, normalize_category, normalize_country, toefl_to_ielts
+    from app.recommendation.scoring import NO_REQUIREMENT, STUDENT_UNKNOWN, WEIGHTS, student_language_band
+
+    def margin_score(margin, base, gain, penalty):
+        return base + (gain if margin >= 0 else penalty) * margin
+
+    countries = {normalize_country(c) for c in criteria.target_countries or []}
+    band = student_language_band(criteria.ielts_score, criteria.toefl_score)
+    major = normalize_category(criteria.major) if criteria.major else None
+    scored = []
+    for row in rows:
+        if criteria.target_degree and normalize_category(row["degree"]) != criteria.target_degree:
+            continue
+        if countries and normalize_country(row["country"]) not in countries:
+            continue
+        if criteria.max_rank is not None and (row["qs_rank"] is None or row["qs_rank"] > criteria.max_rank):
+            continue
+
+        if criteria.gpa is None:
+            academic = STUDENT_UNKNOWN
+        elif row["min_gpa"] is None:
+            academic = NO_REQUIREMENT
+        else:
+            academic = margin_score(criteria.gpa - row["min_gpa"], 70.0, 60.0, 150.0)
+
+        requirements = [r for r in (row["min_ielts"],
+                                    None if row["min_toefl"] is None else float(toefl_to_ielts(row["min_toefl"])))
+                        if r is not None]
+        if band is None:
+            language = STUDENT_UNKNOWN
+        elif not requirements:
+            language = NO_REQUIREMENT
+        else:
+            language = margin_score(band - min(requirements), 75.0, 50.0, 100.0)
+
+        row_major = normalize_category(row["major"])
+        if major is None:
+            major_fit = STUDENT_UNKNOWN
+        elif row_major == major:
+            major_fit = 100.0
+        elif major_group_code(major) >= 0 and major_group_code(row_major) == major_group_code(major):
+            major_fit = 70.0
+        else:
+            major_fit = 30.0
+
+        if criteria.budget is None:
+            budget = STUDENT_UNKNOWN
+        elif row["tuition"] is None:
+            budget = 70.0
+        else:
+            budget = 100.0 - 200.0 * max((row["tuition"] - criteria.budget) / max(criteria.budget, 1), 0)
+
+        components = {"academic": academic, "language": language, "major": major_fit, "budget": budget}
+        total = sum(WEIGHTS[k] * min(max(v, 0.0), 100.0) for k, v in components.items())
+        rank = math.inf if row["qs_rank"] is None else row["qs_rank"]
+        scored.append((-total, rank, row["id"]))
+
+    scored.sort()
+    return [(program_id, -neg_total) for neg_total, _, program_id in scored[:criteria.limit]]
+
+
+def median_ms(func, repeat: int) -> float:
+    func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def same_results(fast, naive) -> bool:
+    """Same programs in the same order (scores equal up to float32 rounding)"""
+    fast_scores = {pid: score for pid, score in fast}
+    return len(fast) == len(naive) and all(
+        pid in fast_scores and abs(fast_scores[pid] - score) < 0.01 for pid, score in naive
+    )
+
+
+def main(args):
+    from app.recommendation.catalog import ProgramCatalog
+    from app.recommendation.schemas import RecommendationRequest
+    from app.recommendation.scoring import score_programs
+    from app.recommendation.service import compute_recommendations
+
+    rows_out = []
+    for size in args.sizes:
+        rows = synthetic_rows(size)
+        build_ms = median_ms(lambda: ProgramCatalog(rows), max(args.repeat // 10, 3))
+        catalog = ProgramCatalog(rows)
+
+        for name, fields in REQUESTS.items():
+            criteria = RecommendationRequest(**fields, limit=args.limit)
+
+            def fast():
+                result = score_programs(catalog, criteria)
+                return [(int(catalog.ids[i]), float(s)) for i, s in zip(result.indices, result.scores)]
+
+            naive = naive_top(rows, criteria)
+            rows_out.append({
+                "programs": size,
+                "request": name,
+                "candidates": score_programs(catalog, criteria).total_candidates,
+                "vectorized_ms": median_ms(fast, args.repeat),
+                "service_ms": median_ms(lambda: compute_recommendations(catalog, criteria), args.repeat),
+                "naive_ms": median_ms(lambda: naive_top(rows, criteria), max(args.repeat // 10, 3)),
+                "build_ms": build_ms,
+                "same_top": same_results(fast(), naive),
+            })
+            row = rows_out[-1]
+            row["speedup"] = round(row["naive_ms"] / row["vectorized_ms"], 1)
+
+    print_table(rows_out, ["programs", "request", "candidates", "vectorized_ms", "service_ms",
+                           "naive_ms", "speedup", "build_ms", "same_top"])
+    if args.output:
+        write_json(args.output, rows_out)
+    if not all(row["same_top"] for row in rows_out):
+        raise SystemExit("Vectorized and naive results differ")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--limit", type=int, default=20, help="programs returned per request")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--output", default=None, help="write a JSON report to this path")
+    main(parser.parse_args())
@@ -0,0 +1,130 @@
+"""
+Response serialization and compression cost
+
+Compares, per response, the CPU time of FastAPI's default `response_model`
+path (dump, re-validate, jsonable_encoder, json.dumps) with returning a
+FastJSONResponse built from the already-validated model, for UserResponse
+and ProfileResponse. Then measures gzip time and size for bodies of
+increasing length, showing where GZIP_MINIMUM_SIZE starts to pay off.
+
+Usage (from backend/):
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --iterations 20000 --output serialization.json
+"""
+import argparse
+import asyncio
+import gzip
+import time
+from datetime import datetime, timezone
+
+from _common import print_table, write_json
+
+
+def cpu_per_call(func, iterations: int, repeat: int = 5) -> float:
+    """CPU microseconds per call (best of `repeat` batches)"""
+    func()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        for _ in range(iterations):
+            func()
+        best = min(best, time.process_time() - started)
+    return best / iterations * 1e6
+
+
+def sample_models():
+    from app.auth.schemas import Principal, UserResponse
+    from app.profile.schemas import ProfileResponse
+
+    now = datetime.now(timezone.utc)
+    user = dict(id=42, email="student@example.com", username="student_42",
+                is_active=True, is_verified=True, created_at=now)
+    profile = ProfileResponse(
+        **user, nickname="Student 42", avatar_url="https://example.com/avatars/42.png",
+        bio="Interested in computer science programs in Europe and Asia. " * 3, phone="+1 555 0100",
+    )
+    return [
+        ("UserResponse", UserResponse, Principal(**user)),
+        ("ProfileResponse", ProfileResponse, profile),
+    ]
+
+
+def serialization_rows(iterations: int) -> list[dict]:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from app.common.responses import FastJSONResponse
+
+    loop = asyncio.new_event_loop()
+
+    async def noop():
+        return None
+
+    # serialize_response is a coroutine; don't charge the default path for driving it
+    loop_us = cpu_per_call(lambda: loop.run_until_complete(noop()), iterations)
+    rows = []
+    for name, model, instance in sample_models():
+        field = create_response_field(name="Response_" + name, type_=model)
+
+        def default_path():
+            content = loop.run_until_complete(serialize_response(field=field, response_content=instance))
+            return JSONResponse(content).body
+
+        def fast_path():
+            return FastJSONResponse(instance).body
+
+        assert default_path() == fast_path(), f"{name}: outputs differ"
+        default_us = cpu_per_call(default_path, iterations) - loop_us
+        fast_us = cpu_per_call(fast_path, iterations)
+        rows.append({
+            "model": name,
+            "bytes": len(fast_path()),
+            "default_us": round(default_us, 2),
+            "fast_us": round(fast_us, 2),
+            "saved_us": round(default_us - fast_us, 2),
+            "speedup": round(default_us / fast_us, 1),
+        })
+    loop.close()
+    return rows
+
+
+def compression_rows(sizes: list[int], level: int, iterations: int) -> list[dict]:
+    from app.common.responses import FastJSONResponse
+
+    profile = sample_models()[1][2]
+    rows = []
+    for count in sizes:
+        body = FastJSONResponse([profile] * count).body
+        compressed = gzip.compress(body, compresslevel=level)
+        us = cpu_per_call(lambda: gzip.compress(body, compresslevel=level), max(iterations // count, 20))
+        rows.append({
+            "profiles": count,
+            "bytes": len(body),
+            "gzip_bytes": len(compressed),
+            "ratio": round(len(compressed) / len(body), 2),
+            "gzip_us": round(us, 1),
+            "us_per_kib_saved": round(us / max((len(body) - len(compressed)) / 1024, 1e-9), 1),
+        })
+    return rows
+
+
+def main(args):
+    serialization = serialization_rows(args.iterations)
+    print("Serialization (CPU per response):")
+    print_table(serialization, ["model", "bytes", "default_us", "fast_us", "saved_us", "speedup"])
+
+    compression = compression_rows(args.sizes, args.level, args.iterations)
+    print(f"\ngzip level {args.level}:")
+    print_table(compression, ["profiles", "bytes", "gzip_bytes", "ratio", "gzip_us", "us_per_kib_saved"])
+
+    if args.output:
+        write_json(args.output, {"serialization": serialization, "compression": compression})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16, 64, 256], help="profiles per body")
+    parser.add_argument("--level", type=int, default=5, help="gzip compression level")
+    parser.add_argument("--output", default=None, help="write a JSON report to this path")
+    main(parser.parse_args())
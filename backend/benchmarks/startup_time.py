@@ -0,0 +1,123 @@
+"""
+Cold start report: import time and lifespan startup time of app.main
+
+Each run starts a fresh interpreter, so numbers include everything a new
+uvicorn worker pays before it can serve its first request:
+
+- import: `import app.main`, measured with `python -X importtime`
+- lifespan: the startup half of the lifespan hook (DB_CREATE_ALL=false)
+
+It also lists the slowest top-level packages and checks that optional
+dependencies (Google login, passlib, httpx) are not loaded at import time.
+`--max-import-ms` turns the report into a regression check (exit code 1).
+
+Usage (from backend/):
+    python benchmarks/startup_time.py --runs 5
+    python benchmarks/startup_time.py --max-import-ms 1500 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from _common import BACKEND_DIR, print_table, write_json
+
+# Modules that must only be imported when the feature is first used
+LAZY_MODULES = ("google.auth", "passlib", "httpx")
+
+LIFESPAN_PROBE = """
+import asyncio, json, sys, time
+from app.main import app, import_seconds
+async def main():
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        lifespan = time.perf_counter() - started
+    print(json.dumps({
+        "import_s": import_seconds,
+        "lifespan_s": lifespan,
+        "lazy_loaded": [m for m in %r if m in sys.modules],
+    }))
+asyncio.run(main())
+""" % (LAZY_MODULES,)
+
+
+def run_probe(env: dict) -> dict:
+    """Start a fresh interpreter, import the app and run its lifespan"""
+    result = subprocess.run(
+        [sys.executable, "-c", LIFESPAN_PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_profile(env: dict) -> dict[str, float]:
+    """Self import time (ms) per top-level package, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    totals: dict[str, float] = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line[13:]:
+            continue
+        self_us, _, name = line[12:].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        package = name.strip().split(".")[0]
+        totals[package] += int(self_us) / 1000
+    return totals
+
+
+def main(args):
+    env = {
+        **os.environ,
+        "DATABASE_URL": args.database_url,
+        "DB_CREATE_ALL": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+
+    runs = [run_probe(env) for _ in range(args.runs)]
+    import_ms = statistics.median(r["import_s"] for r in runs) * 1000
+    lifespan_ms = statistics.median(r["lifespan_s"] for r in runs) * 1000
+    lazy_loaded = sorted({m for r in runs for m in r["lazy_loaded"]})
+
+    profile = import_profile(env)
+    slowest = sorted(profile.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    print(f"import app.main: {import_ms:.1f} ms (median of {args.runs})")
+    print(f"lifespan startup: {lifespan_ms:.1f} ms")
+    print(f"optional modules loaded at import: {', '.join(lazy_loaded) or 'none'}\n")
+    print_table(
+        [{"package": name, "self_ms": round(ms, 1)} for name, ms in slowest],
+        ["package", "self_ms"],
+    )
+
+    if args.json:
+        write_json(args.json, {
+            "import_ms": round(import_ms, 1),
+            "lifespan_ms": round(lifespan_ms, 1),
+            "lazy_loaded": lazy_loaded,
+            "packages_ms": {name: round(ms, 1) for name, ms in slowest},
+        })
+
+    failed = False
+    if lazy_loaded:
+        print(f"\nFAIL: {', '.join(lazy_loaded)} imported at startup")
+        failed = True
+    if args.max_import_ms and import_ms > args.max_import_ms:
+        print(f"\nFAIL: import time {import_ms:.1f} ms exceeds {args.max_import_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest packages to list")
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--database-url", default="sqlite:///./startup_bench.sqlite")
+    parser.add_argument("--json", default=None, help="Write a JSON report to this path")
+    main(parser.parse_args())
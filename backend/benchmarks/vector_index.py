@@ -0,0 +1,130 @@
+"""
+Vector index recall and latency vs brute-force NumPy search
+
+Builds app.recommendation.vector_index over synthetic clustered embeddings
+(standing in for program-description embeddings), then for each nprobe
+reports recall@k against exact brute-force search and per-query latency.
+Filtered searches restrict results to random candidate sets of several
+sizes, as the structured filter would. Also reports build time and the time
+to open the index (mmap) versus loading the vectors into memory.
+
+Usage (from backend/):
+    python benchmarks/vector_index.py
+    python benchmarks/vector_index.py --count 200000 --dim 384 --nprobe 4 8 16 --output ann.json
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from _common import percentile, print_table, write_json
+
+
+def synthetic_embeddings(count: int, dim: int, topics: int, seed: int) -> np.ndarray:
+    """Gaussian mixture: descriptions cluster around topics, like real programs do"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    topic = rng.integers(0, topics, count)
+    return centers[topic] + 0.8 * rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def exact_top(vectors: np.ndarray, ids: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = vectors @ query
+    best = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+    return ids[best[np.argsort(-scores[best])]]
+
+
+def timed(func, queries) -> tuple[list, list[float]]:
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(func(query))
+        latencies.append(time.perf_counter() - started)
+    return results, latencies
+
+
+def recall(found: list, expected: list) -> float:
+    hits = sum(len(set(f.tolist()) & set(e.tolist())) for f, e in zip(found, expected))
+    return round(hits / max(sum(len(e) for e in expected), 1), 4)
+
+
+def row(name: str, latencies: list[float], found=None, expected=None, **extra) -> dict:
+    return {
+        "search": name,
+        **extra,
+        "recall": 1.0 if found is None else recall(found, expected),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+    }
+
+
+def main(args):
+    from app.recommendation.vector_index import IVFIndex, build_index, normalize
+
+    rng = np.random.default_rng(args.seed + 1)
+    vectors = normalize(synthetic_embeddings(args.count, args.dim, args.topics, args.seed))
+    ids = np.arange(1, args.count + 1, dtype=np.int64) * 7  # IDs need not be dense
+    queries = normalize(vectors[rng.integers(0, args.count, args.queries)]
+                        + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32))
+
+    with tempfile.TemporaryDirectory(prefix="vector-index-") as directory:
+        started = time.perf_counter()
+        build_index(directory, ids, vectors, nlist=args.nlist, seed=args.seed)
+        build_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index = IVFIndex.open(directory)
+        open_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        np.load(os.path.join(index.path, "vectors.npy"))
+        load_ms = (time.perf_counter() - started) * 1000
+
+        rows = []
+        expected, latencies = timed(lambda q: exact_top(vectors, ids, q, args.k), queries)
+        rows.append(row("brute force", latencies, candidates="all", nprobe="-"))
+        for nprobe in args.nprobe:
+            found, latencies = timed(lambda q: index.search(q, args.k, nprobe=nprobe)[0], queries)
+            rows.append(row("ivf", latencies, found, expected, candidates="all", nprobe=nprobe))
+
+        for size in args.candidates:
+            candidate_ids = rng.choice(ids, min(size, args.count), replace=False)
+            positions = np.searchsorted(ids, np.sort(candidate_ids))
+            # Brute force gathers the candidates' vectors per query, like the index does
+            expected, latencies = timed(lambda q: exact_top(vectors[positions], ids[positions], q, args.k), queries)
+            rows.append(row("brute force", latencies, candidates=size, nprobe="-"))
+            found, latencies = timed(
+                lambda q: index.search(q, args.k, nprobe=args.filtered_nprobe, candidate_ids=candidate_ids)[0],
+                queries,
+            )
+            rows.append(row("ivf", latencies, found, expected, candidates=size, nprobe=args.filtered_nprobe))
+
+        print(f"{args.count} vectors x {args.dim}, {index.meta['nlist']} lists: "
+              f"build {build_s:.1f} s, open (mmap) {open_ms:.2f} ms, full load {load_ms:.1f} ms")
+        print_table(rows, ["search", "candidates", "nprobe", "recall", "p50_ms", "p95_ms"])
+        if args.output:
+            write_json(args.output, {
+                "count": args.count, "dim": args.dim, "nlist": index.meta["nlist"], "k": args.k,
+                "build_s": round(build_s, 2), "open_ms": round(open_ms, 3), "load_ms": round(load_ms, 1),
+                "results": rows,
+            })
+        del index  # Release the maps before the directory is removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=200, help="clusters in the synthetic data")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default 4 * sqrt(count))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[200, 2000, 20000],
+                        help="candidate set sizes for filtered search")
+    parser.add_argument("--filtered-nprobe", type=int, default=16)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write a JSON report to this path")
+    main(parser.parse_args())
@@ -0,0 +1 @@
+# Offline embedding pipeline (run with `python -m pipeline.run`)
@@ -0,0 +1,68 @@
+"""
+Chunking
+Splits documents into sentence-aligned chunks small enough to embed
+"""
+import hashlib
+import re
+
+# Sentence ends in English and Chinese text
+SENTENCE_END = re.compile(r"(?<=[.!?;。！？；])\s+|(?<=[。！？；])")
+WHITESPACE = re.compile(r"[ \t\r\f\v]+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse runs of spaces and blank lines so formatting-only edits hash the same"""
+    lines = (WHITESPACE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def chunk_text(text: str, max_chars: int = 800, overlap_chars: int = 120) -> list[str]:
+    """
+    Split text into chunks of at most `max_chars`, breaking between sentences
+
+    The last sentence of a chunk is repeated at the start of the next one
+    when it is shorter than `overlap_chars`, so a statement spanning the
+    break is still embedded together with its context. Sentences longer than
+    `max_chars` are split hard.
+
+    Args:
+        text: Document text
+        max_chars: Maximum chunk length
+        overlap_chars: Longest sentence carried over into the next chunk
+
+    Returns:
+        Chunks in document order (deterministic for the same input)
+    """
+    sentences = []
+    for paragraph in normalize_text(text).split("\n"):
+        for sentence in SENTENCE_END.split(paragraph):
+            sentence = sentence.strip()
+            while len(sentence) > max_chars:
+                sentences.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if sentence:
+                sentences.append(sentence)
+
+    chunks, current = [], []
+    length = 0
+    for sentence in sentences:
+        if current and length + 1 + len(sentence) > max_chars:
+            chunks.append(" ".join(current))
+            carry = current[-1]
+            current = [carry] if len(carry) <= overlap_chars and len(carry) + 1 + len(sentence) <= max_chars else []
+            length = sum(len(s) + 1 for s in current)
+        current.append(sentence)
+        length += len(sentence) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def content_hash(model: str, text: str) -> str:
+    """
+    Key of one chunk's embedding
+
+    Includes the model name, so switching models re-embeds everything while
+    unchanged text under the same model is never embedded twice.
+    """
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
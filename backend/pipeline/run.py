@@ -0,0 +1,193 @@
+"""
+Embedding pipeline
+
+Streams program documents, splits them into chunks and embeds only chunks
+whose content hash is not in the store yet, so re-running over unchanged
+text costs a hash per chunk and no model calls. When the source is complete
+(the database, or a file passed with --prune), documents it no longer yields,
+such as those of deactivated programs, are removed from the store and so
+from the indexes built from it. Embedding runs in batches
+on a process pool (one model instance per worker); the main process is the
+only store writer and appends each finished batch as it arrives.
+
+Usage (from backend/):
+    python -m pipeline.run
+    python -m pipeline.run --source programs.jsonl --workers 4 --batch-size 64 --build-index
+    python -m pipeline.run --source programs.jsonl --prune --compact
+    python -m pipeline.run --embedder app.recommendation.embedders:SentenceTransformerEmbedder --store embeddings-st
+"""
+import argparse
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.config import settings
+from app.recommendation.embedders import load_embedder
+from pipeline.chunking import chunk_text, content_hash
+from pipeline.sources import database_documents, jsonl_documents
+from pipeline.store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+_worker_embedder = None
+
+
+def _init_worker(spec: str) -> None:
+    """Load the model once per worker process"""
+    global _worker_embedder
+    _worker_embedder = load_embedder(spec)
+
+
+def _embed_batch(texts: list[str]) -> np.ndarray:
+    return _worker_embedder.embed(texts)
+
+
+def run_pipeline(documents, store: EmbeddingStore, embedder, spec: str, workers: int = 0,
+                 batch_size: int = 32, max_chars: int = 800, prune: bool = False) -> dict:
+    """
+    Chunk, dedup, embed and store documents
+
+    Args:
+        documents: Iterable of (program_id, doc_id, text)
+        store: Store to update
+        embedder: Embedder instance (used directly when workers is 0)
+        spec: Import spec of the embedder, loaded by each worker
+        workers: Embedding processes; 0 embeds in this process
+        batch_size: Chunks per model call
+        max_chars: Maximum chunk length
+        prune: `documents` is the complete set; remove stored documents it
+            did not yield (deactivated or deleted programs)
+
+    Returns:
+        Run statistics
+    """
+    stats = {"documents": 0, "chunks": 0, "reused": 0, "embedded": 0, "removed": 0}
+    seen: set[tuple[int, str]] = set()
+    started = time.perf_counter()
+    queued: set[str] = set()  # Hashes sent for embedding during this run
+    batch_hashes: list[str] = []
+    batch_texts: list[str] = []
+    in_flight: deque = deque()
+
+    pool = None
+    if workers > 0:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(spec,),
+        )
+
+    def store_batch(hashes, vectors):
+        store.add(hashes, vectors)  # Also commits the documents set so far
+        stats["embedded"] += len(hashes)
+
+    def flush():
+        if not batch_hashes:
+            return
+        hashes, texts = batch_hashes[:], batch_texts[:]
+        batch_hashes.clear()
+        batch_texts.clear()
+        if pool is None:
+            store_batch(hashes, embedder.embed(texts))
+            return
+        # Bound the batches held in memory while workers catch up
+        while len(in_flight) >= workers * 2:
+            done_hashes, future = in_flight.popleft()
+            store_batch(done_hashes, future.result())
+        in_flight.append((hashes, pool.submit(_embed_batch, texts)))
+
+    try:
+        for program_id, doc_id, text in documents:
+            chunks = chunk_text(text, max_chars=max_chars)
+            hashes = [content_hash(embedder.name, chunk) for chunk in chunks]
+            missing = store.missing(hashes) - queued
+            for chunk, chunk_hash in zip(chunks, hashes):
+                if chunk_hash not in missing:
+                    continue
+                missing.discard(chunk_hash)
+                queued.add(chunk_hash)
+                batch_hashes.append(chunk_hash)
+                batch_texts.append(chunk)
+                if len(batch_hashes) >= batch_size:
+                    flush()
+            # A document may reference chunks still being embedded; they are
+            # stored before the run ends, and re-embedded if it is interrupted
+            store.set_document(program_id, doc_id, hashes)
+            seen.add((program_id, doc_id))
+            stats["documents"] += 1
+            stats["chunks"] += len(hashes)
+
+        flush()
+        while in_flight:
+            done_hashes, future = in_flight.popleft()
+            store_batch(done_hashes, future.result())
+        store.commit()
+        if prune:
+            stats["removed"] = store.remove_documents_except(seen)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    stats["reused"] = stats["chunks"] - stats["embedded"]
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["embedded_per_second"] = round(stats["embedded"] / max(stats["seconds"], 1e-9), 1)
+    return stats
+
+
+def main(args):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    embedder = load_embedder(args.embedder)
+    store = EmbeddingStore(args.store, embedder.name, embedder.dim, dtype=args.dtype)
+
+    def documents():
+        return database_documents(settings.DATABASE_URL) if args.source == "db" else jsonl_documents(args.source)
+
+    try:
+        stats = run_pipeline(documents(), store, embedder, args.embedder, workers=args.workers,
+                             batch_size=args.batch_size, max_chars=args.max_chars,
+                             prune=args.source == "db" or args.prune)
+        logger.info(f"Embedded {stats['embedded']} of {stats['chunks']} chunks from {stats['documents']} "
+                    f"documents ({stats['reused']} reused, {stats['removed']} removed) in {stats['seconds']} s")
+        if args.compact:
+            logger.info(f"Compacted store: {store.compact()} unreferenced vectors removed")
+        logger.info(f"Store: {store.stats()}")
+
+        if args.build_index:
+            from app.recommendation.lexical_index import build_lexical_index
+            from app.recommendation.vector_index import build_index
+
+            ids, vectors = store.program_vectors()
+            if len(ids):
+                build_index(settings.VECTOR_INDEX_DIR, ids, vectors)
+                # Second pass over the source: the store keeps vectors, not text
+                chunks = [
+                    (program_id, chunk)
+                    for program_id, _, text in documents()
+                    for chunk in chunk_text(text, max_chars=args.max_chars)
+                ]
+                build_lexical_index(settings.LEXICAL_INDEX_DIR, [c[0] for c in chunks], (c[1] for c in chunks))
+            else:
+                logger.warning("No program vectors; indexes not built")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="db", help="'db' (programs table) or a JSON Lines file")
+    parser.add_argument("--store", default=settings.EMBEDDING_STORE_DIR)
+    parser.add_argument("--embedder", default=settings.EMBEDDING_MODEL, help="embedder import spec (module:Class)")
+    parser.add_argument("--dtype", choices=["float16", "float32"], default="float16")
+    parser.add_argument("--workers", type=int, default=0, help="embedding processes (0 = in this process)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-chars", type=int, default=800, help="maximum chunk length")
+    parser.add_argument("--prune", action="store_true",
+                        help="the source file is complete: remove stored documents it lacks (always on for 'db')")
+    parser.add_argument("--compact", action="store_true", help="drop vectors no document references")
+    parser.add_argument("--build-index", action="store_true", help="rebuild the vector and lexical indexes")
+    main(parser.parse_args())
@@ -0,0 +1,55 @@
+"""
+Document Sources
+Stream (program_id, doc_id, text) documents without loading them all at once
+"""
+import json
+from typing import Iterator
+
+# A source yields (program_id, doc_id, text); doc_id names the document
+# within its program, e.g. "description" or "admissions"
+Document = tuple[int, str, str]
+
+
+def database_documents(database_url: str, batch_size: int = 500) -> Iterator[Document]:
+    """
+    Descriptions of active programs, streamed from the database
+
+    Args:
+        database_url: Sync database URL (DATABASE_URL)
+        batch_size: Rows fetched per round trip
+    """
+    from sqlalchemy import create_engine, select
+
+    from app.recommendation.models import Program
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            rows = conn.execution_options(yield_per=batch_size).execute(
+                select(Program.id, Program.description)
+                .where(Program.is_active.is_not(False), Program.description.is_not(None))
+                .order_by(Program.id)
+            )
+            for program_id, description in rows:
+                yield program_id, "description", description
+    finally:
+        engine.dispose()
+
+
+def jsonl_documents(path: str) -> Iterator[Document]:
+    """
+    Documents from a JSON Lines file, one object per line:
+    {"program_id": 1, "doc_id": "admissions", "text": "..."}
+
+    Args:
+        path: File path
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                yield int(item["program_id"]), str(item.get("doc_id", "description")), item["text"]
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"{path}:{line_number}: invalid document ({e})") from e
@@ -0,0 +1,238 @@
+"""
+Embedding Store
+Chunk embeddings keyed by content hash, and the chunks of each program
+document, kept on disk so ingestion is incremental
+
+    <dir>/meta.json       embedder name, dim, dtype
+    <dir>/vectors-<n>.bin one fixed-size row per distinct chunk (float16 or float32)
+    <dir>/index.sqlite    chunks(content_hash -> row),
+                          documents(program_id, doc_id, seq -> content_hash)
+                          and the name of the current vectors file
+
+Vectors are appended before their rows are committed to SQLite, so after a
+crash the file can only have trailing rows nobody references; they are cut
+off on the next open. Rows that stop being referenced when documents change
+or are removed (remove_documents_except) are reclaimed by compact(), which writes a new vectors file and switches to
+it in the same SQLite transaction that renumbers the rows.
+"""
+import json
+import os
+import sqlite3
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    content_hash TEXT PRIMARY KEY,
+    row INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    program_id INTEGER NOT NULL,
+    doc_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (program_id, doc_id, seq)
+);
+"""
+
+
+class EmbeddingStore:
+    """
+    On-disk embedding store (single writer)
+
+    Args:
+        directory: Store directory (created if missing)
+        model: Embedder name; a store only ever holds one model's vectors
+        dim: Embedding dimension
+        dtype: "float16" (half the size, ample precision for cosine ranking) or "float32"
+    """
+
+    def __init__(self, directory: str, model: str, dim: int, dtype: str = "float16"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        meta = {"model": model, "dim": dim, "dtype": dtype}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                existing = json.load(f)
+            if existing != meta:
+                raise ValueError(f"Store {directory} holds {existing}, not {meta}; use a new directory")
+        else:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        self.model, self.dim, self.dtype = model, dim, np.dtype(dtype)
+        self.row_bytes = self.dim * self.dtype.itemsize
+        self.db = sqlite3.connect(os.path.join(directory, "index.sqlite"))
+        self.db.executescript(SCHEMA)
+        self.db.execute("INSERT OR IGNORE INTO files (name, path) VALUES ('vectors', 'vectors-0.bin')")
+        self.db.commit()
+        vectors_file = self.db.execute("SELECT path FROM files WHERE name = 'vectors'").fetchone()[0]
+        self.vectors_path = os.path.join(directory, vectors_file)
+        self.rows = self.db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+        # Drop vectors whose rows were never committed
+        with open(self.vectors_path, "ab") as f:
+            if f.tell() != self.rows * self.row_bytes:
+                f.truncate(self.rows * self.row_bytes)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def missing(self, hashes: Iterable[str]) -> set[str]:
+        """The subset of `hashes` with no stored vector"""
+        hashes = set(hashes)
+        found = set()
+        pending = list(hashes)
+        for start in range(0, len(pending), 500):
+            batch = pending[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            found.update(h for (h,) in self.db.execute(
+                f"SELECT content_hash FROM chunks WHERE content_hash IN ({placeholders})", batch
+            ))
+        return hashes - found
+
+    def add(self, hashes: Sequence[str], vectors: np.ndarray) -> None:
+        """Append vectors for new content hashes (already stored hashes are skipped)"""
+        missing = self.missing(hashes)
+        new, seen = [], set()
+        for i, content_hash in enumerate(hashes):
+            if content_hash in missing and content_hash not in seen:
+                seen.add(content_hash)
+                new.append(i)
+        if not new:
+            return
+        data = np.ascontiguousarray(vectors[new], dtype=self.dtype)
+        with open(self.vectors_path, "ab") as f:
+            f.write(data.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self.db.executemany(
+            "INSERT INTO chunks (content_hash, row) VALUES (?, ?)",
+            [(hashes[i], self.rows + n) for n, i in enumerate(new)],
+        )
+        self.db.commit()
+        self.rows += len(new)
+
+    def set_document(self, program_id: int, doc_id: str, hashes: Sequence[str]) -> None:
+        """Replace the chunk list of one program document"""
+        self.db.execute("DELETE FROM documents WHERE program_id = ? AND doc_id = ?", (program_id, doc_id))
+        self.db.executemany(
+            "INSERT INTO documents (program_id, doc_id, seq, content_hash) VALUES (?, ?, ?, ?)",
+            [(program_id, doc_id, seq, h) for seq, h in enumerate(hashes)],
+        )
+
+    def remove_documents_except(self, keep: Iterable[tuple[int, str]]) -> int:
+        """
+        Drop every document not in `keep` (e.g. of programs deactivated since
+        the last run); their vectors are reclaimed by compact()
+
+        Args:
+            keep: (program_id, doc_id) of the documents still in the source
+
+        Returns:
+            Number of documents removed
+        """
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS kept (program_id INTEGER, doc_id TEXT)")
+        self.db.execute("DELETE FROM kept")
+        self.db.executemany("INSERT INTO kept (program_id, doc_id) VALUES (?, ?)", keep)
+        removed = self.db.execute(
+            "SELECT COUNT(DISTINCT program_id || ':' || doc_id) FROM documents d WHERE NOT EXISTS "
+            "(SELECT 1 FROM kept k WHERE k.program_id = d.program_id AND k.doc_id = d.doc_id)"
+        ).fetchone()[0]
+        self.db.execute(
+            "DELETE FROM documents WHERE NOT EXISTS "
+            "(SELECT 1 FROM kept k WHERE k.program_id = documents.program_id AND k.doc_id = documents.doc_id)"
+        )
+        self.db.execute("DELETE FROM kept")
+        self.db.commit()
+        return removed
+
+    def commit(self) -> None:
+        self.db.commit()
+
+    def vectors(self) -> np.ndarray:
+        """All stored chunk vectors, memory-mapped (rows as in the chunks table)"""
+        if not self.rows:
+            return np.empty((0, self.dim), dtype=self.dtype)
+        return np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(self.rows, self.dim))
+
+    def program_vectors(self, program_ids: Optional[Sequence[int]] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        One vector per program: the normalized mean of its chunk vectors
+
+        Args:
+            program_ids: Limit to these programs (default all)
+
+        Returns:
+            (program IDs, float32 vectors), ordered by program ID
+        """
+        query = (
+            "SELECT d.program_id, c.row FROM documents d JOIN chunks c ON c.content_hash = d.content_hash"
+        )
+        params: list = []
+        if program_ids is not None:
+            query += f" WHERE d.program_id IN ({','.join('?' * len(program_ids))})"
+            params = list(program_ids)
+        pairs = np.array(self.db.execute(query + " ORDER BY d.program_id", params).fetchall(), dtype=np.int64)
+        if not len(pairs):
+            return np.empty(0, dtype=np.int64), np.empty((0, self.dim), dtype=np.float32)
+
+        ids, starts = np.unique(pairs[:, 0], return_index=True)
+        sums = np.add.reduceat(np.asarray(self.vectors()[pairs[:, 1]], dtype=np.float32), starts, axis=0)
+        sums /= np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        return ids, sums
+
+    def stats(self) -> dict:
+        referenced = self.db.execute("SELECT COUNT(DISTINCT content_hash) FROM documents").fetchone()[0]
+        programs = self.db.execute("SELECT COUNT(DISTINCT program_id) FROM documents").fetchone()[0]
+        return {
+            "programs": programs,
+            "chunks": self.rows,
+            "unreferenced": self.rows - referenced,
+            "bytes": self.rows * self.row_bytes,
+        }
+
+    def compact(self) -> int:
+        """
+        Rewrite the store without vectors no document references
+
+        Returns:
+            Number of rows removed
+        """
+        keep = self.db.execute(
+            "SELECT content_hash, row FROM chunks WHERE content_hash IN (SELECT content_hash FROM documents) "
+            "ORDER BY row"
+        ).fetchall()
+        removed = self.rows - len(keep)
+        if not removed:
+            return 0
+
+        old = self.vectors()
+        generation = int(os.path.basename(self.vectors_path)[len("vectors-"):-len(".bin")]) + 1
+        new_path = os.path.join(self.directory, f"vectors-{generation}.bin")
+        with open(new_path, "wb") as f:
+            for start in range(0, len(keep), 65536):
+                rows = [row for _, row in keep[start:start + 65536]]
+                f.write(np.ascontiguousarray(old[rows]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        del old
+
+        # Renumbered rows and the new file name become visible together
+        with self.db:
+            self.db.execute("DELETE FROM chunks")
+            self.db.executemany(
+                "INSERT INTO chunks (content_hash, row) VALUES (?, ?)",
+                [(content_hash, row) for row, (content_hash, _) in enumerate(keep)],
+            )
+            self.db.execute("UPDATE files SET path = ? WHERE name = 'vectors'", (os.path.basename(new_path),))
+        os.unlink(self.vectors_path)
+        self.vectors_path = new_path
+        self.rows = len(keep)
+        return removed
@@ -0,0 +1,110 @@
+"""
+Test configuration
+
+The application reads its settings at import time, so the environment is
+pointed at throwaway stand-ins here, before any test imports app modules:
+SQLite instead of Postgres, in-process fallbacks instead of Redis (tests
+that need Redis use the `redis` fixture, backed by fakeredis), a temporary
+JWT key directory and cheap in-thread password hashing.
+
+Async tests run on the anyio pytest plugin (`pytestmark = pytest.mark.anyio`).
+
+Usage (from backend/):
+    pip install -r tests/requirements.txt
+    python -m pytest -q tests
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="app-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_tmp}/test.sqlite",
+    DB_CREATE_ALL="true",
+    REDIS_ENABLED="false",
+    JWT_KEYS_DIR=os.path.join(_tmp, "keys"),
+    PASSWORD_HASH_WORKERS="0",
+    PASSWORD_HASH_ROUNDS="4",
+    RATE_LIMIT_ENABLED="false",  # Enabled by the rate limit tests
+)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def redis():
+    """Shared Redis client replaced by fakeredis (with Lua) for one test"""
+    import fakeredis.aioredis
+    from app.config import settings
+    from app.common.redis import set_redis
+
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    settings.REDIS_ENABLED = True
+    set_redis(client)
+    yield client
+    set_redis(None)
+    settings.REDIS_ENABLED = False
+    await client.aclose()
+
+
+def _clear_process_state() -> None:
+    """Drop in-process caches and stores (a fresh schema reuses user IDs)"""
+    from app.auth import sessions
+    from app.auth.jwt import token_cache
+    from app.auth.principal import principal_cache
+    from app.common.rate_limit import limiter
+    from app.profile.cache import profile_cache
+    from app.recommendation.cache import recommendation_cache
+
+    for cache in (principal_cache, profile_cache, recommendation_cache):
+        cache.local.clear()
+    token_cache.clear()
+    limiter.reset()
+    sessions._local_store = sessions.LocalSessionStore()
+
+
+@pytest.fixture
+async def db():
+    """Session on a freshly created schema"""
+    import app.main  # noqa: F401  (imports every model onto Base.metadata)
+    from app.database import AsyncSessionLocal, Base, engine
+
+    _clear_process_state()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+async def client(db):
+    """HTTP client for the application (lifespan hooks are not run)"""
+    import httpx
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def signup(client):
+    """Register a user and log in; returns (user ID, token response)"""
+    from app.config import settings
+
+    async def signup(username: str = "alice", password: str = "correct horse") -> tuple[int, dict]:
+        email = f"{username}@example.com"
+        response = await client.post(f"{settings.API_V1_PREFIX}/auth/register", json={
+            "email": email, "username": username, "password": password,
+        })
+        assert response.status_code == 201, response.text
+        tokens = await client.post(f"{settings.API_V1_PREFIX}/auth/login", json={"email": email, "password": password})
+        assert tokens.status_code == 200, tokens.text
+        return response.json()["id"], tokens.json()
+
+    return signup
+
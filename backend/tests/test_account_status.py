@@ -0,0 +1,57 @@
+import pytest
+
+from app.auth import admin, sessions
+from app.common.exceptions import UserNotFoundError
+from app.config import settings
+
+pytestmark = pytest.mark.anyio
+
+AUTH = f"{settings.API_V1_PREFIX}/auth"
+
+
+async def test_disabling_rejects_cached_access_and_refresh_tokens(redis, client, signup):
+    user_id, tokens = await signup()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    # Decoded token and principal are now cached
+    assert (await client.get(f"{AUTH}/me", headers=headers)).status_code == 200
+
+    assert await admin.set_active("alice@example.com", False) == user_id
+
+    assert (await client.get(f"{AUTH}/me", headers=headers)).status_code == 403
+    response = await client.post(f"{AUTH}/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+    assert await redis.get(f"refresh:gen:{user_id}") == "1"
+
+
+async def test_refresh_of_a_disabled_user_does_not_rotate(client, signup, monkeypatch):
+    user_id, tokens = await signup()
+    await admin.set_active(str(user_id), False)
+
+    async def rotate_session(payload):
+        raise AssertionError("session rotated for a disabled user")
+
+    monkeypatch.setattr("app.auth.routes.rotate_session", rotate_session)
+    response = await client.post(f"{AUTH}/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+
+async def test_reenabled_user_signs_in_again(client, signup):
+    user_id, tokens = await signup()
+    await admin.set_active(str(user_id), False)
+    await admin.set_active(str(user_id), True)
+
+    # Sessions revoked while disabled stay revoked
+    response = await client.post(f"{AUTH}/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+    login = await client.post(f"{AUTH}/login", json={"email": "alice@example.com", "password": "correct horse"})
+    assert login.status_code == 200
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    assert (await client.get(f"{AUTH}/me", headers=headers)).status_code == 200
+    assert sessions._local_store._generations[user_id] == 1
+
+
+async def test_unknown_user(db):
+    with pytest.raises(UserNotFoundError):
+        await admin.set_active("nobody@example.com", False)
+    with pytest.raises(UserNotFoundError):
+        await admin.set_active("404", False)
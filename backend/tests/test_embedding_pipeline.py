@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.recommendation.embedders import HashingEmbedder
+from pipeline.chunking import chunk_text, content_hash
+from pipeline.run import run_pipeline
+from pipeline.store import EmbeddingStore
+
+SPEC = "app.recommendation.embedders:HashingEmbedder"
+DIM = 32
+
+DOCUMENTS = [
+    (1, "description", "Quantitative finance with Python. 量化金融课程。"),
+    (2, "description", "Data science and statistics. Machine learning projects."),
+    (2, "admissions", "IELTS 7.0 required. GPA 3.3 minimum."),
+    (3, "description", "Quantitative finance with Python. 量化金融课程。"),  # Same text as program 1
+]
+
+
+@pytest.fixture
+def embedder():
+    return HashingEmbedder(dim=DIM)
+
+
+@pytest.fixture
+def store(tmp_path, embedder):
+    store = EmbeddingStore(str(tmp_path / "store"), embedder.name, DIM, dtype="float32")
+    yield store
+    store.close()
+
+
+def run(store, embedder, documents, **options):
+    return run_pipeline(documents, store, embedder, SPEC, batch_size=2, max_chars=40, **options)
+
+
+def test_unchanged_text_is_never_embedded_twice(store, embedder):
+    first = run(store, embedder, DOCUMENTS)
+    assert first["embedded"] == store.rows
+    assert first["reused"] > 0  # Program 3 repeats program 1
+    second = run(store, embedder, DOCUMENTS)
+    assert second["embedded"] == 0 and second["reused"] == second["chunks"]
+
+
+def test_program_vectors_average_their_chunks(store, embedder):
+    run(store, embedder, DOCUMENTS)
+    ids, vectors = store.program_vectors()
+    assert list(ids) == [1, 2, 3]
+    assert np.allclose(vectors[0], vectors[2])
+
+    texts = [text for program_id, _, text in DOCUMENTS if program_id == 2]
+    chunks = [chunk for text in texts for chunk in chunk_text(text, max_chars=40)]
+    expected = embedder.embed(chunks).sum(axis=0)
+    assert vectors[1] == pytest.approx(expected / np.linalg.norm(expected), abs=1e-6)
+
+
+def test_upsert_replaces_a_documents_chunks(store, embedder):
+    run(store, embedder, DOCUMENTS)
+    run(store, embedder, [(2, "admissions", "TOEFL 100 accepted.")])
+    hashes = [h for (h,) in store.db.execute(
+        "SELECT content_hash FROM documents WHERE program_id = 2 AND doc_id = 'admissions' ORDER BY seq"
+    )]
+    assert hashes == [content_hash(embedder.name, "TOEFL 100 accepted.")]
+    assert store.stats()["unreferenced"] > 0
+
+
+def test_compact_keeps_every_referenced_vector(store, embedder):
+    run(store, embedder, DOCUMENTS)
+    _, before = store.program_vectors([1, 2])
+    run(store, embedder, [(3, "description", "Completely rewritten text.")])
+    run(store, embedder, [(2, "admissions", "TOEFL 100 accepted.")])
+    old_path = store.vectors_path
+
+    removed = store.compact()
+    assert removed > 0 and store.stats()["unreferenced"] == 0
+    assert not os.path.exists(old_path)
+    _, after = store.program_vectors([1])
+    assert after[0] == pytest.approx(before[0], abs=1e-6)
+    assert store.compact() == 0
+
+
+def test_deactivated_programs_are_pruned(store, embedder):
+    run(store, embedder, DOCUMENTS)
+    # Program 2 was deactivated: the database source no longer yields it
+    active = [d for d in DOCUMENTS if d[0] != 2]
+    stats = run(store, embedder, active, prune=True)
+    assert stats["removed"] == 2 and stats["embedded"] == 0
+
+    ids, _ = store.program_vectors()
+    assert list(ids) == [1, 3]
+    assert store.compact() > 0
+    assert store.stats() == {"programs": 2, "chunks": store.rows, "unreferenced": 0, "bytes": store.rows * DIM * 4}
+
+
+def test_partial_source_without_prune_keeps_other_programs(store, embedder):
+    run(store, embedder, DOCUMENTS)
+    assert run(store, embedder, DOCUMENTS[:1])["removed"] == 0
+    assert list(store.program_vectors()[0]) == [1, 2, 3]
+
+
+def test_reopen_cuts_off_uncommitted_vectors(tmp_path, embedder):
+    directory = str(tmp_path / "store")
+    store = EmbeddingStore(directory, embedder.name, DIM, dtype="float32")
+    run(store, embedder, DOCUMENTS)
+    rows = store.rows
+    with open(store.vectors_path, "ab") as f:
+        f.write(b"\0" * (DIM * 4 * 3 + 5))  # Crash after appending, before the commit
+    store.close()
+
+    store = EmbeddingStore(directory, embedder.name, DIM, dtype="float32")
+    assert store.rows == rows
+    assert os.path.getsize(store.vectors_path) == rows * DIM * 4
+    store.close()
+
+    with pytest.raises(ValueError):
+        EmbeddingStore(directory, "other-model", DIM, dtype="float32")
@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.auth import google_certs
+from app.auth.google_certs import GoogleCertificateCache
+
+pytestmark = pytest.mark.anyio
+
+URL = "https://certs.example.com/oauth2/v1/certs"
+
+
+class FakeGoogle:
+    """Certificate endpoint behind httpx.MockTransport, counting fetches"""
+
+    def __init__(self, max_age: int):
+        self.max_age = max_age
+        self.fetches = 0
+        self.certs = {"kid-1": "cert-1"}
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.fetches += 1
+        return httpx.Response(
+            200, json=dict(self.certs), headers={"Cache-Control": f"public, max-age={self.max_age}"}
+        )
+
+    def cache(self, **options) -> GoogleCertificateCache:
+        return GoogleCertificateCache(URL, transport=httpx.MockTransport(self.handle), **options)
+
+
+class FakeClock:
+    """Stands in for the module's `time`, so expiry can be stepped through"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return time.perf_counter()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(google_certs, "time", clock)
+    return clock
+
+
+def test_parse_max_age():
+    assert google_certs.parse_max_age("public, max-age=19800, must-revalidate", 300) == 19800
+    assert google_certs.parse_max_age("no-store", 300) == 300
+    assert google_certs.parse_max_age(None, 300) == 300
+
+
+async def test_certificates_kept_until_max_age(clock):
+    google = FakeGoogle(max_age=600)
+    cache = google.cache(refresh_margin=300, retry_interval=30)
+    try:
+        assert await cache.get_certs("kid-1") == {"kid-1": "cert-1"}
+        clock.now += 599
+        google.certs = {"kid-2": "cert-2"}
+        assert await cache.get_certs("kid-1") == {"kid-1": "cert-1"}
+        assert google.fetches == 1
+
+        clock.now += 1
+        assert await cache.get_certs("kid-2") == {"kid-2": "cert-2"}
+        assert google.fetches == 2
+    finally:
+        await cache.close()
+
+
+async def test_background_refresh_before_expiry():
+    google = FakeGoogle(max_age=1)
+    cache = google.cache(refresh_margin=0.9, retry_interval=0.05)
+    try:
+        await cache.get_certs()
+        google.certs = {"kid-2": "cert-2"}
+        for _ in range(100):
+            if google.fetches > 1:
+                break
+            await asyncio.sleep(0.01)
+        assert google.fetches > 1
+
+        # Served from memory: the request path did not wait for the fetch
+        fetches = google.fetches
+        assert await cache.get_certs("kid-2") == {"kid-2": "cert-2"}
+        assert google.fetches == fetches
+    finally:
+        await cache.close()
+
+
+async def test_unknown_kid_refresh_is_rate_limited(clock):
+    google = FakeGoogle(max_age=3600)
+    cache = google.cache(retry_interval=60)
+    try:
+        await cache.get_certs("kid-1")
+        # Within the retry interval an unknown kid does not hit Google
+        for _ in range(5):
+            assert "unknown" not in await cache.get_certs("unknown")
+        assert google.fetches == 1
+
+        clock.now += 61
+        google.certs = {"kid-1": "cert-1", "rotated": "cert-r"}
+        assert "rotated" in await cache.get_certs("rotated")
+        assert google.fetches == 2
+
+        assert "other" not in await cache.get_certs("other")
+        assert google.fetches == 2
+    finally:
+        await cache.close()
+
+
+async def test_failed_first_fetch_raises():
+    cache = GoogleCertificateCache(URL, transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    try:
+        with pytest.raises(httpx.HTTPStatusError):
+            await cache.get_certs()
+    finally:
+        await cache.close()
@@ -0,0 +1,116 @@
+import time
+
+import pytest
+from jose import JWTError, jwt as jose_jwt
+
+from app.auth import jwt
+from app.auth.keys import KeySet
+from app.config import settings
+
+ROTATION = 100
+
+
+@pytest.fixture
+def keyset(tmp_path, monkeypatch):
+    """Key set on a clock the test moves by whole rotation periods; retains two past periods"""
+    keys = KeySet(str(tmp_path), rotation_seconds=ROTATION, max_token_lifetime=2 * ROTATION)
+    keys.period = 10
+    monkeypatch.setattr(keys, "_period", lambda: keys.period)
+    monkeypatch.setattr(jwt, "keyset", keys)
+    jwt.token_cache.clear()
+    return keys
+
+
+def kid_of(token: str) -> str:
+    return jose_jwt.get_unverified_header(token)["kid"]
+
+
+def test_signing_key_follows_the_period(keyset):
+    assert keyset.signing_key()[0] == "k10"
+    token = jwt.create_access_token({"sub": 1})
+    assert kid_of(token) == "k10"
+    assert jwt.verify_token(token)["sub"] == "1"
+
+    keyset.period = 11
+    assert kid_of(jwt.create_access_token({"sub": 1})) == "k11"
+
+
+def test_next_key_is_published_before_use(keyset, tmp_path):
+    keyset.signing_key()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["k10.pem", "k11.pem"]
+    assert [k["kid"] for k in keyset.jwks()["keys"]] == ["k10", "k11"]
+
+
+def test_jwks_holds_public_keys_only(keyset):
+    for key in keyset.jwks()["keys"]:
+        assert key["kty"] == "RSA" and key["alg"] == "RS256" and key["use"] == "sig"
+        assert {"n", "e"} <= set(key) and "d" not in key
+
+
+def test_old_keys_verify_until_retention_ends(keyset, tmp_path):
+    token = jwt.create_access_token({"sub": 1})
+
+    keyset.period = 12
+    assert "k10" in [k["kid"] for k in keyset.jwks()["keys"]]
+    jwt.token_cache.clear()
+    assert jwt.verify_token(token)["sub"] == "1"
+
+    keyset.period = 13
+    assert "k10" not in [k["kid"] for k in keyset.jwks()["keys"]]
+    assert not (tmp_path / "k10.pem").exists()
+    jwt.token_cache.clear()
+    with pytest.raises(JWTError):
+        jwt.verify_token(token)
+
+
+def test_unknown_kid_is_rejected(keyset):
+    _, key = keyset.signing_key()
+    forged = jose_jwt.encode(
+        {"sub": "1", "type": "access", "exp": int(time.time()) + 60}, key, algorithm="RS256", headers={"kid": "k99"},
+    )
+    with pytest.raises(JWTError):
+        jwt.verify_token(forged)
+    unsigned = jose_jwt.encode({"sub": "1", "type": "access", "exp": int(time.time()) + 60}, key, algorithm="RS256")
+    with pytest.raises(JWTError):
+        jwt.verify_token(unsigned)
+
+
+def test_key_created_by_another_worker_is_picked_up(keyset, tmp_path):
+    keyset.signing_key()
+    other = KeySet(str(tmp_path), rotation_seconds=ROTATION, max_token_lifetime=2 * ROTATION)
+    # The other worker's clock is already in the next period but one
+    other._period = lambda: 11
+    kid, key = other.signing_key()
+    token = jose_jwt.encode(
+        {"sub": "1", "type": "access", "exp": int(time.time()) + 60}, key, algorithm="RS256", headers={"kid": kid},
+    )
+    keyset._last_reload = 0
+    assert jwt.verify_token(token)["sub"] == "1"
+
+
+def legacy_token(**claims) -> str:
+    return jose_jwt.encode(
+        {"sub": "1", "type": "access", "exp": int(time.time()) + 60, **claims},
+        settings.JWT_SECRET_KEY, algorithm="HS256",
+    )
+
+
+def test_legacy_hs256_tokens_need_the_transition_window(keyset, monkeypatch):
+    token = legacy_token()
+    with pytest.raises(JWTError):
+        jwt.verify_token(token)
+
+    monkeypatch.setattr(settings, "JWT_LEGACY_HS256_UNTIL", int(time.time()) + 60)
+    assert jwt.verify_token(token)["sub"] == "1"
+
+    monkeypatch.setattr(settings, "JWT_LEGACY_HS256_UNTIL", int(time.time()) - 1)
+    jwt.token_cache.clear()
+    with pytest.raises(JWTError):
+        jwt.verify_token(token)
+
+
+def test_legacy_window_requires_the_shared_secret(keyset, monkeypatch):
+    monkeypatch.setattr(settings, "JWT_LEGACY_HS256_UNTIL", int(time.time()) + 60)
+    forged = jose_jwt.encode({"sub": "1", "type": "access", "exp": int(time.time()) + 60}, "guess", algorithm="HS256")
+    with pytest.raises(JWTError):
+        jwt.verify_token(forged)
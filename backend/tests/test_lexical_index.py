@@ -0,0 +1,100 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from app.recommendation.lexical_index import B, K1, LexicalIndex, build_lexical_index, tokenize
+
+
+def test_latin_words_are_lowercased_without_stopwords():
+    assert tokenize("The MSc in Finance, CFA-aligned (2025)") == ["msc", "finance", "cfa", "aligned", "2025"]
+
+
+def test_cjk_runs_become_character_bigrams():
+    assert tokenize("量化金融") == ["量化", "化金", "金融"]
+    assert tokenize("英国 量化 CFA课程") == ["英国", "量化", "cfa", "课程"]
+    assert tokenize("学") == ["学"]
+
+
+def test_full_width_text_is_normalized():
+    assert tokenize("ＣＦＡ　２０２５") == ["cfa", "2025"]
+
+
+def test_overlong_tokens_are_dropped():
+    assert tokenize("x" * 33 + " ok") == ["ok"]
+
+
+def reference_bm25(program_ids: list[int], texts: list[str], query: str) -> dict[int, float]:
+    """Textbook BM25 per chunk; a program scores as its best chunk"""
+    docs = [Counter(tokenize(text)) for text in texts]
+    average = sum(sum(d.values()) for d in docs) / len(docs)
+    scores: dict[int, float] = {}
+    for program_id, doc in zip(program_ids, docs):
+        length = sum(doc.values())
+        score = 0.0
+        for term in set(tokenize(query)):
+            tf = doc.get(term, 0)
+            if not tf:
+                continue
+            df = sum(term in d for d in docs)
+            idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average))
+        if score > 0:
+            scores[program_id] = max(scores.get(program_id, 0.0), score)
+    return scores
+
+
+WORDS = ("finance quantitative programming statistics marketing design law data python cfa "
+         "金融 量化 编程 统计 市场 设计 法律 数据").split()
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    rng = random.Random(5)
+    program_ids, texts = [], []
+    for program_id in rng.sample(range(1, 10000), 150):
+        for _ in range(rng.randint(1, 3)):
+            program_ids.append(program_id)
+            texts.append(" ".join(rng.choices(WORDS, k=rng.randint(3, 30))))
+    # Rare terms, scored through the sparse path
+    for offset, text in enumerate(["actuarial science", "actuarial actuarial finance", "精算 数据"]):
+        program_ids.append(20000 + offset)
+        texts.append(text)
+    directory = str(tmp_path_factory.mktemp("lexical"))
+    build_lexical_index(directory, program_ids, texts)
+    return program_ids, texts, LexicalIndex.open(directory)
+
+
+@pytest.mark.parametrize("query", ["quantitative finance", "量化金融 python", "cfa", "法律", "actuarial", "精算"])
+def test_ranking_matches_reference_bm25(corpus, query):
+    program_ids, texts, index = corpus
+    expected = reference_bm25(program_ids, texts, query)
+    found, scores = index.search(query, k=10)
+    best = sorted(expected.values(), reverse=True)[:10]
+    # Impacts are stored as float16
+    assert list(scores) == pytest.approx(best, rel=2e-3)
+    for program_id, score in zip(found, scores):
+        assert score == pytest.approx(expected[int(program_id)], rel=2e-3)
+
+
+def test_candidate_ids_restrict_results(corpus):
+    program_ids, texts, index = corpus
+    allowed = sorted(set(program_ids))[::7] + [10001]
+    expected = {p: s for p, s in reference_bm25(program_ids, texts, "statistics data").items() if p in allowed}
+    found, scores = index.search("statistics data", k=5, candidate_ids=allowed)
+    assert set(found) <= set(allowed)
+    assert list(scores) == pytest.approx(sorted(expected.values(), reverse=True)[:5], rel=2e-3)
+
+
+def test_a_program_counts_once_however_many_chunks_match(tmp_path):
+    build_lexical_index(str(tmp_path), [1, 1, 1, 2], [
+        "finance finance", "finance", "finance data", "finance",
+    ])
+    found, _ = LexicalIndex.open(str(tmp_path)).search("finance", k=10)
+    assert sorted(found) == [1, 2]
+
+
+def test_unknown_terms_match_nothing(corpus):
+    found, scores = corpus[2].search("astrophysics 天文", k=5)
+    assert len(found) == 0 and len(scores) == 0
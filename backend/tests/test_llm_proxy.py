@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.common.exceptions import RateLimitExceededError, ServiceBusyError
+from app.llm_proxy.proxy import LLMProxy
+from app.llm_proxy.schemas import ChatMessage
+
+pytestmark = pytest.mark.anyio
+
+LATENCY = 0.1
+TOKEN_DELAY = 0.005
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    """benchmarks/fake_llm_server.py on a local port, in a background thread"""
+    import uvicorn
+    from benchmarks.fake_llm_server import create_app
+
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(LATENCY, TOKEN_DELAY), host="127.0.0.1", port=0, log_level="warning", lifespan="off",
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.fixture
+async def stats(server_url):
+    """Reads the fake server's counters (reset for each test)"""
+    async with httpx.AsyncClient(base_url=server_url) as client:
+        await client.post("/stats/reset")
+
+        async def read() -> dict:
+            return (await client.get("/stats")).json()
+
+        yield read
+
+
+@pytest.fixture
+async def make_proxy(server_url):
+    proxies = []
+
+    def make(**overrides) -> LLMProxy:
+        options = dict(
+            base_url=f"{server_url}/v1", api_key=None, model="fake", max_concurrency=4, user_concurrency=2,
+            queue_timeout=10, batch_window=0, batch_max_size=16,
+        )
+        options.update(overrides)
+        proxies.append(LLMProxy(**options))
+        return proxies[-1]
+
+    yield make
+    for proxy in proxies:
+        await proxy.close()
+
+
+def say(text: str) -> list[ChatMessage]:
+    return [ChatMessage(role="user", content=text)]
+
+
+async def test_upstream_concurrency_is_capped(make_proxy, stats):
+    proxy = make_proxy(max_concurrency=4)
+    replies = await asyncio.gather(*(
+        proxy.chat(say(f"question {i}"), user_id=i, purpose="test", max_tokens=8) for i in range(20)
+    ))
+    assert [reply.text for reply in replies] == [f"You said: question {i}" for i in range(20)]
+    server = await stats()
+    assert server["requests"] == 20
+    assert server["max_in_flight"] == 4
+    assert proxy.in_flight == 0
+
+
+async def test_no_free_upstream_slot_is_rejected(make_proxy, stats):
+    proxy = make_proxy(max_concurrency=1, queue_timeout=LATENCY / 4)
+    results = await asyncio.gather(*(
+        proxy.chat(say("hi"), user_id=i, purpose="test") for i in range(3)
+    ), return_exceptions=True)
+    assert sum(isinstance(r, ServiceBusyError) for r in results) == 2
+    assert (await stats())["requests"] == 1
+
+
+async def test_per_user_concurrency(make_proxy, stats):
+    proxy = make_proxy(user_concurrency=2, queue_timeout=LATENCY / 4)
+    results = await asyncio.gather(*(
+        proxy.chat(say("hi"), user_id=1, purpose="test") for _ in range(5)
+    ), return_exceptions=True)
+    rejected = [r for r in results if isinstance(r, RateLimitExceededError)]
+    assert len(rejected) == 3
+    assert rejected[0].status_code == 429 and "Retry-After" in rejected[0].headers
+    # Another user is not affected
+    assert (await proxy.chat(say("hi"), user_id=2, purpose="test")).text == "You said: hi"
+
+
+async def test_completions_model_prompts_are_batched(make_proxy, stats):
+    proxy = make_proxy(completions_models=["fake"], batch_window=0.05, batch_max_size=4)
+    replies = await asyncio.gather(*(
+        proxy.complete(f"program {i}", user_id=i, purpose="test", max_tokens=8) for i in range(10)
+    ))
+    assert [reply.text for reply in replies] == [f"You said: program {i}" for i in range(10)]
+    server = await stats()
+    assert server["endpoints"] == {"completions": 3}  # 4 + 4 + 2
+    assert server["prompts"] == 10
+
+
+async def test_single_prompt_batch_keeps_usage(make_proxy, stats):
+    proxy = make_proxy(completions_models=["fake"], batch_window=0)
+    reply = await proxy.complete("one two", user_id=1, purpose="test")
+    assert reply.usage is not None and reply.usage.prompt_tokens == 2
+
+
+async def test_chat_model_completions_use_the_chat_endpoint(make_proxy, stats):
+    proxy = make_proxy(completions_models=["instruct-model"], batch_window=0.05)
+    replies = await asyncio.gather(*(
+        proxy.complete(f"program {i}", user_id=i, purpose="test", max_tokens=8) for i in range(3)
+    ))
+    assert [reply.text for reply in replies] == [f"You said: program {i}" for i in range(3)]
+    assert all(reply.usage is not None for reply in replies)
+    assert (await stats())["endpoints"] == {"chat": 3}
+
+
+async def test_stream_passes_text_through_as_it_arrives(make_proxy, stats):
+    proxy = make_proxy()
+    words = [f"w{i}" for i in range(40)]
+    started = time.perf_counter()
+    first_at, fragments = None, []
+    async for text in proxy.stream_chat(say(" ".join(words)), user_id=1, purpose="test", max_tokens=100):
+        if first_at is None:
+            first_at = time.perf_counter() - started
+        fragments.append(text)
+    total = time.perf_counter() - started
+
+    assert "".join(fragments) == "You said: " + " ".join(words)
+    assert len(fragments) == len(words) + 2
+    # The first text arrives after the model latency, long before the last token
+    assert first_at < total - 20 * TOKEN_DELAY
+    assert proxy.in_flight == 0
+
+
+async def test_closing_a_stream_early_frees_its_slots(make_proxy, stats):
+    proxy = make_proxy(max_concurrency=1, user_concurrency=1, queue_timeout=1)
+    stream = proxy.stream_chat(say("a b c d e f g h"), user_id=1, purpose="test")
+    assert await stream.__anext__() == "You"
+    assert proxy.in_flight == 1
+    await stream.aclose()
+    assert proxy.in_flight == 0
+    assert (await proxy.chat(say("again"), user_id=1, purpose="test")).text == "You said: again"
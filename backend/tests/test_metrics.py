@@ -0,0 +1,131 @@
+import json
+import os
+
+import httpx
+import pytest
+
+from app.common import metrics
+from app.common.metrics import Registry, collect_snapshots, render_metrics, write_snapshot
+from app.config import settings
+
+
+def snapshot(requests: float, in_flight: float, latencies: list[int]) -> dict:
+    return {
+        "requests_total": {
+            "type": "counter", "help": "Requests", "labelnames": ["route"],
+            "samples": [[["/a"], float(requests)]],
+        },
+        "in_flight": {
+            "type": "gauge", "help": "In flight", "labelnames": [],
+            "samples": [[[], float(in_flight)]],
+        },
+        "latency_seconds": {
+            "type": "histogram", "help": "Latency", "labelnames": [], "buckets": [0.1, 1.0],
+            "samples": [[[], [latencies, 0.5, sum(latencies)]]],
+        },
+    }
+
+
+def test_render_sums_counters_and_keeps_gauges_per_worker():
+    text = Registry().render([(101, snapshot(3, 2, [1, 0, 0])), (102, snapshot(4, 5, [0, 1, 1]))])
+    lines = text.splitlines()
+    assert 'requests_total{route="/a"} 7.0' in lines
+    assert 'in_flight{pid="101"} 2.0' in lines
+    assert 'in_flight{pid="102"} 5.0' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_count 3" in lines
+
+
+def test_render_single_process_has_no_pid_label():
+    lines = Registry().render([(None, snapshot(3, 2, [1, 0, 0]))]).splitlines()
+    assert "in_flight 2.0" in lines
+
+
+@pytest.fixture
+def multiproc_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "_process_id", None)
+    return tmp_path
+
+
+def write_worker(directory, name: str, pid: int, data: dict, age: float = 0) -> None:
+    path = directory / f"metrics-{name}.json"
+    path.write_text(json.dumps({"id": name, "pid": pid, "metrics": data}))
+    if age:
+        modified = os.path.getmtime(path) - age
+        os.utime(path, (modified, modified))
+
+
+def test_snapshot_files_are_not_keyed_by_pid(multiproc_dir, monkeypatch):
+    write_snapshot()
+    first = os.listdir(multiproc_dir)
+    assert len(first) == 1 and str(os.getpid()) not in first[0]
+
+    # A later process reusing this PID writes its own file
+    monkeypatch.setattr(metrics, "_process_id", None)
+    write_snapshot()
+    assert len(os.listdir(multiproc_dir)) == 2
+
+
+def test_collect_drops_gauges_of_exited_workers(multiproc_dir):
+    alive = os.getppid()
+    write_worker(multiproc_dir, "live", alive, snapshot(1, 9, [1, 0, 0]))
+    write_worker(multiproc_dir, "exited", 2 ** 22 + 1, snapshot(2, 8, [1, 0, 0]))
+    # PID alive again (reused), but the snapshot stopped being refreshed
+    write_worker(multiproc_dir, "reused", alive, snapshot(4, 7, [1, 0, 0]),
+                 age=10 * settings.METRICS_FLUSH_INTERVAL)
+
+    local = snapshot(8, 1, [1, 0, 0])
+    snapshots = collect_snapshots(local)
+    assert snapshots[0] == (os.getpid(), local)
+    gauges = sorted(data["in_flight"]["samples"][0][1] for _, data in snapshots if "in_flight" in data)
+    assert gauges == [1, 9]
+
+    text = render_metrics(local)
+    assert 'requests_total{route="/a"} 15.0' in text.splitlines()
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint():
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert "# TYPE http_requests_total counter" in response.text
+
+
+def test_exited_workers_are_folded_into_the_aggregate(multiproc_dir):
+    write_worker(multiproc_dir, "live", os.getppid(), snapshot(1, 9, [1, 0, 0]))
+    write_worker(multiproc_dir, "gone-a", 2 ** 22 + 1, snapshot(2, 8, [1, 0, 0]))
+    write_worker(multiproc_dir, "gone-b", 2 ** 22 + 2, snapshot(4, 7, [0, 1, 0]))
+    # PID reused long ago: folded although the PID is alive
+    write_worker(multiproc_dir, "abandoned", os.getppid(), snapshot(16, 6, [0, 0, 1]),
+                 age=(metrics.FOLD_AFTER_INTERVALS + 1) * settings.METRICS_FLUSH_INTERVAL)
+
+    local = snapshot(8, 1, [1, 0, 0])
+    first = render_metrics(local)
+    assert sorted(os.listdir(multiproc_dir)) == ["aggregate.json", "aggregate.json.lock", "metrics-live.json"]
+    assert 'requests_total{route="/a"} 31.0' in first.splitlines()
+    assert "latency_seconds_count 5" in first.splitlines()
+
+    # Rendering again reads the aggregate without adding it twice
+    assert render_metrics(local) == first
+
+    # The next worker to exit is added to the existing totals
+    write_worker(multiproc_dir, "gone-c", 2 ** 22 + 3, snapshot(32, 5, [1, 0, 0]))
+    assert 'requests_total{route="/a"} 63.0' in render_metrics(local).splitlines()
+    assert not (multiproc_dir / "metrics-gone-c.json").exists()
+
+
+def test_interrupted_fold_does_not_count_twice(multiproc_dir):
+    write_worker(multiproc_dir, "gone", 2 ** 22 + 1, snapshot(2, 8, [1, 0, 0]))
+    render_metrics(snapshot(0, 0, [0, 0, 0]))
+    # As if the snapshot had not been deleted after the aggregate was written
+    write_worker(multiproc_dir, "gone", 2 ** 22 + 1, snapshot(2, 8, [1, 0, 0]))
+
+    text = render_metrics(snapshot(0, 0, [0, 0, 0]))
+    assert 'requests_total{route="/a"} 2.0' in text.splitlines()
+    assert not (multiproc_dir / "metrics-gone.json").exists()
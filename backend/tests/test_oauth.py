@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import insert
+
+from app.auth.models import User
+from app.auth.oauth import _insert_google_user
+
+pytestmark = pytest.mark.anyio
+
+
+async def allocate(db, base_username: str, existing: list[str]) -> str:
+    if existing:
+        await db.execute(insert(User), [
+            {"email": f"{name}@example.com", "username": name, "google_id": f"g-{name}"} for name in existing
+        ])
+    user = (await db.scalars(_insert_google_user(db, "new@example.com", base_username, "g-new"))).first()
+    return user.username
+
+
+@pytest.mark.parametrize("existing, expected", [
+    ([], "john"),
+    (["john"], "john_1"),
+    (["john", "john_1", "john_7"], "john_8"),
+    # The bare name is free even though suffixed names are taken
+    (["john_5"], "john"),
+    # Names that only share the prefix are not suffixes
+    (["johnny", "john_x", "john_1a"], "john"),
+    (["john", "johnny_3"], "john_1"),
+])
+async def test_username_allocation(db, existing, expected):
+    assert await allocate(db, "john", existing) == expected
+
+
+async def test_like_wildcards_in_base_name(db):
+    assert await allocate(db, "a_b", ["a_b", "axb_4", "a_b_2"]) == "a_b_3"
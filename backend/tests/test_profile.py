@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.profile.cache import profile_cache
+from app.profile.models import UserProfile
+
+pytestmark = pytest.mark.anyio
+
+PROFILE_URL = f"{settings.API_V1_PREFIX}/profile/me"
+
+
+async def write_elsewhere(db, user_id: int, **values) -> None:
+    """Change the stored profile as another worker would, leaving this worker's cached copy stale"""
+    await db.execute(update(UserProfile).where(UserProfile.user_id == user_id).values(**values))
+    await db.commit()
+
+
+async def stored(db, user_id: int) -> UserProfile:
+    db.expire_all()
+    return await db.scalar(select(UserProfile).where(UserProfile.user_id == user_id))
+
+
+@pytest.fixture
+async def user(client, signup, db):
+    user_id, tokens = await signup()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    response = await client.patch(PROFILE_URL, json={"gpa": 3.5, "bio": "old bio"}, headers=headers)
+    assert response.status_code == 200
+    # This worker now caches gpa=3.5 / bio="old bio"; another one changes both
+    assert (await client.get(PROFILE_URL, headers=headers)).json()["gpa"] == 3.5
+    await write_elsewhere(db, user_id, gpa=3.0, bio="new bio")
+    return user_id, headers
+
+
+@pytest.mark.parametrize("method", ["patch", "put"])
+async def test_setting_a_value_only_the_stale_cache_holds_is_written(client, db, user, method):
+    user_id, headers = user
+    response = await getattr(client, method)(PROFILE_URL, json={"gpa": 3.5}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["gpa"] == 3.5
+    assert (await stored(db, user_id)).gpa == 3.5
+
+
+@pytest.mark.parametrize("method", ["patch", "put"])
+async def test_unchanged_fields_come_from_the_database(client, db, user, method):
+    user_id, headers = user
+    response = await getattr(client, method)(PROFILE_URL, json={"major": "finance"}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["major"] == "finance"
+    assert body["bio"] == "new bio" and body["gpa"] == 3.0
+    # The stale values did not make it into the cache either
+    cached = await profile_cache.get(user_id)
+    assert cached["bio"] == "new bio" and cached["gpa"] == 3.0
+    assert (await stored(db, user_id)).bio == "new bio"
+
+
+async def test_no_op_update_refreshes_a_stale_cache(client, db, user):
+    user_id, headers = user
+    response = await client.patch(PROFILE_URL, json={"gpa": 3.0}, headers=headers)
+    assert response.json()["gpa"] == 3.0 and response.json()["bio"] == "new bio"
+    assert (await client.get(PROFILE_URL, headers=headers)).json()["bio"] == "new bio"
+
+
+async def test_patch_null_clears_and_put_ignores_null(client, db, user):
+    user_id, headers = user
+    response = await client.put(PROFILE_URL, json={"bio": None, "major": "law"}, headers=headers)
+    assert response.json()["bio"] == "new bio" and response.json()["major"] == "law"
+    response = await client.patch(PROFILE_URL, json={"bio": None}, headers=headers)
+    assert response.json()["bio"] is None
+    assert (await stored(db, user_id)).bio is None
+
+
+async def test_taken_username_is_rejected(client, signup, user):
+    await signup("bob")
+    _, headers = user
+    response = await client.patch(PROFILE_URL, json={"username": "bob"}, headers=headers)
+    assert response.status_code == 400
+    assert (await client.get(PROFILE_URL, headers=headers)).json()["username"] == "alice"
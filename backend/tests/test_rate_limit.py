@@ -0,0 +1,171 @@
+import time
+
+import httpx
+import pytest
+
+from app.common import rate_limit
+from app.common.rate_limit import SlidingWindowLimiter, limiter
+from app.config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeClock:
+    """Stands in for the module's `time`; wall and monotonic time move together"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["local", "redis"])
+async def backend(request):
+    """Run a test against the in-process fallback and the Lua script"""
+    import fakeredis.aioredis
+    from app.common.redis import set_redis
+
+    client = None
+    if request.param == "redis":
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        settings.REDIS_ENABLED = True
+        set_redis(client)
+    limiter.reset()
+    yield request.param
+    limiter.reset()
+    if client is not None:
+        set_redis(None)
+        settings.REDIS_ENABLED = False
+        await client.aclose()
+
+
+async def test_sliding_window_boundaries(backend, clock):
+    limiter = SlidingWindowLimiter(prefix="test")
+    start = clock.now
+    for i in range(3):
+        clock.now = start + i
+        assert await limiter.hit("k", limit=3, window=10) == 0
+    assert await limiter.hit("k", limit=3, window=10) == pytest.approx(8)
+
+    # The window slides hit by hit rather than resetting in fixed buckets
+    clock.now = start + 9.5
+    assert await limiter.hit("k", limit=3, window=10) == pytest.approx(0.5)
+    clock.now = start + 10
+    assert await limiter.hit("k", limit=3, window=10) == 0
+    assert await limiter.hit("k", limit=3, window=10) == pytest.approx(1)
+    clock.now = start + 11
+    assert await limiter.hit("k", limit=3, window=10) == 0
+
+    # Other keys have their own budget
+    assert await limiter.hit("other", limit=3, window=10) == 0
+
+
+async def test_rejected_hits_do_not_extend_the_window(backend, clock):
+    limiter = SlidingWindowLimiter(prefix="test")
+    assert await limiter.hit("k", limit=1, window=10) == 0
+    for _ in range(5):
+        clock.now += 1
+        assert await limiter.hit("k", limit=1, window=10) > 0
+    clock.now += 5
+    assert await limiter.hit("k", limit=1, window=10) == 0
+
+
+async def test_clear(backend, clock):
+    limiter = SlidingWindowLimiter(prefix="test")
+    assert await limiter.hit("k", limit=1, window=10) == 0
+    assert await limiter.hit("k", limit=1, window=10) > 0
+    await limiter.clear("k")
+    assert await limiter.hit("k", limit=1, window=10) == 0
+
+
+async def test_redis_outage_falls_back_to_local(redis, clock, monkeypatch):
+    from redis.exceptions import ConnectionError as RedisConnectionError
+
+    limiter = SlidingWindowLimiter(prefix="test")
+
+    async def broken(*args, **kwargs):
+        raise RedisConnectionError("down")
+
+    monkeypatch.setattr(limiter, "_get_script", lambda redis: broken)
+    assert await limiter.hit("k", limit=1, window=10) == 0
+    assert await limiter.hit("k", limit=1, window=10) > 0
+
+
+# Endpoint limits
+
+
+@pytest.fixture
+async def app(db, monkeypatch, backend):
+    from app.main import app
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_IP_REQUESTS", 8)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ACCOUNT_REQUESTS", 3)
+    async with client_for(app, "10.0.0.1") as client:
+        response = await client.post(f"{settings.API_V1_PREFIX}/auth/register", json={
+            "email": "alice@example.com", "username": "alice", "password": "correct horse",
+        })
+        assert response.status_code == 201
+    limiter.reset()
+    return app
+
+
+def client_for(app, ip: str) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app, client=(ip, 50000))
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+async def login(app, ip: str, email: str = "alice@example.com", password: str = "wrong password") -> httpx.Response:
+    async with client_for(app, ip) as client:
+        return await client.post(f"{settings.API_V1_PREFIX}/auth/login", json={"email": email, "password": password})
+
+
+async def test_login_limited_per_ip(app):
+    for i in range(8):
+        response = await login(app, "10.0.0.2", email=f"user{i}@example.com")
+        assert response.status_code == 401
+    response = await login(app, "10.0.0.2", email="someone@example.com")
+    assert response.status_code == 429
+    retry_after = int(response.headers["Retry-After"])
+    assert 1 <= retry_after <= settings.RATE_LIMIT_IP_WINDOW
+
+    # Another client still gets through
+    assert (await login(app, "10.0.0.3", email="someone@example.com")).status_code == 401
+
+
+async def test_failed_logins_limited_per_account(app):
+    # Spread over IPs, so only the account budget applies
+    for i in range(3):
+        assert (await login(app, f"10.0.1.{i}")).status_code == 401
+    response = await login(app, "10.0.1.99")
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= settings.RATE_LIMIT_ACCOUNT_WINDOW
+    # Even the right password is refused until the window passes
+    assert (await login(app, "10.0.1.100", password="correct horse")).status_code == 429
+
+    assert (await login(app, "10.0.1.101", email="bob@example.com")).status_code == 401
+
+
+async def test_successful_logins_do_not_use_the_account_budget(app):
+    for i in range(6):
+        response = await login(app, f"10.0.2.{i}", password="correct horse")
+        assert response.status_code == 200
+
+    # A success also clears earlier failures
+    for i in range(2):
+        assert (await login(app, f"10.0.3.{i}")).status_code == 401
+    assert (await login(app, "10.0.3.50", password="correct horse")).status_code == 200
+    for i in range(3):
+        assert (await login(app, f"10.0.4.{i}")).status_code == 401
+    assert (await login(app, "10.0.4.50")).status_code == 429
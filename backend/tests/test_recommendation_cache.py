@@ -0,0 +1,95 @@
+import itertools
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.profile.schemas import ProfileResponse
+from app.recommendation import cache as cache_module
+from app.recommendation.cache import RecommendationCache, fingerprint
+from app.recommendation.catalog import ProgramCatalog
+from app.recommendation.schemas import RecommendationRequest
+from app.recommendation.service import _fingerprint, merge_criteria
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    # One second between fills, so fill order never depends on timer resolution
+    clock = itertools.count(1000)
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: next(clock), monotonic=time.monotonic))
+    return RecommendationCache("test-recs", ttl=60, local_ttl=60, maxsize=100, max_entries=3, lock_timeout=1)
+
+
+async def fill(cache, user_id: int, *keys: str) -> None:
+    for key in keys:
+        await cache.set(user_id, key, {"key": key})
+
+
+async def test_redis_evicts_the_oldest_fills(redis, cache):
+    await fill(cache, 1, "a", "b", "c")
+    await fill(cache, 1, "a")  # Refilled: now the newest
+    await fill(cache, 1, "d")
+    assert sorted(await redis.hkeys("test-recs:1")) == ["a", "c", "d"]
+    assert await redis.zrange("test-recs:filled:1", 0, -1) == ["c", "a", "d"]
+    assert await redis.ttl("test-recs:filled:1") > 0
+
+    # Another worker without the local tier sees the same entries
+    cache.local.clear()
+    assert await cache.get(1, "b") is None
+    assert await cache.get(1, "c") == {"key": "c"}
+
+
+async def test_local_tier_evicts_the_oldest_fills(cache):
+    await fill(cache, 1, "a", "b", "c", "a", "d")
+    assert list(cache.local.get(1)) == ["c", "a", "d"]
+
+
+async def test_invalidate_drops_entries_and_fill_times(redis, cache):
+    await fill(cache, 1, "a", "b")
+    await fill(cache, 2, "a")
+    await cache.invalidate(1)
+    assert await cache.get(1, "a") is None
+    assert not await redis.exists("test-recs:1", "test-recs:filled:1")
+    assert await cache.get(2, "a") == {"key": "a"}
+
+
+def profile(**academic) -> ProfileResponse:
+    return ProfileResponse(
+        id=1, email="a@example.com", username="a", nickname=None, avatar_url=None, bio=None, phone=None,
+        is_active=True, is_verified=False, created_at=datetime.now(timezone.utc), **academic,
+    )
+
+
+def catalog(tuition: int) -> ProgramCatalog:
+    return ProgramCatalog([{
+        "id": 1, "school_name": "A", "program_name": "P", "country": "GB", "city": None, "degree": "master",
+        "major": "finance", "qs_rank": 10, "tuition": tuition, "min_gpa": 3.0, "min_ielts": 6.5, "min_toefl": None,
+    }])
+
+
+def test_fingerprint_follows_profile_changes():
+    request = RecommendationRequest()
+    before = _fingerprint(catalog(30000), merge_criteria(request, profile(gpa=3.5, major="finance")))
+    assert before == _fingerprint(catalog(30000), merge_criteria(request, profile(gpa=3.5, major="finance")))
+    assert before != _fingerprint(catalog(30000), merge_criteria(request, profile(gpa=3.6, major="finance")))
+    assert before != _fingerprint(catalog(30000), merge_criteria(request, profile(gpa=3.5, major="law")))
+    # Fields given in the request override the profile, so the profile value no longer matters
+    explicit = RecommendationRequest(gpa=3.9)
+    assert (_fingerprint(catalog(30000), merge_criteria(explicit, profile(gpa=3.5)))
+            == _fingerprint(catalog(30000), merge_criteria(explicit, profile(gpa=3.6))))
+
+
+def test_fingerprint_follows_catalog_changes():
+    criteria = merge_criteria(RecommendationRequest(), profile(gpa=3.5))
+    assert catalog(30000).version == catalog(30000).version
+    assert _fingerprint(catalog(30000), criteria) != _fingerprint(catalog(31000), criteria)
+
+
+def test_fingerprint_ignores_equivalent_spellings():
+    a = RecommendationRequest(target_countries=["us", "GB "], major="Computer Science", query="量化  金融")
+    b = RecommendationRequest(target_countries=["GB", "US"], major="computer_science", query="量化 金融")
+    assert fingerprint(a, "v1") == fingerprint(b, "v1")
+    assert fingerprint(a, "v1") != fingerprint(a, "v2")
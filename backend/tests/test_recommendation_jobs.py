@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.recommendation import jobs
+from app.recommendation.jobs import JobRunner, cancel_job, get_job, submit_job
+
+pytestmark = pytest.mark.anyio
+
+
+class Work:
+    """Blocking job body that records how many run at once"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.running = 0
+        self.max_running = 0
+        self.finished = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, value):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.running -= 1
+            self.finished += 1
+        return {"value": value}
+
+
+async def wait_for_status(user_id: int, job_id: str, statuses: tuple, timeout: float = 5) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        record = await get_job(user_id, job_id)
+        if record["status"] in statuses or time.monotonic() > deadline:
+            return record
+        await asyncio.sleep(0.01)
+
+
+def make_runner(work: Work, workers: int = 1, timeout: float = 60) -> JobRunner:
+    runner = None
+
+    async def execute(record):
+        return await runner.run_in_thread(work, record["criteria"]["n"])
+
+    runner = JobRunner(execute, workers=workers, timeout=timeout, poll_seconds=0.01, block_seconds=0.2)
+    return runner
+
+
+async def test_jobs_run_and_succeed(redis):
+    work = Work(0.01)
+    runner = make_runner(work, workers=2)
+    runner.start()
+    try:
+        records = [await submit_job(user_id, "fp", {"n": user_id}) for user_id in range(1, 5)]
+        runner.notify()
+        for record in records:
+            done = await wait_for_status(record["user_id"], record["id"], ("succeeded", "failed"))
+            assert done["status"] == "succeeded"
+            assert done["result"] == {"value": record["user_id"]}
+    finally:
+        await runner.stop()
+
+
+async def test_local_store_is_woken_by_notify(monkeypatch):
+    monkeypatch.setattr(jobs, "_local_store", jobs.LocalJobStore())
+    runner = make_runner(Work(0))
+    runner.block_seconds = 60
+    runner.start()
+    try:
+        await asyncio.sleep(0.05)  # Dispatcher idle
+        record = await submit_job(1, "fp", {"n": 1})
+        runner.notify()
+        assert (await wait_for_status(1, record["id"], ("succeeded",), timeout=1))["status"] == "succeeded"
+    finally:
+        await runner.stop()
+
+
+async def test_cancelled_job_keeps_its_slot_until_the_thread_ends(redis):
+    work = Work(0.5)
+    runner = make_runner(work, workers=1)
+    runner.start()
+    try:
+        first = await submit_job(1, "fp", {"n": 1})
+        runner.notify()
+        await wait_for_status(1, first["id"], ("running",))
+        second = await submit_job(2, "fp", {"n": 2})
+
+        assert (await cancel_job(1, first["id"]))["status"] == "cancelled"
+        runner.cancel(first["id"])
+        # The first job's computation is still running, so the second waits
+        await asyncio.sleep(0.2)
+        assert (await get_job(2, second["id"]))["status"] == "queued"
+
+        done = await wait_for_status(2, second["id"], ("succeeded", "failed"))
+        assert done["status"] == "succeeded"
+        assert work.max_running == 1
+        assert (await get_job(1, first["id"]))["status"] == "cancelled"
+    finally:
+        await runner.stop()
+
+
+async def test_timed_out_job_keeps_its_slot_until_the_thread_ends(redis):
+    work = Work(0.5)
+    runner = make_runner(work, workers=1, timeout=0.2)
+    runner.start()
+    try:
+        first = await submit_job(1, "fp", {"n": 1})
+        runner.notify()
+        failed = await wait_for_status(1, first["id"], ("failed", "succeeded"))
+        assert failed["status"] == "failed" and failed["error"] == "Timed out"
+        assert work.running == 1
+
+        runner.timeout = 60
+        second = await submit_job(2, "fp", {"n": 2})
+        await asyncio.sleep(0.1)
+        assert (await get_job(2, second["id"]))["status"] == "queued"
+        assert (await wait_for_status(2, second["id"], ("succeeded",)))["status"] == "succeeded"
+        assert work.max_running == 1
+    finally:
+        await runner.stop()
+
+
+async def test_unclaimed_job_is_recovered(redis):
+    store = jobs._redis_store
+    record = await submit_job(1, "fp", {"n": 1})
+    # A dispatcher moved the job off the queue, then died before claiming it
+    assert await redis.lmove(store._queue_key, store._processing_key, "LEFT", "RIGHT") == record["id"]
+
+    assert await store.claim(0.01) is None  # Idle: recovers instead
+    assert await redis.lrange(store._queue_key, 0, -1) == [record["id"]]
+    assert await redis.llen(store._processing_key) == 0
+
+    claimed = await store.claim(0.01)
+    assert claimed["id"] == record["id"] and claimed["status"] == "running"
+    assert await redis.llen(store._processing_key) == 0
+
+
+async def test_cancelled_queued_job_is_skipped(redis):
+    store = jobs._redis_store
+    record = await submit_job(1, "fp", {"n": 1})
+    await cancel_job(1, record["id"])
+    assert await store.claim(0.01) is None
+    assert await redis.llen(store._queue_key) == 0
+    assert await redis.llen(store._processing_key) == 0
@@ -0,0 +1,147 @@
+import math
+import random
+
+import pytest
+
+from app.recommendation.catalog import MAJOR_GROUPS, ProgramCatalog
+from app.recommendation.schemas import RecommendationRequest
+from app.recommendation.scoring import score_programs
+
+# TOEFL -> IELTS comparison points, spelled out independently of the catalog module
+TOEFL_TO_IELTS = [(0, 0.0), (32, 4.5), (35, 5.0), (46, 5.5), (60, 6.0), (79, 6.5), (94, 7.0),
+                  (102, 7.5), (110, 8.0), (115, 8.5), (118, 9.0), (120, 9.0)]
+WEIGHTS = {"academic": 0.35, "language": 0.25, "major": 0.25, "budget": 0.15}
+
+
+def ielts_of(toefl: float) -> float:
+    for (x0, y0), (x1, y1) in zip(TOEFL_TO_IELTS, TOEFL_TO_IELTS[1:]):
+        if toefl <= x1:
+            return y0 + (y1 - y0) * (toefl - x0) / (x1 - x0)
+    return 9.0
+
+
+def margin(value: float, base: float, gain: float, penalty: float) -> float:
+    return base + (gain if value >= 0 else penalty) * value
+
+
+def reference_score(row: dict, request: RecommendationRequest) -> float:
+    """The documented scoring rules, one program at a time"""
+    if request.gpa is None:
+        academic = 50.0
+    elif row["min_gpa"] is None:
+        academic = 85.0
+    else:
+        academic = margin(request.gpa - row["min_gpa"], 70, 60, 150)
+
+    bands = [b for b in (request.ielts_score, None if request.toefl_score is None else ielts_of(request.toefl_score))
+             if b is not None]
+    required = [r for r in (row["min_ielts"], None if row["min_toefl"] is None else ielts_of(row["min_toefl"]))
+                if r is not None]
+    if not bands:
+        language = 50.0
+    elif not required:
+        language = 85.0
+    else:
+        language = margin(max(bands) - min(required), 75, 50, 100)
+
+    major = request.major.lower().replace(" ", "_") if request.major else None
+    if major is None:
+        fit = 50.0
+    elif row["major"] == major:
+        fit = 100.0
+    elif MAJOR_GROUPS.get(major) and MAJOR_GROUPS.get(row["major"]) == MAJOR_GROUPS[major]:
+        fit = 70.0
+    else:
+        fit = 30.0
+
+    if request.budget is None:
+        budget = 50.0
+    elif row["tuition"] is None:
+        budget = 70.0
+    else:
+        budget = 100 - 200 * max((row["tuition"] - request.budget) / max(request.budget, 1), 0)
+
+    parts = {"academic": academic, "language": language, "major": fit, "budget": budget}
+    return sum(WEIGHTS[k] * min(max(v, 0), 100) for k, v in parts.items())
+
+
+def reference_candidates(rows: list[dict], request: RecommendationRequest) -> list[dict]:
+    countries = {c.upper() for c in request.target_countries or []}
+    return [
+        row for row in rows
+        if (not request.target_degree or row["degree"] == request.target_degree)
+        and (not countries or row["country"] in countries)
+        and (request.max_rank is None or (row["qs_rank"] is not None and row["qs_rank"] <= request.max_rank))
+    ]
+
+
+def random_rows(count: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    majors = list(MAJOR_GROUPS) + ["liberal_arts"]
+    return [{
+        "id": i + 1,
+        "school_name": f"University {i // 5}",
+        "program_name": f"Program {i}",
+        "country": rng.choice(["US", "GB", "SG", "DE"]),
+        "city": None,
+        "degree": rng.choice(["bachelor", "master", "phd"]),
+        "major": rng.choice(majors),
+        "qs_rank": None if rng.random() < 0.2 else rng.randint(1, 800),
+        "tuition": None if rng.random() < 0.1 else rng.randrange(0, 70000, 500),
+        "min_gpa": None if rng.random() < 0.1 else round(rng.uniform(2.5, 3.8), 2),
+        "min_ielts": None if rng.random() < 0.3 else rng.choice([5.5, 6.0, 6.5, 7.0, 7.5]),
+        "min_toefl": None if rng.random() < 0.3 else rng.randrange(70, 111),
+    } for i in range(count)]
+
+
+ROWS = random_rows(600)
+CATALOG = ProgramCatalog(ROWS)
+
+
+@pytest.mark.parametrize("criteria", [
+    dict(gpa=3.4, ielts_score=7.0, major="computer_science", budget=40000),
+    dict(gpa=3.1, toefl_score=100, major="Finance", target_countries=["gb", "US"], budget=30000),
+    dict(gpa=3.8, ielts_score=6.5, toefl_score=110, major="data_science", target_degree="master",
+         target_countries=["SG"], max_rank=300, limit=5),
+    dict(limit=100),
+    dict(major="underwater_basketry", budget=0, limit=50),
+])
+def test_matches_reference_implementation(criteria):
+    request = RecommendationRequest(**criteria)
+    result = score_programs(CATALOG, request)
+
+    candidates = reference_candidates(ROWS, request)
+    expected = sorted(reference_score(row, request) for row in candidates)[::-1][:request.limit]
+    assert result.total_candidates == len(candidates)
+    assert list(result.scores) == pytest.approx(expected, abs=1e-3)
+
+    by_id = {row["id"]: row for row in candidates}
+    for index, score in zip(result.indices, result.scores):
+        row = by_id[int(CATALOG.ids[index])]
+        assert score == pytest.approx(reference_score(row, request), abs=1e-3)
+
+
+def test_ties_go_to_the_better_ranked_school():
+    base = dict(country="US", city=None, degree="master", major="law", tuition=None,
+                min_gpa=None, min_ielts=None, min_toefl=None)
+    rows = [
+        {**base, "id": 1, "school_name": "A", "program_name": "A", "qs_rank": None},
+        {**base, "id": 2, "school_name": "B", "program_name": "B", "qs_rank": 50},
+        {**base, "id": 3, "school_name": "C", "program_name": "C", "qs_rank": 10},
+        {**base, "id": 4, "school_name": "D", "program_name": "D", "qs_rank": 10},
+    ]
+    result = score_programs(ProgramCatalog(rows), RecommendationRequest(limit=3))
+    assert [int(i) + 1 for i in result.indices] == [3, 4, 2]
+    assert len(set(result.scores.tolist())) == 1
+
+
+def test_unranked_schools_fail_a_rank_limit():
+    request = RecommendationRequest(max_rank=100, limit=100)
+    result = score_programs(CATALOG, request)
+    ranks = CATALOG.qs_rank[result.indices]
+    assert not any(math.isnan(r) for r in ranks) and ranks.max() <= 100
+
+
+def test_scoring_within_given_program_ids():
+    result = score_programs(CATALOG, RecommendationRequest(limit=100), program_ids=[5, 6, 700])
+    assert sorted(int(CATALOG.ids[i]) for i in result.indices) == [5, 6]
@@ -0,0 +1,96 @@
+import pytest
+
+from app.auth import sessions
+from app.auth.jwt import verify_token
+from app.common.redis import mark_redis_unavailable
+from app.config import settings
+
+pytestmark = pytest.mark.anyio
+
+AUTH = f"{settings.API_V1_PREFIX}/auth"
+
+
+def rotations(result: str) -> float:
+    return sessions.refresh_rotations_total._values.get((result,), 0)
+
+
+async def refresh(client, refresh_token: str):
+    return await client.post(f"{AUTH}/refresh", json={"refresh_token": refresh_token})
+
+
+async def test_rotation_replaces_the_stored_jti(redis, client, signup):
+    _, tokens = await signup()
+    old = verify_token(tokens["refresh_token"])
+    response = await refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200
+    new = verify_token(response.json()["refresh_token"])
+    assert new["sid"] == old["sid"] and new["jti"] != old["jti"]
+    assert await redis.get(f"refresh:session:{old['sid']}") == new["jti"]
+
+
+async def test_reusing_a_refresh_token_revokes_the_session(redis, client, signup):
+    _, tokens = await signup()
+    sid = verify_token(tokens["refresh_token"])["sid"]
+    successor = (await refresh(client, tokens["refresh_token"])).json()["refresh_token"]
+    reused = rotations("reused")
+
+    assert (await refresh(client, tokens["refresh_token"])).status_code == 401
+    assert rotations("reused") == reused + 1
+    assert await redis.get(f"refresh:session:{sid}") is None
+    # The legitimate successor dies with the session
+    assert (await refresh(client, successor)).status_code == 401
+
+
+async def test_logout_ends_only_that_session(redis, client, signup):
+    _, tokens = await signup()
+    other = (await client.post(f"{AUTH}/login", json={
+        "email": "alice@example.com", "password": "correct horse",
+    })).json()
+    missing = rotations("missing")
+
+    assert (await client.post(f"{AUTH}/logout", json={"refresh_token": tokens["refresh_token"]})).status_code == 200
+    assert (await refresh(client, tokens["refresh_token"])).status_code == 401
+    assert rotations("missing") == missing + 1
+    assert (await refresh(client, other["refresh_token"])).status_code == 200
+
+
+async def test_logout_all_bumps_the_generation(redis, client, signup):
+    user_id, tokens = await signup()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    revoked = rotations("revoked")
+
+    assert (await client.post(f"{AUTH}/logout-all", headers=headers)).status_code == 200
+    assert await redis.get(f"refresh:gen:{user_id}") == "1"
+    assert (await refresh(client, tokens["refresh_token"])).status_code == 401
+    assert rotations("revoked") == revoked + 1
+
+    # Sessions started afterwards carry the new generation
+    fresh = (await client.post(f"{AUTH}/login", json={
+        "email": "alice@example.com", "password": "correct horse",
+    })).json()
+    assert verify_token(fresh["refresh_token"])["gen"] == 1
+    assert (await refresh(client, fresh["refresh_token"])).status_code == 200
+
+
+async def test_sessions_fail_closed_while_redis_is_down(redis, client, signup):
+    _, tokens = await signup()
+    mark_redis_unavailable(OSError("connection refused"))
+
+    response = await refresh(client, tokens["refresh_token"])
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.REDIS_RETRY_SECONDS)
+    assert (await client.post(f"{AUTH}/logout", json={"refresh_token": tokens["refresh_token"]})).status_code == 503
+    # Nothing leaked into the in-process store
+    assert sessions._local_store._sessions == {}
+
+
+async def test_local_store_matches_redis_semantics():
+    store = sessions.LocalSessionStore()
+    gen = await store.create(1, "s", "a", 60)
+    assert await store.rotate(1, "s", "a", "b", gen, 60) == "ok"
+    assert await store.rotate(1, "s", "a", "c", gen, 60) == "reused"
+    assert await store.rotate(1, "s", "b", "c", gen, 60) == "missing"
+
+    gen = await store.create(1, "t", "a", 60)
+    await store.revoke_all(1)
+    assert await store.rotate(1, "t", "a", "b", gen, 60) == "revoked"
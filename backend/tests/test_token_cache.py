@@ -0,0 +1,71 @@
+import time
+from datetime import timedelta
+
+import anyio
+import pytest
+from jose import JWTError
+from sqlalchemy import delete
+
+from app.auth import jwt
+from app.auth.models import User
+from app.auth.principal import invalidate_principal
+from app.auth.service import set_user_active
+from app.config import settings
+from app.profile.models import UserProfile
+
+pytestmark = pytest.mark.anyio
+
+ME = f"{settings.API_V1_PREFIX}/auth/me"
+
+
+def cache_hits() -> float:
+    return jwt.token_cache_requests_total._values.get(("hit",), 0)
+
+
+async def test_cached_access_token_expires_with_its_exp():
+    jwt.token_cache.clear()
+    token = jwt.create_access_token({"sub": 1}, expires_delta=timedelta(seconds=1))
+    exp = jwt.verify_token(token)["exp"]
+    hits = cache_hits()
+    assert jwt.verify_token(token)["sub"] == "1"
+    assert cache_hits() == hits + 1
+
+    # exp has second resolution; wait until it is strictly in the past
+    await anyio.sleep(exp + 1 - time.time())
+    with pytest.raises(JWTError):
+        jwt.verify_token(token)
+    assert len(jwt.token_cache) == 0
+
+
+async def test_refresh_tokens_are_never_cached():
+    jwt.token_cache.clear()
+    token = jwt.create_refresh_token({"sub": 1, "sid": "s", "jti": "j", "gen": 0})
+    hits = cache_hits()
+    for _ in range(3):
+        assert jwt.verify_token(token)["type"] == "refresh"
+    assert cache_hits() == hits
+    assert len(jwt.token_cache) == 0
+
+
+async def test_cached_decode_does_not_keep_a_disabled_user_in(client, signup, db):
+    user_id, tokens = await signup()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert (await client.get(ME, headers=headers)).status_code == 200
+    hits = cache_hits()
+
+    await set_user_active(db, user_id, False)
+    assert (await client.get(ME, headers=headers)).status_code == 403
+    # The signature check was skipped, the account check was not
+    assert cache_hits() == hits + 1
+
+
+async def test_cached_decode_does_not_keep_a_deleted_user_in(client, signup, db):
+    user_id, tokens = await signup()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert (await client.get(ME, headers=headers)).status_code == 200
+
+    await db.execute(delete(UserProfile).where(UserProfile.user_id == user_id))
+    await db.execute(delete(User).where(User.id == user_id))
+    await db.commit()
+    await invalidate_principal(user_id)
+    assert (await client.get(ME, headers=headers)).status_code == 401
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from app.recommendation import vector_index
+from app.recommendation.vector_index import IVFIndex, build_index, normalize
+
+DIM = 16
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    """500 vectors around 10 topics, with sparse program IDs"""
+    rng = np.random.default_rng(3)
+    topics = rng.normal(size=(10, DIM))
+    vectors = topics[rng.integers(0, 10, 500)] + 0.3 * rng.normal(size=(500, DIM))
+    ids = np.arange(500, dtype=np.int64) * 3 + 100
+    return ids, normalize(vectors).astype(np.float32), rng
+
+
+@pytest.fixture(scope="module")
+def index(catalog, tmp_path_factory):
+    ids, vectors, _ = catalog
+    directory = str(tmp_path_factory.mktemp("index"))
+    build_index(directory, ids, vectors, nlist=10)
+    return IVFIndex.open(directory)
+
+
+def exact(catalog, query, k, allowed=None):
+    ids, vectors, _ = catalog
+    scores = vectors @ normalize(query)
+    if allowed is not None:
+        scores = np.where(np.isin(ids, allowed), scores, -np.inf)
+    order = np.argsort(-scores, kind="stable")[:k]
+    order = order[np.isfinite(scores[order])]
+    return ids[order], scores[order]
+
+
+def test_probing_every_list_is_exact(catalog, index):
+    for query in catalog[2].normal(size=(5, DIM)):
+        found, scores = index.search(query, k=10, nprobe=10)
+        expected, expected_scores = exact(catalog, query, 10)
+        assert list(found) == list(expected)
+        assert scores == pytest.approx(expected_scores, abs=1e-5)
+
+
+def test_few_probes_keep_recall_on_clustered_data(catalog, index):
+    ids, vectors, rng = catalog
+    recall = []
+    for row in rng.choice(len(ids), 20, replace=False):
+        query = vectors[row] + 0.05 * rng.normal(size=DIM)
+        found, scores = index.search(query, k=10, nprobe=2)
+        assert list(scores) == sorted(scores, reverse=True)
+        recall.append(len(set(found) & set(exact(catalog, query, 10)[0])) / 10)
+    assert np.mean(recall) >= 0.9
+
+
+def test_small_candidate_sets_are_searched_exactly(catalog, index):
+    ids, _, rng = catalog
+    allowed = rng.choice(ids, 40, replace=False).tolist() + [7]  # 7 is not in the index
+    query = rng.normal(size=DIM)
+    found, _ = index.search(query, k=5, nprobe=1, candidate_ids=allowed)
+    assert list(found) == list(exact(catalog, query, 5, allowed)[0])
+
+
+def test_large_candidate_sets_are_filtered_inside_the_lists(catalog, index, monkeypatch):
+    monkeypatch.setattr(vector_index, "EXACT_SEARCH_MAX_CANDIDATES", 0)
+    ids, _, rng = catalog
+    allowed = ids[::2]
+    query = rng.normal(size=DIM)
+    found, _ = index.search(query, k=10, nprobe=10, candidate_ids=allowed)
+    assert list(found) == list(exact(catalog, query, 10, allowed)[0])
+    assert set(found) <= set(allowed)
+
+
+def test_rebuild_publishes_a_new_version(catalog, tmp_path):
+    ids, vectors, _ = catalog
+    first = build_index(str(tmp_path), ids[:50], vectors[:50], nlist=4)
+    second = build_index(str(tmp_path), ids, vectors, nlist=4)
+    assert first != second
+    index = IVFIndex.open(str(tmp_path))
+    assert index.version == second and len(index) == len(ids)
+    assert list(index.rows_for([ids[3], 1, ids[0]])) == sorted(index.rows_for([ids[0], ids[3]]))
+
+
+def test_build_rejects_mismatched_input(tmp_path):
+    with pytest.raises(ValueError):
+        build_index(str(tmp_path), [1, 2], np.ones((3, DIM)))
+    assert IVFIndex.open(str(tmp_path)) is None